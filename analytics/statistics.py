@@ -1,22 +1,230 @@
 import pandas as pd
 import numpy as np
+from scipy.special import rel_entr, kolmogorov
+from scipy.stats import chi2
+
+def rolling_window_bounds(times, window, eval_times=None):
+    """
+    Slice bounds [starts, ends) of the trailing window (t - window, t] in a time-sorted array.
+    Windows end at every row by default, or at each of eval_times (e.g. one per day).
+    """
+    times = np.asarray(times)
+    window = pd.Timedelta(window).to_timedelta64()
+    if eval_times is None:
+        # Row-anchored windows end at the row itself (ties after it are excluded, as in Series.rolling)
+        starts = np.searchsorted(times, (times - window).astype(times.dtype), side='right')
+        return starts, np.arange(1, len(times) + 1)
+
+    eval_times = np.asarray(eval_times).astype(times.dtype)
+    starts = np.searchsorted(times, (eval_times - window).astype(times.dtype), side='right')
+    ends = np.searchsorted(times, eval_times, side='right')
+    return starts, ends
+
+def calculate_rolling_moments(values, starts, ends):
+    """
+    Count, Mean, Std Dev and Skewness of every window [starts, ends) from running moment sums.
+    Uses prefix sums of x, x^2, x^3 (centered for stability), so each window is O(1).
+    """
+    values = np.asarray(values, dtype=float)
+    center = values.mean() if len(values) else 0.0
+    x = values - center
+
+    def window_sum(power):
+        prefix = np.concatenate([[0.0], np.cumsum(x ** power)])
+        return prefix[ends] - prefix[starts]
+
+    n = (ends - starts).astype(float)
+    s1, s2, s3 = window_sum(1), window_sum(2), window_sum(3)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / n
+        m2 = np.maximum(s2 / n - mean ** 2, 0.0)
+        m3 = s3 / n - 3 * mean * s2 / n + 2 * mean ** 3
+        std = np.where(n > 1, np.sqrt(m2 * n / (n - 1)), np.nan)
+        # Adjusted Fisher-Pearson skewness (same definition as Series.skew)
+        skew = np.where((n > 2) & (m2 > 0), np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5, np.nan)
 
-def calculate_distribution_stats(series):
-    """Calculates higher-order statistics for a series."""
     return {
-        "Mean": series.mean(),
-        "Median": series.median(),
-        "Std Dev": series.std(),
-        "Skewness": series.skew(),
-        "Kurtosis": series.kurtosis(),
-        "Count": len(series)
+        "Count": n.astype(int),
+        "Mean": mean + center,
+        "Std Dev": std,
+        "Skewness": skew,
     }
 
-def calculate_quantiles(series):
-    """Calculates key trading quantiles."""
-    return series.quantile([0.25, 0.50, 0.75, 0.90, 0.95])
+def _kth_smallest_in_windows(ranks, starts, ends, ks):
+    """
+    k-th smallest rank inside every slice [starts[i], ends[i]) of a rank array (wavelet matrix).
+
+    Every query walks the bit levels of the ranks together, one vectorized step per level,
+    so all windows are answered in O((n + q) log n) without a per-window sort or Python loop.
+    Only the current level is kept in memory.
+    """
+    n_bits = max(1, int(len(ranks) - 1).bit_length())
+    cur = ranks.astype(np.int32)
+    lo, hi, k = starts.astype(np.int32), ends.astype(np.int32), ks.astype(np.int32)
+    result = np.zeros(len(lo), dtype=np.int32)
+
+    for level in range(n_bits - 1, -1, -1):
+        is_zero = ((cur >> level) & 1) == 0
+        zeros_prefix = np.zeros(len(cur) + 1, dtype=np.int32)
+        np.cumsum(is_zero, out=zeros_prefix[1:])
+        n_zeros = zeros_prefix[-1]
+
+        z_lo, z_hi = zeros_prefix[lo], zeros_prefix[hi]
+        zeros_in = z_hi - z_lo
+        go_right = k >= zeros_in
+
+        # Zero branch: [z_lo, z_hi); one branch: ones are stored after all n_zeros zeros
+        k -= zeros_in * go_right
+        lo = np.where(go_right, lo - z_lo + n_zeros, z_lo)
+        hi = np.where(go_right, hi - z_hi + n_zeros, z_hi)
+        result |= go_right.astype(np.int32) << level
+
+        # Stable partition: zeros first, then ones (next level's order)
+        cur = np.concatenate([cur[is_zero], cur[~is_zero]])
+
+    return result
+
+def calculate_rolling_quantiles(values, starts, ends, quantiles=(0.50, 0.90)):
+    """
+    Exact linear-interpolated quantiles (as Series.quantile) of every window [starts, ends).
+    Empty windows give NaN.
+    """
+    x = np.asarray(values, dtype=float)
+    n = ends - starts
+    if len(x) == 0 or len(n) == 0:
+        return {q: np.full(len(n), np.nan) for q in quantiles}
+
+    order = np.argsort(x, kind='stable')
+    ranks = np.empty(len(x), dtype=np.int64)
+    ranks[order] = np.arange(len(x))
+    sorted_x = x[order]
+
+    # Floor/ceil positions of every quantile, resolved in one batch of order-statistic queries
+    size = np.maximum(n, 1)
+    pos = np.concatenate([(size - 1) * q for q in quantiles])
+    k_lo = np.floor(pos).astype(np.int64)
+    k_hi = np.minimum(k_lo + 1, np.tile(size - 1, len(quantiles)))
+    kth = _kth_smallest_in_windows(
+        ranks,
+        np.tile(starts, 2 * len(quantiles)),
+        np.tile(np.maximum(ends, starts + 1), 2 * len(quantiles)),
+        np.concatenate([k_lo, k_hi])
+    )
+
+    lower = sorted_x[kth[:len(pos)]]
+    upper = sorted_x[kth[len(pos):]]
+    interp = lower + (upper - lower) * (pos - k_lo)
+    interp[np.tile(n, len(quantiles)) == 0] = np.nan
+    return {q: interp[i * len(n):(i + 1) * len(n)] for i, q in enumerate(quantiles)}
+
+def chi2_homogeneity(counts_a, counts_b):
+    """
+    Chi-square test of homogeneity of two binned samples, for every leading index at once
+    (the last axis holds the bins, as scipy.stats.chi2_contingency on a 2 x bins table
+    without continuity correction). Bins empty on both sides are left out of the degrees
+    of freedom.
+
+    Returns:
+        (statistic, degrees of freedom, p-value) arrays; NaN where a side is empty or dof is 0.
+    """
+    a = np.asarray(counts_a, dtype=float)
+    b = np.asarray(counts_b, dtype=float)
+    n_a = a.sum(axis=-1, keepdims=True)
+    n_b = b.sum(axis=-1, keepdims=True)
+    pooled = a + b
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exp_a = n_a * pooled / (n_a + n_b)
+        exp_b = n_b * pooled / (n_a + n_b)
+        terms = np.where(pooled > 0, (a - exp_a) ** 2 / exp_a + (b - exp_b) ** 2 / exp_b, 0.0)
+    stat = terms.sum(axis=-1)
+    dof = (pooled > 0).sum(axis=-1) - 1
+    tested = (n_a[..., 0] > 0) & (n_b[..., 0] > 0) & (dof > 0)
+    return np.where(tested, stat, np.nan), dof, np.where(tested, chi2.sf(stat, np.maximum(dof, 1)), np.nan)
+
+def jensen_shannon(counts_a, counts_b):
+    """
+    Jensen-Shannon divergence (bits, 0 = identical, 1 = disjoint) of two binned samples
+    along the last axis, for every leading index at once. NaN where a side is empty.
+    """
+    a = np.asarray(counts_a, dtype=float)
+    b = np.asarray(counts_b, dtype=float)
+    n_a = a.sum(axis=-1, keepdims=True)
+    n_b = b.sum(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p, q = a / n_a, b / n_b
+        mid = (p + q) / 2
+        js = (rel_entr(p, mid) + rel_entr(q, mid)).sum(axis=-1) / (2 * np.log(2))
+    return np.where((n_a[..., 0] > 0) & (n_b[..., 0] > 0), js, np.nan)
+
+def ks_2samp_segments(seg_a, values_a, seg_b, values_b, n_segments):
+    """
+    Two-sample Kolmogorov-Smirnov test of many sample pairs at once. Both samples are flat
+    value arrays labelled with their segment (0..n_segments-1); one sort orders every
+    segment's pooled values, the two ECDFs are running counts within each segment and the
+    statistic is a segment maximum of their gap, taken after the last of tied values.
+
+    Returns:
+        (statistic, p-value, n_a, n_b) per segment; NaN where a side is empty. p-values are the
+        Kolmogorov distribution with Stephens' small-sample correction, one vectorized call
+        (scipy's per-size exact distribution costs milliseconds per segment).
+    """
+    values_a = np.asarray(values_a, dtype=float)
+    values_b = np.asarray(values_b, dtype=float)
+    keep_a, keep_b = ~np.isnan(values_a), ~np.isnan(values_b)
+    seg = np.concatenate([np.asarray(seg_a)[keep_a], np.asarray(seg_b)[keep_b]]).astype(np.int64)
+    values = np.concatenate([values_a[keep_a], values_b[keep_b]])
+    from_a = np.arange(len(seg)) < keep_a.sum()
+
+    n_a = np.bincount(seg[from_a], minlength=n_segments)
+    n_b = np.bincount(seg[~from_a], minlength=n_segments)
+    stat = np.full(n_segments, np.nan)
+    if len(seg) == 0:
+        return stat, stat.copy(), n_a, n_b
+
+    order = np.lexsort((values, seg))
+    seg, values, from_a = seg[order], values[order], from_a[order]
+    offsets = np.concatenate([[0], np.cumsum(n_a + n_b)])
+
+    # ECDF of each side inside its segment: running count minus the count before the segment
+    run_a = np.cumsum(from_a)
+    run_b = np.arange(1, len(seg) + 1) - run_a
+    filled = np.flatnonzero(n_a + n_b > 0)
+    base_a = np.zeros(n_segments, dtype=np.int64)
+    base_b = np.zeros(n_segments, dtype=np.int64)
+    base_a[filled] = run_a[offsets[filled]] - from_a[offsets[filled]]
+    base_b[filled] = run_b[offsets[filled]] - ~from_a[offsets[filled]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap = np.abs((run_a - base_a[seg]) / n_a[seg] - (run_b - base_b[seg]) / n_b[seg])
+
+    # Only the last of tied values (or a segment's last value) is a step of both ECDFs
+    step = np.ones(len(seg), dtype=bool)
+    step[:-1] = (seg[1:] != seg[:-1]) | (values[1:] != values[:-1])
+    stat[filled] = np.maximum.reduceat(np.where(step, gap, 0.0), offsets[filled])
+
+    tested = (n_a > 0) & (n_b > 0)
+    stat[~tested] = np.nan
+    root_n = np.sqrt(n_a * n_b / np.maximum(n_a + n_b, 1))
+    p = np.full(n_segments, np.nan)
+    p[tested] = np.clip(kolmogorov((root_n[tested] + 0.12 + 0.11 / root_n[tested]) * stat[tested]), 0.0, 1.0)
+    return stat, p, n_a, n_b
+
+def benjamini_hochberg(p_values):
+    """
+    Benjamini-Hochberg q-values (false discovery rate adjusted p-values) of a p-value array
+    of any shape; NaN entries are not counted as tests and stay NaN.
+    """
+    p = np.asarray(p_values, dtype=float)
+    q = np.full(p.shape, np.nan)
+    tested = ~np.isnan(p)
+    m = int(tested.sum())
+    if m == 0:
+        return q
 
-def calculate_efficiency(distance, duration_seconds):
-    """Calculates distance per unit of time (minutes)."""
-    duration_minutes = duration_seconds / 60
-    return distance / duration_minutes if duration_minutes > 0 else 0
+    order = np.argsort(p[tested])
+    scaled = p[tested][order] * m / np.arange(1, m + 1)
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    q[tested] = adjusted
+    return q
@@ -0,0 +1,112 @@
+"""
+Per-call memory allocations of the engine entry points, measured with tracemalloc.
+
+    python -m benchmarks.engine_allocations [Crossover_Stats.csv] [Impulse_Reversal.csv] [--baseline REV]
+
+For every engine the table shows the peak memory allocated during one call, the memory the
+call leaves behind (its result plus anything written into the input frames), the wall time,
+and whether the call changed the columns of its input frames.
+
+--baseline measures the same entry points as of a git revision (e.g. the commit before the
+read-only engines) and prints its table next to the working tree's. The revision is
+extracted with git archive to a temporary directory and run there in a subprocess, loading
+the exports with its own validation code.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from data.validation import load_and_validate_stats, load_and_validate_impulse
+from engines.trend_engine import run_trend_analysis
+from engines.impulse_engine import run_impulse_analysis
+from engines.fusion_engine import run_fusion_analysis
+from engines.heatmap_engine import calculate_heatmap_matrix, calculate_session_comparison_matrix
+
+HEATMAP_RANGES = [(10, 20), (21, 30), (31, 40), (41, 50), (51, 60), (61, 70), (71, 80), (81, 90), (91, 100), (100, 150), (151, 200)]
+REPEATS = 3
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(fn, *frames, **kwargs):
+    """Peak and retained bytes, seconds per call (each the minimum over REPEATS calls) and whether the inputs were modified."""
+    columns = [tuple(df.columns) for df in frames]
+    fn(*frames, **kwargs)  # warm-up (imports, caches)
+    mutated = [tuple(df.columns) for df in frames] != columns
+
+    peak = retained = elapsed = float('inf')
+    for _ in range(REPEATS):
+        tracemalloc.start()
+        result = fn(*frames, **kwargs)
+        current, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        peak, retained = min(peak, traced_peak), min(retained, current)
+
+        # Timed separately: tracing slows down allocation-heavy code unevenly
+        started = time.perf_counter()
+        fn(*frames, **kwargs)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    return {'Peak (KiB)': peak / 1024, 'Retained (KiB)': retained / 1024, 'Time (ms)': elapsed * 1000, 'Mutates Input': mutated}
+
+def measure_engines(stats_path, impulse_path):
+    """One measure() row per engine entry point, on the given exports (and the export sizes)."""
+    stats = load_and_validate_stats(stats_path)
+    impulses = load_and_validate_impulse(impulse_path)
+
+    rows = {
+        'run_trend_analysis': measure(run_trend_analysis, stats),
+        'run_impulse_analysis': measure(run_impulse_analysis, impulses),
+        'run_fusion_analysis': measure(run_fusion_analysis, stats, impulses),
+        'calculate_heatmap_matrix': measure(calculate_heatmap_matrix, impulses, ranges=HEATMAP_RANGES),
+        'calculate_session_comparison_matrix': measure(calculate_session_comparison_matrix, impulses),
+    }
+    return pd.DataFrame(rows).T, (len(stats), len(impulses))
+
+def measure_revision(rev, stats_path, impulse_path):
+    """measure_engines() of the tree at a git revision, run with this script in a copy of that tree."""
+    with tempfile.TemporaryDirectory() as tree:
+        archive = subprocess.run(["git", "archive", "--format=tar", rev], cwd=ROOT, capture_output=True, check=True).stdout
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(tree, filter='data')
+        os.makedirs(os.path.join(tree, "benchmarks"), exist_ok=True)
+        shutil.copy(os.path.abspath(__file__), os.path.join(tree, "benchmarks", "engine_allocations.py"))
+
+        out = subprocess.run([sys.executable, "-m", "benchmarks.engine_allocations", "--json",
+                              os.path.abspath(stats_path), os.path.abspath(impulse_path)],
+                             cwd=tree, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"Benchmark of {rev} failed:\n{out.stderr}")
+        return pd.DataFrame(json.loads(out.stdout)).T
+
+def main(stats_path="Crossover_Stats.csv", impulse_path="Impulse_Reversal.csv", baseline=None, as_json=False):
+    current, (n_stats, n_impulses) = measure_engines(stats_path, impulse_path)
+    if as_json:
+        print(json.dumps(current.T.to_dict()))
+        return
+
+    print(f"{n_stats:,} trends | {n_impulses:,} impulses | {REPEATS} calls each\n")
+    fmt = lambda v: f"{v:,.1f}"
+    if baseline is None:
+        print(current.to_string(float_format=fmt))
+        return
+
+    before = measure_revision(baseline, stats_path, impulse_path)
+    table = pd.concat({baseline: before, "working tree": current}, axis=1).swaplevel(axis=1)
+    table = table[[(col, side) for col in current.columns for side in (baseline, "working tree")]]
+    print(table.to_string(float_format=fmt))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call allocations of the engine entry points")
+    parser.add_argument("stats", nargs="?", default="Crossover_Stats.csv")
+    parser.add_argument("impulse", nargs="?", default="Impulse_Reversal.csv")
+    parser.add_argument("--baseline", default=None, metavar="REV", help="Also measure the engines as of this git revision")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    main(args.stats, args.impulse, baseline=args.baseline, as_json=args.json)
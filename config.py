@@ -32,6 +32,162 @@ COLS_IMPULSE = [
     "Symbol", "TF", "MAPeriod", "MAType", "ScanStart", "ScanEnd"
 ]
 
+# --- EA Schema Versions ---
+# The EA's CSV layout grew over time; the version is detected from the header.
+# v1: core columns | v2: + Session columns | v3: + percentage columns (current)
+STATS_SCHEMAS = {
+    1: [c for c in COLS_STATS if not c.startswith("Session_") and c != "PriceMove%"],
+    2: [c for c in COLS_STATS if c != "PriceMove%"],
+    3: COLS_STATS,
+}
+
+IMPULSE_SCHEMAS = {
+    1: [c for c in COLS_IMPULSE if not c.startswith("Session_") and c not in ("Impulse%", "Reversal%_Peak")],
+    2: [c for c in COLS_IMPULSE if c not in ("Impulse%", "Reversal%_Peak")],
+    3: COLS_IMPULSE,
+}
+
+# --- Column Projection (read only what an analysis needs) ---
+# Metadata and validation keys are always read.
+COLS_META = ["Symbol", "TF", "MAPeriod", "MAType", "ScanStart", "ScanEnd"]
+KEYS_STATS = ["StartTime", "EndTime", "Direction", "StartPrice", "Distance"]
+KEYS_IMPULSE = ["Time", "Direction", "BasePrice", "Reversal%"]
+
+STATS_ANALYSIS_COLS = {
+    "trend": ["Session_Start", "Session_End", "PriceMove%", "StartATR_Live"],
+    "fusion": ["EndPrice", "MaxMinPrice", "StartATR_Live", "Session_Start"],
+    "timing": [],  # trend spans (keys only) for the impulses' TimeToTrigger_Min
+}
+
+IMPULSE_ANALYSIS_COLS = {
+    "behavior": ["Impulse", "Pullback", "BaseATR_Live", "Impulse%", "Session_Base", "Session_Peak", "Session_Trigger"],
+    "fusion": ["Peak", "Impulse", "Pullback", "BaseATR_Closed", "BaseATR_Live", "PeakATR_Closed", "PeakATR_Live", "Session_Peak"],
+    "price_move": ["Impulse", "BaseATR_Live", "Impulse%", "Session_Base", "Session_Peak", "Session_Trigger"],
+}
+
+# Fields identifying one event across overlapping exports (the EA runs one trend at a time
+# and logs at most one impulse per bar), plus the time column each export is ordered by
+DEDUP_KEYS_STATS = ["StartTime", "Direction"]
+DEDUP_KEYS_IMPULSE = ["Time", "Direction", "BasePrice"]
+RUN_SIGNATURE_COLS = ["Symbol", "TF", "MAPeriod", "MAType"]
+
+# MT5 TimeToString() default layout, parsed explicitly to skip format inference
+EA_TIME_FORMAT = "%Y.%m.%d %H:%M"
+
+# --- Session Schemes ---
+# Windows are (name, start, end[, days]) in IST "HH:MM", like the EA's GetSessionName():
+# start inclusive, end exclusive, wrapping past midnight when end <= start.
+# days (optional) limits a window to IST weekdays, 0 = Monday. Where windows overlap the
+# later entry wins (EA priority: NEW YORK > LONDON > TOKYO > SYDNEY); uncovered minutes are NONE.
+SESSION_TZ_OFFSET_MIN = 330  # IST = GMT + 5:30
+SESSION_SCHEME_EA = "EA Default (IST)"
+SESSION_SCHEMES = {
+    SESSION_SCHEME_EA: [
+        ("SYDNEY", "02:30", "11:30"),
+        ("TOKYO", "05:30", "14:30"),
+        ("LONDON", "12:30", "21:30"),
+        ("NEW YORK", "17:30", "02:30"),
+    ],
+    "London-NY Overlap Bucket": [
+        ("SYDNEY", "02:30", "11:30"),
+        ("TOKYO", "05:30", "14:30"),
+        ("LONDON", "12:30", "21:30"),
+        ("NEW YORK", "17:30", "02:30"),
+        ("LDN-NY OVERLAP", "17:30", "21:30"),
+    ],
+    "Northern Summer DST (IST)": [
+        ("SYDNEY", "02:30", "11:30"),
+        ("TOKYO", "05:30", "14:30"),
+        ("LONDON", "11:30", "20:30"),
+        ("NEW YORK", "16:30", "01:30"),
+    ],
+    "Non-Overlapping": [
+        ("SYDNEY", "02:30", "05:30"),
+        ("TOKYO", "05:30", "12:30"),
+        ("LONDON", "12:30", "17:30"),
+        ("NEW YORK", "17:30", "02:30"),
+    ],
+}
+
+# Session columns the EA derives from an exported timestamp (re-taggable from the CSV).
+# Session_Peak / Session_Base use peak/base bar times that the EA does not export.
+SESSION_TIME_COLS = {
+    "Session_Start": "StartTime",
+    "Session_End": "EndTime",
+    "Session_Trigger": "Time",
+}
+# v1 exports have no session columns; the untimed ones are approximated from the nearest
+# exported timestamp (first match per column): trend peak ~ EndTime, impulse base/peak ~ trigger Time.
+SESSION_PROXY_TIME_COLS = [
+    ("Session_Peak", "EndTime"),
+    ("Session_Peak", "Time"),
+    ("Session_Base", "Time"),
+]
+
+# --- OHLC Bar Store ---
+# MT5 history exports converted to one memory-mapped file per column (see data/bar_store.py)
+BAR_STORE_DIR = os.path.join(BASE_DIR, "bar_store")
+BAR_COLUMNS = {"time": "<i8", "open": "<f8", "high": "<f8", "low": "<f8", "close": "<f8", "volume": "<i8"}
+# Bar length in seconds; higher timeframes are aligned to broker-time multiples (like MT5)
+TIMEFRAMES = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400}
+
+# --- Analytics Service (python -m service.server) ---
+ANALYTICS_SERVICE_HOST = "127.0.0.1"
+ANALYTICS_SERVICE_PORT = 8765
+# Dashboard default; empty computes everything in the dashboard process
+ANALYTICS_SERVICE_URL = os.environ.get("ANALYTICS_SERVICE_URL", "")
+SERVICE_CACHE_BYTES = 512 * 1024 ** 2  # Memory for results (and filtered frames) per service, least recently used dropped
+SERVICE_PAGE_ROWS = 50_000  # Most rows the service sends per /rows request
+SERVICE_MAX_DATASETS = 16  # Parsed exports kept per service, least recently used dropped
+
+# --- Intraday Profiles (engines/profile_engine.py) ---
+PROFILE_RESOLUTIONS_MIN = [1, 5, 15, 60]  # Bucket sizes; each divides the next, so views roll up from minutes
+PROFILE_SKETCH_STEP = 1.0    # Reversal% histogram bin width of the per-bucket quantile sketch
+PROFILE_SKETCH_MAX = 200.0   # Values above fall into one overflow bin
+
+# --- Report Export (engines/report_export.py) ---
+# Chart kinds rendered per dataset; heatmaps cover Global Master + every session, per period and direction
+REPORT_CHARTS = ["distance_distribution", "duration_vs_distance", "reversal_distribution", "impulse_vs_pullback",
+                 "heatmap_2d", "heatmap_3d"]
+REPORT_PERIOD_TYPE = "Month-wise"  # engines/temporal_analysis.py periods ("All Months" + each month)
+REPORT_DIRECTIONS = ["BULLISH", "BEARISH"]
+REPORT_TEMPLATE = "plotly_dark"
+REPORT_WORKERS = None  # Render processes; None = one per CPU
+
+# --- Heatmap Cell Statistics (engines/heatmap_engine.py) ---
+# Per-cell statistics next to count/row %: label -> (column, 'mean' | 'median' | 'pNN')
+HEATMAP_CELL_STATS = {
+    "Median ATR": ("BaseATR_Live", "median"),
+    "P90 ATR": ("BaseATR_Live", "p90"),
+    "Mean Pullback": ("Pullback", "mean"),
+    "Median Pullback": ("Pullback", "median"),
+    "Mean Impulse%": ("Impulse%", "mean"),
+    "Median Impulse%": ("Impulse%", "median"),
+    "Median Time to Trigger (Min)": ("TimeToTrigger_Min", "median"),
+}
+
+# --- Reversal Odds Tables (engines/reversal_cdf.py) ---
+# Conditional CDFs of Reversal% per (Direction, Session, Impulse bucket), exportable to the EA
+CDF_IMPULSE_COL = "Impulse"
+CDF_SESSION_COL = "Session_Peak"
+CDF_IMPULSE_BUCKETS = 8      # Equal-count Impulse buckets when no edges are given
+CDF_REVERSAL_STEP = 1.0      # Reversal% grid step of the cumulative counts
+CDF_REVERSAL_MAX = 200.0     # Last grid point; deeper reversals only count in N
+CDF_MIN_EVENTS = 30          # Cells with fewer events are flagged as unreliable
+
+# --- Event Study (engines/event_study.py) ---
+# Bar windows around events, from the OHLC bar store
+EVENT_STUDY_BARS_BEFORE = 20
+EVENT_STUDY_BARS_AFTER = 60
+EVENT_STUDY_ATR_PERIOD = 14  # Entry ATR (simple average of True Range, like the EA) for ATR-normalized paths
+EVENT_STUDY_QUANTILES = [0.10, 0.25, 0.50, 0.75, 0.90]
+
+# --- Drift Detection (engines/drift_engine.py) ---
+# Baseline vs current Impulse x Reversal heatmaps, per Session x Direction x Month
+DRIFT_ALPHA = 0.01       # False discovery rate of the drift flags (Benjamini-Hochberg over every test)
+DRIFT_MIN_EVENTS = 30    # Heatmaps/rows with fewer events on either side are not tested
+DRIFT_CELL_Z = 3.0       # |z| of a cell's two-proportion test that is highlighted in the difference heatmap
+
 # --- Validation Settings ---
 STRICT_VALIDATION = True
 VALID_DIRECTIONS = ["BULLISH", "BEARISH"]
@@ -0,0 +1,277 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import config
+
+# MT5 "Export Bars" headers (<DATE> <TIME> <OPEN> ... <TICKVOL> <VOL> <SPREAD>) and plain
+# CSV headers (Time,Open,...,Volume), normalized to lower case without the angle brackets
+_VOLUME_SOURCES = ["tickvol", "volume", "vol", "tick_volume", "real_volume"]
+_META_FILE = "meta.json"
+
+def _store_path(symbol, timeframe, root=None):
+    return os.path.join(root or config.BAR_STORE_DIR, symbol, timeframe)
+
+def _read_meta(path):
+    meta_path = os.path.join(path, _META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as fh:
+        return json.load(fh)
+
+def _write_meta(path, meta):
+    """The meta file is written last, so a store without one is an unfinished write."""
+    tmp_path = os.path.join(path, _META_FILE + ".tmp")
+    with open(tmp_path, "w") as fh:
+        json.dump(meta, fh, indent=1)
+    os.replace(tmp_path, os.path.join(path, _META_FILE))
+
+def list_symbols(root=None):
+    """Symbols that have a bar store, with the timeframes stored for each."""
+    root = root or config.BAR_STORE_DIR
+    if not os.path.isdir(root):
+        return {}
+    stored = {}
+    for symbol in sorted(os.listdir(root)):
+        timeframes = [tf for tf in config.TIMEFRAMES if _read_meta(_store_path(symbol, tf, root))]
+        if timeframes:
+            stored[symbol] = timeframes
+    return stored
+
+def store_meta(symbol, timeframe, root=None):
+    """Meta of a stored timeframe (rows, first/last bar time, resample source), None if not stored."""
+    return _read_meta(_store_path(symbol, timeframe, root))
+
+def _normalize_header(columns):
+    return [str(c).strip().strip('<>').strip().lower() for c in columns]
+
+def _parse_bar_chunk(chunk):
+    """One chunk of an MT5 history export -> (epoch seconds, open, high, low, close, volume)."""
+    chunk.columns = _normalize_header(chunk.columns)
+    if 'date' in chunk.columns and 'time' in chunk.columns:
+        stamps = chunk['date'].astype(str) + ' ' + chunk['time'].astype(str)
+    else:
+        stamps = chunk['time' if 'time' in chunk.columns else 'date'].astype(str)
+
+    try:
+        times = pd.to_datetime(stamps, format="%Y.%m.%d %H:%M:%S")
+    except (ValueError, TypeError):
+        times = pd.to_datetime(stamps)
+
+    volume_col = next((c for c in _VOLUME_SOURCES if c in chunk.columns), None)
+    volume = chunk[volume_col].to_numpy(np.int64) if volume_col else np.zeros(len(chunk), dtype=np.int64)
+    return {
+        'time': times.to_numpy().astype('datetime64[s]').astype(np.int64),
+        'open': chunk['open'].to_numpy(np.float64),
+        'high': chunk['high'].to_numpy(np.float64),
+        'low': chunk['low'].to_numpy(np.float64),
+        'close': chunk['close'].to_numpy(np.float64),
+        'volume': volume,
+    }
+
+def _sniff_separator(source):
+    """MT5 exports are tab separated, hand-made files usually comma separated."""
+    if hasattr(source, 'read'):
+        first = source.readline()
+        source.seek(0)
+    else:
+        with open(source, 'rb') as fh:
+            first = fh.readline()
+    if isinstance(first, bytes):
+        first = first.decode('utf-8', errors='ignore')
+    return '\t' if '\t' in first else ','
+
+def _infer_timeframe(times):
+    """Smallest stored timeframe matching the most common bar spacing."""
+    if len(times) < 2:
+        return "M1"
+    spacing = np.diff(times[:10_000])
+    values, counts = np.unique(spacing[spacing > 0], return_counts=True)
+    step = int(values[counts.argmax()]) if len(values) else 60
+    return next((tf for tf, seconds in config.TIMEFRAMES.items() if seconds >= step), "D1")
+
+def import_mt5_history(source, symbol, root=None, timeframe=None, chunksize=1_000_000):
+    """
+    Converts an MT5 history CSV into the symbol's memory-mapped bar store.
+
+    The file is streamed in chunks and appended column by column to fixed-dtype files
+    (config.BAR_COLUMNS), so a multi-gigabyte export never has to fit in memory. Cached
+    resamples of the symbol are dropped.
+
+    Args:
+        source: Path or file-like object of the export (MT5 'Export Bars' or Time,Open,... CSV).
+        symbol: Store name, e.g. 'EURUSD'.
+        root: Store directory (default config.BAR_STORE_DIR).
+        timeframe: Timeframe of the export; None infers it from the bar spacing.
+        chunksize: Rows parsed per chunk.
+
+    Returns:
+        The stored timeframe's meta dict.
+
+    Raises:
+        ValueError: If the bars are not in ascending time order.
+    """
+    sep = _sniff_separator(source)
+    staging = os.path.join(root or config.BAR_STORE_DIR, symbol, "_import")
+    os.makedirs(staging, exist_ok=True)
+    handles = {col: open(os.path.join(staging, col), 'wb') for col in config.BAR_COLUMNS}
+
+    rows, first, last = 0, None, None
+    try:
+        for chunk in pd.read_csv(source, sep=sep, chunksize=chunksize):
+            bars = _parse_bar_chunk(chunk)
+            times = bars['time']
+            if len(times) == 0:
+                continue
+            if np.any(np.diff(times) <= 0) or (last is not None and times[0] <= last):
+                raise ValueError(f"Bars of {symbol} are not in ascending time order (near row {rows:,})")
+            if timeframe is None:
+                timeframe = _infer_timeframe(times)
+            for col, dtype in config.BAR_COLUMNS.items():
+                bars[col].astype(dtype, copy=False).tofile(handles[col])
+            first = int(times[0]) if first is None else first
+            last = int(times[-1])
+            rows += len(times)
+    finally:
+        for fh in handles.values():
+            fh.close()
+
+    timeframe = timeframe or "M1"
+    path = _store_path(symbol, timeframe, root)
+    clear_resample_cache(symbol, root)
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, _META_FILE)):
+        os.remove(os.path.join(path, _META_FILE))
+    for col in config.BAR_COLUMNS:
+        os.replace(os.path.join(staging, col), os.path.join(path, col))
+    os.rmdir(staging)
+
+    meta = {'symbol': symbol, 'timeframe': timeframe, 'rows': rows, 'first': first, 'last': last,
+            'columns': config.BAR_COLUMNS, 'source': None}
+    _write_meta(path, meta)
+    return meta
+
+def _map_columns(path, meta):
+    """Read-only memory maps of a store's columns; 'time' is exposed as datetime64[s]."""
+    bars = {'symbol': meta['symbol'], 'timeframe': meta['timeframe']}
+    for col, dtype in meta['columns'].items():
+        if meta['rows'] == 0:
+            values = np.empty(0, dtype=dtype)
+        else:
+            values = np.memmap(os.path.join(path, col), dtype=dtype, mode='r', shape=(meta['rows'],))
+        bars[col] = values.view('datetime64[s]') if col == 'time' else values
+    return bars
+
+def open_bars(symbol, timeframe="M1", root=None):
+    """
+    Opens a symbol's bars without reading them: every column is a read-only memory map, so
+    opening costs the same for a day or ten years of M1 bars. Timeframes above the stored
+    one are resampled on first use and cached on disk next to it.
+
+    Returns:
+        Dict with 'symbol', 'timeframe' and one array per column of config.BAR_COLUMNS.
+
+    Raises:
+        FileNotFoundError: If the symbol has no bars at or below the requested timeframe.
+    """
+    path = _store_path(symbol, timeframe, root)
+    meta = _read_meta(path)
+    if meta is not None and _is_fresh(meta, root):
+        return _map_columns(path, meta)
+
+    base = _base_timeframe(symbol, timeframe, root)
+    if base is None:
+        raise FileNotFoundError(f"No bars of {symbol} at or below {timeframe} in the bar store")
+    return _map_columns(path, _write_resample(open_bars(symbol, base, root), timeframe, root))
+
+def _base_timeframe(symbol, timeframe, root):
+    """The imported (non-resampled) timeframe a resample is built from."""
+    for tf, seconds in config.TIMEFRAMES.items():
+        if seconds >= config.TIMEFRAMES[timeframe]:
+            break
+        meta = _read_meta(_store_path(symbol, tf, root))
+        if meta is not None and meta['source'] is None:
+            return tf
+    return None
+
+def _is_fresh(meta, root):
+    """A cached resample is valid while its source still holds the same bars."""
+    if meta['source'] is None:
+        return True
+    source = _read_meta(_store_path(meta['symbol'], meta['source']['timeframe'], root))
+    return source is not None and source['rows'] == meta['source']['rows'] and source['last'] == meta['source']['last']
+
+def clear_resample_cache(symbol, root=None):
+    """Drops the cached resamples of a symbol (called when its bars are re-imported)."""
+    for tf in config.TIMEFRAMES:
+        path = _store_path(symbol, tf, root)
+        meta = _read_meta(path)
+        if meta is not None and meta['source'] is not None:
+            os.remove(os.path.join(path, _META_FILE))
+
+def slice_bars(bars, start=None, end=None):
+    """
+    Bars with start <= time <= end, found with two binary searches on the sorted time column.
+    The result holds views of the maps, so no bar data is read or copied.
+    """
+    times = bars['time']
+    lo = 0 if start is None else np.searchsorted(times, np.datetime64(pd.Timestamp(start), 's'), side='left')
+    hi = len(times) if end is None else np.searchsorted(times, np.datetime64(pd.Timestamp(end), 's'), side='right')
+    return {col: (values[lo:hi] if isinstance(values, np.ndarray) else values) for col, values in bars.items()}
+
+def resample_bars(bars, timeframe):
+    """
+    Aggregates bars to a higher timeframe: first open, max high, min low, last close and
+    summed volume per period. Periods are broker-time multiples of the bar length (H4 at
+    00/04/08..., D1 at midnight), as in MT5; periods without bars are not created.
+
+    All aggregates are reductions over the period boundaries (np.*.reduceat), one pass per
+    column regardless of the number of periods.
+    """
+    seconds = config.TIMEFRAMES[timeframe]
+    times = bars['time'].view(np.int64)
+    resampled = {'symbol': bars['symbol'], 'timeframe': timeframe}
+    if len(times) == 0:
+        for col, dtype in config.BAR_COLUMNS.items():
+            resampled[col] = np.empty(0, dtype=dtype)
+        resampled['time'] = resampled['time'].view('datetime64[s]')
+        return resampled
+
+    periods = times // seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(periods)) + 1))
+    ends = np.append(starts[1:], len(times)) - 1
+
+    resampled['time'] = (periods[starts] * seconds).view('datetime64[s]')
+    resampled['open'] = np.asarray(bars['open'][starts])
+    resampled['high'] = np.maximum.reduceat(bars['high'], starts)
+    resampled['low'] = np.minimum.reduceat(bars['low'], starts)
+    resampled['close'] = np.asarray(bars['close'][ends])
+    resampled['volume'] = np.add.reduceat(bars['volume'], starts)
+    return resampled
+
+def _write_resample(base, timeframe, root):
+    """Resamples base bars to timeframe and stores the result as a cached timeframe."""
+    resampled = resample_bars(base, timeframe)
+    path = _store_path(base['symbol'], timeframe, root)
+    os.makedirs(path, exist_ok=True)
+    # Replaced, not overwritten: maps of a stale resample that are still open keep their data
+    for col, dtype in config.BAR_COLUMNS.items():
+        values = resampled[col].view(np.int64) if col == 'time' else resampled[col]
+        values.astype(dtype, copy=False).tofile(os.path.join(path, col + ".tmp"))
+        os.replace(os.path.join(path, col + ".tmp"), os.path.join(path, col))
+
+    times = resampled['time'].view(np.int64)
+    source_times = base['time'].view(np.int64)
+    meta = {
+        'symbol': base['symbol'], 'timeframe': timeframe, 'rows': len(times),
+        'first': int(times[0]) if len(times) else None, 'last': int(times[-1]) if len(times) else None,
+        'columns': config.BAR_COLUMNS,
+        'source': {'timeframe': base['timeframe'], 'rows': len(source_times),
+                   'last': int(source_times[-1]) if len(source_times) else None},
+    }
+    _write_meta(path, meta)
+    return meta
+
+def bars_frame(bars):
+    """Bars as a DataFrame (copies the data; meant for slices that are plotted or tabulated)."""
+    return pd.DataFrame({col: np.asarray(bars[col]) for col in config.BAR_COLUMNS})
@@ -0,0 +1,94 @@
+import pandas as pd
+from data.validation import filter_by_days
+
+# Row filters of the dashboard tabs. They are shared with the analytics service, so a
+# filtered dataset is the same whether it is computed in the dashboard or in the service.
+
+def apply_multi_range_filter(df, column, ranges):
+    """Filters dataframe where column value matches ANY of the provided ranges"""
+    if not ranges:
+        return df
+    mask = pd.Series(False, index=df.index)
+    for start, end in ranges:
+        mask |= (df[column] >= start) & (df[column] <= end)
+    return df[mask]
+
+def filter_by_date_range(df, time_col, date_range):
+    """Keeps rows whose date is inside [start, end]; date_range holds 2 dates (or ISO strings), else no-op."""
+    if len(date_range) != 2:
+        return df
+    start_date, end_date = (pd.Timestamp(d).date() for d in date_range)
+    df[time_col] = pd.to_datetime(df[time_col]) # Ensure datetime type
+    return df[
+        (df[time_col].dt.date >= start_date) &
+        (df[time_col].dt.date <= end_date)
+    ]
+
+def filter_trends(df_raw, selected_days_local, date_range, imp_ranges, min_dist):
+    """Day, date, Distance-band and minimum-distance filters of the trend tab."""
+    df_filtered = filter_by_days(df_raw, selected_days_local).copy()
+    df_filtered = filter_by_date_range(df_filtered, 'StartTime', date_range)
+
+    # Impulse Range (Distance) Filter (using imp_ranges from sidebar)
+    df_filtered = apply_multi_range_filter(df_filtered, 'Distance', imp_ranges)
+
+    # Apply min_dist filter
+    df_filtered = df_filtered[df_filtered['Distance'] >= min_dist].copy()
+    return df_filtered
+
+def filter_impulses(df_raw, selected_days, date_range, imp_ranges, rev_ranges, min_impulse_local):
+    """Day, date, Impulse/Reversal-band and minimum-impulse filters of the impulse tab."""
+    df_filtered = filter_by_days(df_raw, selected_days).copy()
+    df_filtered = filter_by_date_range(df_filtered, 'Time', date_range)
+
+    # Impulse Range (Impulse column) Filter
+    df_filtered = apply_multi_range_filter(df_filtered, 'Impulse', imp_ranges)
+
+    # Reversal % Range Filter
+    df_filtered = apply_multi_range_filter(df_filtered, 'Reversal%', rev_ranges)
+
+    # Apply min_impulse_local filter (if not already covered by imp_ranges)
+    # This ensures the slider filter is still respected.
+    if min_impulse_local > 0:
+        df_filtered = df_filtered[df_filtered['Impulse'] >= min_impulse_local].copy()
+    return df_filtered
+
+def apply_session_coherence(df_filtered, show_samesess):
+    """Same-session ratio of the filtered events, optionally keeping only those events."""
+    # Calculate Same-Session Metric before filtering
+    if 'Session_Base' in df_filtered.columns and 'Session_Trigger' in df_filtered.columns:
+        # Strict Definition: Base, Peak, and Trigger must match
+        # ("crossover impulse and reversal was there in the same session")
+        same_sess_mask = (df_filtered['Session_Base'] == df_filtered['Session_Peak']) & (df_filtered['Session_Peak'] == df_filtered['Session_Trigger'])
+        same_sess_count = same_sess_mask.sum()
+        same_sess_ratio = (same_sess_count / len(df_filtered) * 100) if len(df_filtered) > 0 else 0
+    else:
+        same_sess_ratio = 0
+        same_sess_mask = pd.Series([True]*len(df_filtered), index=df_filtered.index)
+
+    if show_samesess:
+        df_filtered = df_filtered[same_sess_mask].copy()
+    return df_filtered, same_sess_ratio
+
+def filter_price_moves(df_raw, selected_days, min_imp):
+    """Day and minimum Impulse% filters of the price movement tab."""
+    df_pm = filter_by_days(df_raw, selected_days).copy()
+    return df_pm[df_pm['Impulse%'] >= min_imp]
+
+def filter_fusion_inputs(stats_raw, impulse_raw, selected_days, date_range, imp_ranges, rev_ranges, min_impulse_fusion):
+    """Filters of the fusion tab, applied to both exports: (stats, impulses)."""
+    # 1. Stats DF
+    df_stats_filtered = filter_by_days(stats_raw, selected_days).copy()
+    df_stats_filtered = filter_by_date_range(df_stats_filtered, 'StartTime', date_range)
+    df_stats_filtered = apply_multi_range_filter(df_stats_filtered, 'Distance', imp_ranges)
+
+    # 2. Impulse DF
+    df_imp_filtered = filter_by_days(impulse_raw, selected_days).copy()
+    df_imp_filtered = filter_by_date_range(df_imp_filtered, 'Time', date_range)
+    df_imp_filtered = apply_multi_range_filter(df_imp_filtered, 'Impulse', imp_ranges)
+    df_imp_filtered = apply_multi_range_filter(df_imp_filtered, 'Reversal%', rev_ranges)
+
+    # Apply min_impulse_fusion filter
+    if min_impulse_fusion > 0:
+        df_imp_filtered = df_imp_filtered[df_imp_filtered['Impulse'] >= min_impulse_fusion].copy()
+    return df_stats_filtered, df_imp_filtered
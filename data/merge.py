@@ -0,0 +1,115 @@
+import pandas as pd
+import numpy as np
+import config
+
+# Identifying fields and ordering column per export kind
+MERGE_KEYS = {'stats': config.DEDUP_KEYS_STATS, 'impulse': config.DEDUP_KEYS_IMPULSE}
+TIME_COLS = {'stats': 'StartTime', 'impulse': 'Time'}
+
+def event_keys(df, key_cols):
+    """Stable 64-bit hash of each event's identifying fields (same event -> same key in every export)."""
+    return pd.util.hash_pandas_object(df[key_cols], index=False).to_numpy()
+
+def _run_signature(df):
+    """Symbol/TF/MAPeriod/MAType of an export; an export must come from a single EA run setup."""
+    signature = []
+    for col in config.RUN_SIGNATURE_COLS:
+        values = df[col].dropna().unique()
+        if len(values) > 1:
+            raise ValueError(f"Export mixes several {col} values: {list(values)}")
+        signature.append(values[0] if len(values) else None)
+    return tuple(signature)
+
+def new_history(kind):
+    """Empty event history for 'stats' (Crossover_Stats) or 'impulse' (Impulse_Reversal) exports."""
+    return {'kind': kind, 'signature': None, 'chunks': [], 'n_exports': 0, 'n_rows_in': 0, 'n_duplicates': 0}
+
+def append_export(history, df):
+    """
+    Adds the events of one export that the history does not hold yet.
+
+    Every export is stored as a time-sorted chunk with its event keys. A new export can only
+    repeat events inside its own time span, so each chunk is cut to that span with two binary
+    searches and only those keys are compared: the cost follows the export's size (plus its
+    overlap), not the size of the whole history. Events already in the history win.
+
+    Raises:
+        ValueError: If the export comes from another Symbol/TF/MAPeriod/MAType setup.
+    """
+    history['n_exports'] += 1
+    history['n_rows_in'] += len(df)
+    if df.empty:
+        return history
+
+    signature = _run_signature(df)
+    if history['signature'] is None:
+        history['signature'] = signature
+    elif signature != history['signature']:
+        labels = ", ".join(f"{c}={v}" for c, v in zip(config.RUN_SIGNATURE_COLS, history['signature']))
+        raise ValueError(f"Cannot merge exports of different EA setups (history: {labels}; export: {signature})")
+
+    time_col = TIME_COLS[history['kind']]
+    df = df.sort_values(time_col, kind='stable')
+    times = df[time_col].to_numpy()
+    keys = event_keys(df, MERGE_KEYS[history['kind']])
+
+    # 1. Duplicates inside the export itself (e.g. a concatenated file)
+    fresh = ~pd.Series(keys).duplicated().to_numpy()
+
+    # 2. Keys of history events inside the export's time span
+    seen = []
+    for chunk in history['chunks']:
+        if chunk['end'] < times[0] or chunk['start'] > times[-1]:
+            continue
+        lo = np.searchsorted(chunk['times'], times[0], side='left')
+        hi = np.searchsorted(chunk['times'], times[-1], side='right')
+        seen.append(chunk['keys'][lo:hi])
+    if seen:
+        fresh &= ~np.isin(keys, np.concatenate(seen))
+
+    history['n_duplicates'] += int((~fresh).sum())
+    if fresh.any():
+        history['chunks'].append({
+            'frame': df[fresh],
+            'times': times[fresh],
+            'keys': keys[fresh],
+            'start': times[fresh][0],
+            'end': times[fresh][-1],
+        })
+    return history
+
+def history_frame(history):
+    """
+    The deduplicated history as one time-ordered DataFrame.
+    attrs carry the oldest schema version, the number of exports and the duplicates dropped.
+    """
+    chunks = sorted(history['chunks'], key=lambda c: c['start'])
+    if not chunks:
+        return pd.DataFrame()
+
+    df = pd.concat([c['frame'] for c in chunks], ignore_index=True)
+
+    # Chunks are sorted internally; only interleaving chunks need a re-sort
+    disjoint = all(prev['end'] <= nxt['start'] for prev, nxt in zip(chunks, chunks[1:]))
+    if not disjoint:
+        df = df.sort_values(TIME_COLS[history['kind']], kind='stable', ignore_index=True)
+
+    versions = [c['frame'].attrs.get('schema_version') for c in chunks if c['frame'].attrs.get('schema_version')]
+    if versions:
+        df.attrs['schema_version'] = min(versions)
+    df.attrs['merged_exports'] = history['n_exports']
+    df.attrs['duplicates_dropped'] = history['n_duplicates']
+    return df
+
+def merge_exports(frames, kind):
+    """
+    Combines several loaded exports of the same EA setup into one deduplicated history.
+
+    Args:
+        frames: DataFrames from load_and_validate_stats / load_and_validate_impulse.
+        kind: 'stats' or 'impulse'.
+    """
+    history = new_history(kind)
+    for df in frames:
+        append_export(history, df)
+    return history_frame(history)
@@ -2,6 +2,18 @@ import pandas as pd
 import io
 import config
 
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Derived columns, computed when needed via ensure_derived_columns() / with_derived_columns()
+DERIVED_COLUMNS = {
+    'DayOfWeek': lambda df: df[_event_time_col(df)].dt.day_name(),
+    'Duration_Min': lambda df: (df['EndTime'] - df['StartTime']).dt.total_seconds() / 60,
+}
+
+def _event_time_col(df):
+    """Impulse Data uses 'Time', Stats uses 'StartTime'."""
+    return 'Time' if 'Time' in df.columns else 'StartTime'
+
 def validate_dataframe(df, expected_cols):
     """General validation logic for any dataframe."""
     missing_cols = [col for col in expected_cols if col not in df.columns]
@@ -9,16 +21,103 @@ def validate_dataframe(df, expected_cols):
         raise ValueError(f"Missing columns: {missing_cols}")
     return df.dropna(subset=[expected_cols[0], expected_cols[1]]) # Drop rows missing key identifiers
 
-def load_and_validate_stats(uploaded_file):
-    """Loads and validates Stats CSV from an uploaded file object."""
-    df = pd.read_csv(uploaded_file)
-    df = validate_dataframe(df, config.COLS_STATS)
+def detect_schema_version(header, schemas):
+    """Returns the newest EA schema version whose columns are all present in the header."""
+    matching = [version for version, cols in schemas.items() if set(cols).issubset(header)]
+    if not matching:
+        oldest = schemas[min(schemas)]
+        raise ValueError(f"Unrecognized EA export. Missing columns: {[c for c in oldest if c not in header]}")
+    return max(matching)
+
+def _read_header(uploaded_file):
+    """Reads only the CSV header, leaving the file ready to be read again."""
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    header = list(pd.read_csv(uploaded_file, nrows=0).columns)
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    return header
+
+def _project_columns(header, all_cols, required_cols, columns):
+    """
+    Columns to read, in EA column order. columns=None reads the whole file;
+    otherwise the requested columns present in this export plus the required ones.
+    """
+    if columns is None:
+        return None, [c for c in all_cols if c in required_cols]
+    wanted = set(required_cols) | (set(columns) & set(header))
+    return [c for c in header if c in wanted], [c for c in all_cols if c in required_cols]
+
+def _parse_time(series):
+    """Parses EA timestamps with the known MT5 layout, falling back to inference."""
+    try:
+        return pd.to_datetime(series, format=config.EA_TIME_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series)
+
+def ensure_derived_columns(df, columns):
+    """Computes derived columns (e.g. DayOfWeek, Duration_Min) the first time they are needed."""
+    for col in columns:
+        if col not in df.columns and col in DERIVED_COLUMNS:
+            df[col] = DERIVED_COLUMNS[col](df)
+    return df
+
+def with_derived_columns(df, columns):
+    """df with the missing derived columns added, as a new frame: df itself (e.g. a cached stage output) is never modified."""
+    missing = {col: DERIVED_COLUMNS[col] for col in columns if col not in df.columns and col in DERIVED_COLUMNS}
+    return df.assign(**missing) if missing else df
+
+def column_view(df, col):
+    """
+    Read-only array of a column (a view for numeric columns, not a copy). Derived columns
+    missing from df are computed as a separate array; df itself is never modified.
+    """
+    values = df[col] if col in df.columns else DERIVED_COLUMNS[col](df)
+    values = values.to_numpy().view()
+    values.flags.writeable = False
+    return values
+
+def column_mask(df, col, value):
+    """Boolean array of the rows where a (label) column equals value, compared in the column's own storage."""
+    return (df[col] == value).to_numpy(dtype=bool)
+
+def filter_by_days(df, days):
+    """Keeps rows whose event day is in days; a no-op (no day column needed) when every day is selected."""
+    if set(DAY_NAMES).issubset(days):
+        return df
+    wanted = [DAY_NAMES.index(d) for d in days]
+    return df[df[_event_time_col(df)].dt.dayofweek.isin(wanted)]
+
+def read_uploads(files):
+    """Reads uploaded files (or paths) into in-memory buffers that can be parsed again without re-reading."""
+    buffers = []
+    for f in files:
+        if hasattr(f, 'getvalue'):
+            data = f.getvalue()
+        else:
+            with open(f, 'rb') as fh:
+                data = fh.read()
+        buffers.append(io.BytesIO(data))
+    return buffers
+
+def load_and_validate_stats(uploaded_file, columns=None):
+    """
+    Loads and validates Stats CSV from an uploaded file object.
+    columns: optional list of columns the analysis needs (see config.STATS_ANALYSIS_COLS);
+    keys and metadata are always read. The detected EA schema version is stored in df.attrs.
+    """
+    header = _read_header(uploaded_file)
+    version = detect_schema_version(header, config.STATS_SCHEMAS)
+    usecols, required = _project_columns(header, config.COLS_STATS, config.KEYS_STATS + config.COLS_META, columns)
+
+    df = pd.read_csv(uploaded_file, usecols=usecols)
+    df = validate_dataframe(df, required)
     
     # DateTime conversion
-    df['StartTime'] = pd.to_datetime(df['StartTime'])
-    df['EndTime'] = pd.to_datetime(df['EndTime'])
-    df['ScanStart'] = pd.to_datetime(df['ScanStart'])
-    df['ScanEnd'] = pd.to_datetime(df['ScanEnd'])
+    df['StartTime'] = _parse_time(df['StartTime'])
+    df['EndTime'] = _parse_time(df['EndTime'])
+    df['ScanStart'] = _parse_time(df['ScanStart'])
+    df['ScanEnd'] = _parse_time(df['ScanEnd'])
     
     # Direction validation
     df['Direction'] = df['Direction'].str.upper()
@@ -28,20 +127,26 @@ def load_and_validate_stats(uploaded_file):
     df = df[df['StartPrice'] > 0]
     df['Distance'] = df['Distance'].astype(float)
     
-    # Feature Engineering: Day of Week
-    df['DayOfWeek'] = df['StartTime'].dt.day_name()
-    
+    df.attrs['schema_version'] = version
     return df
 
-def load_and_validate_impulse(uploaded_file):
-    """Loads and validates Impulse CSV from an uploaded file object."""
-    df = pd.read_csv(uploaded_file)
-    df = validate_dataframe(df, config.COLS_IMPULSE)
+def load_and_validate_impulse(uploaded_file, columns=None):
+    """
+    Loads and validates Impulse CSV from an uploaded file object.
+    columns: optional list of columns the analysis needs (see config.IMPULSE_ANALYSIS_COLS);
+    keys and metadata are always read. The detected EA schema version is stored in df.attrs.
+    """
+    header = _read_header(uploaded_file)
+    version = detect_schema_version(header, config.IMPULSE_SCHEMAS)
+    usecols, required = _project_columns(header, config.COLS_IMPULSE, config.KEYS_IMPULSE + config.COLS_META, columns)
+
+    df = pd.read_csv(uploaded_file, usecols=usecols)
+    df = validate_dataframe(df, required)
     
     # DateTime conversion
-    df['Time'] = pd.to_datetime(df['Time'])
-    df['ScanStart'] = pd.to_datetime(df['ScanStart'])
-    df['ScanEnd'] = pd.to_datetime(df['ScanEnd'])
+    df['Time'] = _parse_time(df['Time'])
+    df['ScanStart'] = _parse_time(df['ScanStart'])
+    df['ScanEnd'] = _parse_time(df['ScanEnd'])
     
     # Direction validation
     df['Direction'] = df['Direction'].str.upper()
@@ -51,8 +156,41 @@ def load_and_validate_impulse(uploaded_file):
     df = df[df['BasePrice'] > 0]
     df['Reversal%'] = df['Reversal%'].astype(float)
     
-    # Feature Engineering: Day of Week
-    df['DayOfWeek'] = df['Time'].dt.day_name()
-    
+    df.attrs['schema_version'] = version
     return df
 
+def export_summary(df):
+    """
+    What the tabs show about a loaded export besides its rows: row count, columns, the EA setup
+    (first row's COLS_META, last row's ScanEnd) and the load notes in df.attrs.
+    """
+    meta = {}
+    if len(df):
+        meta = {col: df[col].iloc[0] for col in config.COLS_META if col in df.columns}
+        if 'ScanEnd' in df.columns:
+            meta['ScanEnd'] = df['ScanEnd'].iloc[-1]
+    return {'rows': len(df), 'columns': list(df.columns), 'meta': meta, 'attrs': dict(df.attrs)}
+
+def load_exports(buffers, kind, columns=None, scheme=None, broker_offset_min=None):
+    """
+    Parses and validates one or more EA exports (merged without duplicates) and applies a session scheme.
+
+    Args:
+        buffers: In-memory exports (see read_uploads()).
+        kind: 'stats' or 'impulse'.
+        columns: Column projection (see config.STATS_ANALYSIS_COLS / IMPULSE_ANALYSIS_COLS).
+        scheme: Key of config.SESSION_SCHEMES; any other value keeps the EA's session tags
+            (v1 exports, which have none, are tagged with config.SESSION_SCHEME_EA).
+        broker_offset_min: Broker GMT offset for the scheme (None auto-detects it).
+    """
+    from data.merge import merge_exports
+    from engines.session_engine import apply_session_scheme
+    loader = load_and_validate_stats if kind == 'stats' else load_and_validate_impulse
+    frames = [loader(b, columns=columns) for b in buffers]
+    df = frames[0] if len(frames) == 1 else merge_exports(frames, kind)
+    if scheme in config.SESSION_SCHEMES:
+        df = apply_session_scheme(df, scheme, broker_offset_min)
+    elif df.attrs.get('schema_version') == 1:
+        # v1 exports carry no session tags: derive them from the timestamps with the EA's table
+        df = apply_session_scheme(df, config.SESSION_SCHEME_EA, broker_offset_min)
+    return df
@@ -0,0 +1,361 @@
+"""
+Streaming replay of the EA's crossover state machine (OnTick -> AnalyzeCrossover).
+
+CrossoverScanner consumes one closed bar at a time in constant time and memory (slots-based
+state, ring-buffer indicators) and emits the rows the EA appends to Crossover_Stats.csv and
+Impulse_Reversal.csv. Like the EA, a bar is analyzed when the next bar arrives: the next
+bar's ATR is the '_Live' ATR snapshot. Indicators follow MT5's definitions (ATR = simple
+average of True Range; SMA/LWMA/SMMA valid after the period, EMA seeded with the first price).
+
+The bundled EA source predates the v3 percentage columns; they are computed relative to the
+price each move is measured from: Impulse% = Impulse / BasePrice, Reversal%_Peak =
+Pullback / Peak and PriceMove% = Distance / start MA (x 100).
+
+Replay a bar store (see data/bar_store.py) into EA exports with:
+    python -m engines.crossover_scanner SYMBOL [--timeframe M5] [--ma-period 20] [--out-dir DIR]
+"""
+import io
+import os
+import argparse
+import pandas as pd
+from config import COLS_STATS, COLS_IMPULSE, EA_TIME_FORMAT, SESSION_SCHEME_EA
+from engines.session_engine import get_session_lookup, MINUTES_PER_DAY
+
+MA_METHODS = ["MODE_SMA", "MODE_EMA", "MODE_SMMA", "MODE_LWMA"]
+APPLIED_PRICES = {
+    "PRICE_CLOSE": lambda o, h, l, c: c,
+    "PRICE_OPEN": lambda o, h, l, c: o,
+    "PRICE_HIGH": lambda o, h, l, c: h,
+    "PRICE_LOW": lambda o, h, l, c: l,
+    "PRICE_MEDIAN": lambda o, h, l, c: (h + l) / 2,
+    "PRICE_TYPICAL": lambda o, h, l, c: (h + l + c) / 3,
+    "PRICE_WEIGHTED": lambda o, h, l, c: (h + l + 2 * c) / 4,
+}
+
+
+class _MovingAverage:
+    """MT5 moving average (MODE_SMA/EMA/SMMA/LWMA) updated in O(1) per bar; None until valid."""
+    __slots__ = ('method', 'period', 'window', 'pos', 'count', 'total', 'weighted', 'value')
+
+    def __init__(self, period, method):
+        if method not in MA_METHODS:
+            raise ValueError(f"Unknown MA method {method} (expected one of {', '.join(MA_METHODS)})")
+        self.method = method
+        self.period = period
+        self.window = [0.0] * period  # ring buffer of the last `period` prices
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0     # sum of the window
+        self.weighted = 0.0  # LWMA: sum of weight * price, newest weight = period
+        self.value = None
+
+    def update(self, price):
+        n = self.period
+        oldest = self.window[self.pos]
+        full = self.count >= n
+        self.window[self.pos] = price
+        self.pos = (self.pos + 1) % n
+        self.count += 1
+
+        if self.method == "MODE_EMA":
+            self.value = price if self.value is None else price * (2.0 / (n + 1)) + self.value * (1 - 2.0 / (n + 1))
+            return self.value
+
+        # LWMA: shifting every weight down by one subtracts the old window's sum
+        self.weighted += n * price - self.total if full else self.count * price
+        self.total += price - (oldest if full else 0.0)
+        if self.count < n:
+            return None
+        if self.method == "MODE_SMA":
+            self.value = self.total / n
+        elif self.method == "MODE_LWMA":
+            self.value = self.weighted / (n * (n + 1) / 2)
+        else:  # MODE_SMMA: SMA seed, then (prev * (n - 1) + price) / n
+            self.value = self.total / n if self.value is None else (self.value * (n - 1) + price) / n
+        return self.value
+
+
+class _AverageTrueRange:
+    """MT5 ATR: simple average of the last `period` True Ranges (0.0 until period + 1 bars)."""
+    __slots__ = ('period', 'window', 'pos', 'count', 'total', 'prev_close', 'value')
+
+    def __init__(self, period):
+        self.period = period
+        self.window = [0.0] * period
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.prev_close = None
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        prev_close = self.prev_close
+        self.prev_close = close
+        if prev_close is None:
+            return self.value  # the first bar has no True Range
+        tr = max(high, prev_close) - min(low, prev_close)
+        self.total += tr - self.window[self.pos]
+        self.window[self.pos] = tr
+        self.pos = (self.pos + 1) % self.period
+        self.count += 1
+        if self.count >= self.period:
+            self.value = self.total / self.period
+        return self.value
+
+
+class CrossoverScanner:
+    """
+    Incremental EA scanner: push(bar) -> rows the EA would write after that bar.
+
+    Rows are ('stats', dict) or ('impulse', dict) with the export's columns
+    (config.COLS_STATS / COLS_IMPULSE); times are datetimes in broker time.
+    """
+    __slots__ = (
+        # settings
+        'rev_threshold_pct', 'min_peak_dist', 'digits', 'meta', 'price_fn', 'ma', 'atr', 'session_lookup', 'session_names',
+        # previous two bars (bar 1 is analyzed when the next bar arrives; bar 2 is the one before it)
+        't1', 'h1', 'l1', 'c1', 'ma1', 'atr1', 'c2', 'ma2',
+        # EA globals
+        'is_trend_active', 'trend_dir', 'bars_in_trend', 'base_price', 'base_price_time',
+        'current_peak', 'current_peak_time', 'global_extremum', 'global_peak_time', 'global_peak_ma',
+        'global_start_price', 'crossover_start_time', 'crossover_start_ma',
+        'start_atr_closed', 'start_atr_live', 'trend_peak_atr_closed', 'trend_peak_atr_live',
+        'base_atr_closed', 'base_atr_live', 'impulse_peak_atr_closed', 'impulse_peak_atr_live',
+    )
+
+    def __init__(self, ma_period=20, ma_method="MODE_EMA", applied_price="PRICE_CLOSE", rev_threshold_pct=30.0,
+                 min_peak_dist=10.0, atr_period=14, symbol="", timeframe="", digits=None,
+                 scheme=SESSION_SCHEME_EA, broker_offset_min=0, scan_start=None):
+        """
+        Args mirror the EA inputs (InpMAPeriod, InpMAMethod, InpMAAppliedPrice, InpRevThresholdPct,
+        InpMinPeakDist, InpATRPeriod). digits rounds prices like DoubleToString(x, _Digits)
+        (None keeps full precision); broker_offset_min is broker time minus GMT.
+        """
+        self.rev_threshold_pct = rev_threshold_pct
+        self.min_peak_dist = min_peak_dist
+        self.digits = digits
+        self.meta = {'Symbol': symbol, 'TF': f"PERIOD_{timeframe}" if timeframe else "", 'MAPeriod': ma_period,
+                     'MAType': ma_method, 'ScanStart': scan_start, 'ScanEnd': None}
+        self.price_fn = APPLIED_PRICES[applied_price]
+        self.ma = _MovingAverage(ma_period, ma_method)
+        self.atr = _AverageTrueRange(atr_period)
+        lookup, names = get_session_lookup(scheme, int(broker_offset_min))
+        self.session_lookup = lookup.tolist()
+        self.session_names = names
+
+        self.t1 = self.h1 = self.l1 = self.c1 = self.ma1 = self.atr1 = self.c2 = self.ma2 = None
+        self.is_trend_active = False
+        self.trend_dir = ""
+        self.bars_in_trend = 0
+        self.base_price = self.current_peak = self.global_extremum = self.global_peak_ma = 0.0
+        self.global_start_price = self.crossover_start_ma = 0.0
+        self.base_price_time = self.current_peak_time = self.global_peak_time = self.crossover_start_time = None
+        self.start_atr_closed = self.start_atr_live = self.trend_peak_atr_closed = self.trend_peak_atr_live = 0.0
+        self.base_atr_closed = self.base_atr_live = self.impulse_peak_atr_closed = self.impulse_peak_atr_live = 0.0
+
+    def push(self, time, open_, high, low, close):
+        """
+        Consumes one closed bar (time as a datetime) and returns the rows logged while
+        analyzing the previous bar (usually an empty tuple).
+        """
+        ma = self.ma.update(self.price_fn(open_, high, low, close))
+        atr = self.atr.update(high, low, close)
+        if self.meta['ScanStart'] is None:
+            self.meta['ScanStart'] = time
+
+        rows = ()
+        if self.ma1 is not None and self.ma2 is not None:
+            # 'Live' ATR of the analyzed bar = ATR of the bar after it (the EA's idx - 1)
+            rows = self._analyze(atr, time)
+
+        self.c2, self.ma2 = self.c1, self.ma1
+        self.t1, self.h1, self.l1, self.c1, self.ma1, self.atr1 = time, high, low, close, ma, atr
+        return rows
+
+    def _session(self, time):
+        """EA GetSessionName() of a broker timestamp (one table lookup)."""
+        minute = time.weekday() * MINUTES_PER_DAY + time.hour * 60 + time.minute
+        return self.session_names[self.session_lookup[minute]]
+
+    def _round(self, value):
+        return value if self.digits is None else round(value, self.digits)
+
+    def _analyze(self, atr_live, now):
+        """AnalyzeCrossover() on bar 1 (t1, h1, l1, c1, ma1) with bar 2's close and MA."""
+        t, high, low, close, ma = self.t1, self.h1, self.l1, self.c1, self.ma1
+        atr_closed = self.atr1
+        rows = []
+
+        # 1. Trend termination (close back across the MA)
+        if self.is_trend_active:
+            if (self.trend_dir == "BULLISH" and close < ma) or (self.trend_dir == "BEARISH" and close > ma):
+                rows.append(('stats', self._stats_row(close, t, atr_closed, atr_live, now)))
+                self.is_trend_active = False
+                self.trend_dir = ""
+                self.bars_in_trend = 0
+                # no return: a new trend may start on the same bar (stop & reverse)
+
+        # 2. New crossover
+        new_bullish = self.c2 <= self.ma2 and close > ma
+        new_bearish = self.c2 >= self.ma2 and close < ma
+        if new_bullish or new_bearish:
+            self.is_trend_active = True
+            self.trend_dir = "BULLISH" if new_bullish else "BEARISH"
+            self.base_price = ma
+            self.base_price_time = t
+            self.global_start_price = close
+            self.bars_in_trend = 0
+            self.crossover_start_time = t
+            self.crossover_start_ma = ma
+            self.start_atr_closed, self.start_atr_live = atr_closed, atr_live
+            self.base_atr_closed, self.base_atr_live = atr_closed, atr_live
+            self.current_peak = self.global_extremum = high if new_bullish else low
+            self.current_peak_time = self.global_peak_time = t
+            self.global_peak_ma = ma
+            self.trend_peak_atr_closed, self.trend_peak_atr_live = atr_closed, atr_live
+            self.impulse_peak_atr_closed, self.impulse_peak_atr_live = atr_closed, atr_live
+            return rows
+
+        # 3. Ongoing wave: global extremum, local peak, reversal from the peak
+        if self.is_trend_active:
+            self.bars_in_trend += 1
+            bullish = self.trend_dir == "BULLISH"
+            extreme, trigger = (high, low) if bullish else (low, high)
+
+            if (extreme > self.global_extremum) if bullish else (extreme < self.global_extremum):
+                self.global_extremum = extreme
+                self.global_peak_time = t
+                self.global_peak_ma = ma
+                self.trend_peak_atr_closed, self.trend_peak_atr_live = atr_closed, atr_live
+
+            if (extreme > self.current_peak + self.min_peak_dist) if bullish else (extreme < self.current_peak - self.min_peak_dist):
+                self.current_peak = extreme
+                self.current_peak_time = t
+                self.impulse_peak_atr_closed, self.impulse_peak_atr_live = atr_closed, atr_live
+            else:
+                impulse = (self.current_peak - self.base_price) if bullish else (self.base_price - self.current_peak)
+                pullback = (self.current_peak - trigger) if bullish else (trigger - self.current_peak)
+                rev_pct = pullback / impulse * 100.0 if impulse > 0 else 0.0
+
+                if impulse >= self.min_peak_dist and rev_pct > self.rev_threshold_pct:
+                    rows.append(('impulse', self._impulse_row(trigger, impulse, pullback, rev_pct, t, atr_closed, atr_live, now)))
+                    # Reset the pivot: base = current MA, peak = this bar
+                    self.base_price = ma
+                    self.base_price_time = t
+                    self.base_atr_closed, self.base_atr_live = atr_closed, atr_live
+                    self.current_peak = extreme
+                    self.current_peak_time = t
+                    self.impulse_peak_atr_closed, self.impulse_peak_atr_live = atr_closed, atr_live
+                    self.bars_in_trend = 0
+        return rows
+
+    def _stats_row(self, end_price, end_time, end_atr_closed, end_atr_live, now):
+        """LogCSV1(): one Crossover_Stats row."""
+        if self.trend_dir == "BULLISH":
+            distance = self.global_extremum - self.crossover_start_ma
+        else:
+            distance = self.crossover_start_ma - self.global_extremum
+        r = self._round
+        return {
+            'StartTime': self.crossover_start_time, 'EndTime': end_time, 'Direction': self.trend_dir,
+            'StartPrice': r(self.global_start_price), 'EndPrice': r(end_price), 'MaxMinPrice': r(self.global_extremum),
+            'Distance': r(distance), 'MAValue': r(self.global_peak_ma),
+            'StartATR_Closed': r(self.start_atr_closed), 'StartATR_Live': r(self.start_atr_live),
+            'PeakATR_Closed': r(self.trend_peak_atr_closed), 'PeakATR_Live': r(self.trend_peak_atr_live),
+            'EndATR_Closed': r(end_atr_closed), 'EndATR_Live': r(end_atr_live),
+            'PriceMove%': round(distance / self.crossover_start_ma * 100.0, 3) if self.crossover_start_ma else 0.0,
+            'Session_Start': self._session(self.crossover_start_time), 'Session_Peak': self._session(self.global_peak_time),
+            'Session_End': self._session(end_time),
+            **self.meta, 'ScanEnd': now,
+        }
+
+    def _impulse_row(self, trigger_price, impulse, pullback, rev_pct, t, rev_atr_closed, rev_atr_live, now):
+        """LogCSV2(): one Impulse_Reversal row."""
+        r = self._round
+        return {
+            'Time': t, 'Direction': self.trend_dir, 'BasePrice': r(self.base_price), 'Peak': r(self.current_peak),
+            'TriggerPrice': r(trigger_price), 'Impulse': r(impulse), 'Pullback': r(pullback), 'Reversal%': round(rev_pct, 2),
+            'BaseATR_Closed': r(self.base_atr_closed), 'BaseATR_Live': r(self.base_atr_live),
+            'PeakATR_Closed': r(self.impulse_peak_atr_closed), 'PeakATR_Live': r(self.impulse_peak_atr_live),
+            'RevATR_Closed': r(rev_atr_closed), 'RevATR_Live': r(rev_atr_live),
+            'Impulse%': round(impulse / self.base_price * 100.0, 3) if self.base_price else 0.0,
+            'Reversal%_Peak': round(pullback / self.current_peak * 100.0, 2) if self.current_peak else 0.0,
+            'Session_Base': self._session(self.base_price_time), 'Session_Peak': self._session(self.current_peak_time),
+            'Session_Trigger': self._session(t),
+            **self.meta, 'ScanEnd': now,
+        }
+
+
+def replay_bars(bars, **scanner_args):
+    """
+    Pushes every bar of a bar store series (data.bar_store.open_bars / slice_bars) through a
+    CrossoverScanner, like the EA's history scan.
+
+    Returns:
+        (stats rows, impulse rows) as lists of dicts.
+    """
+    scanner_args.setdefault('symbol', bars.get('symbol', ""))
+    scanner_args.setdefault('timeframe', bars.get('timeframe', ""))
+    scanner = CrossoverScanner(**scanner_args)
+    push = scanner.push
+    stats, impulses = [], []
+    # Plain Python scalars: per-bar work stays in the scanner, not in numpy scalar boxing
+    for row in zip(bars['time'].astype('datetime64[s]').tolist(), bars['open'].tolist(), bars['high'].tolist(),
+                   bars['low'].tolist(), bars['close'].tolist()):
+        for kind, record in push(*row):
+            (stats if kind == 'stats' else impulses).append(record)
+    return stats, impulses
+
+
+def rows_to_csv(rows, kind):
+    """EA-format CSV (header + rows, TimeToString times) of scanner rows, as an in-memory buffer."""
+    columns = COLS_STATS if kind == 'stats' else COLS_IMPULSE
+    buffer = io.BytesIO()
+    pd.DataFrame(rows, columns=columns).to_csv(buffer, index=False, date_format=EA_TIME_FORMAT)
+    buffer.seek(0)
+    return buffer
+
+
+def replay_exports(bars, **scanner_args):
+    """
+    Replays bars into (Crossover_Stats, Impulse_Reversal) buffers that load like EA uploads
+    (data.validation.load_exports).
+    """
+    stats, impulses = replay_bars(bars, **scanner_args)
+    return rows_to_csv(stats, 'stats'), rows_to_csv(impulses, 'impulse')
+
+
+if __name__ == "__main__":
+    import time
+    from config import CSV_STATS, CSV_IMPULSE
+    from data.bar_store import open_bars, slice_bars
+
+    parser = argparse.ArgumentParser(description="Replay stored bars through the EA state machine into EA exports")
+    parser.add_argument("symbol")
+    parser.add_argument("--timeframe", default="M5")
+    parser.add_argument("--start", default=None, help="First bar time (ISO), default: all history")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--ma-period", type=int, default=20)
+    parser.add_argument("--ma-method", default="MODE_EMA", choices=MA_METHODS)
+    parser.add_argument("--applied-price", default="PRICE_CLOSE", choices=list(APPLIED_PRICES))
+    parser.add_argument("--rev-threshold", type=float, default=30.0)
+    parser.add_argument("--min-peak-dist", type=float, default=10.0)
+    parser.add_argument("--atr-period", type=int, default=14)
+    parser.add_argument("--digits", type=int, default=None)
+    parser.add_argument("--broker-offset", type=float, default=0.0, help="Broker GMT offset in hours")
+    parser.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+
+    bars = slice_bars(open_bars(args.symbol, args.timeframe), args.start, args.end)
+    started = time.perf_counter()
+    stats, impulses = replay_bars(bars, ma_period=args.ma_period, ma_method=args.ma_method, applied_price=args.applied_price,
+                                  rev_threshold_pct=args.rev_threshold, min_peak_dist=args.min_peak_dist,
+                                  atr_period=args.atr_period, digits=args.digits, broker_offset_min=int(round(args.broker_offset * 60)))
+    elapsed = time.perf_counter() - started
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for rows, kind, name in [(stats, 'stats', CSV_STATS), (impulses, 'impulse', CSV_IMPULSE)]:
+        with open(os.path.join(args.out_dir, name), 'wb') as f:
+            f.write(rows_to_csv(rows, kind).getvalue())
+    print(f"Replayed {len(bars['time'])} bars in {elapsed:.2f}s ({len(bars['time']) / max(elapsed, 1e-9):,.0f} bars/s): "
+          f"{len(stats)} trends, {len(impulses)} impulses -> {args.out_dir}")
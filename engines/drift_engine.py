@@ -0,0 +1,281 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from config import DRIFT_ALPHA, DRIFT_MIN_EVENTS, DRIFT_CELL_Z
+from analytics.statistics import chi2_homogeneity, jensen_shannon, ks_2samp_segments, benjamini_hochberg
+from engines.heatmap_engine import reversal_bin_index, REVERSAL_LABELS
+from engines.pipeline import run_stage
+from plots.heatmap_plots import plot_drift_heatmap
+
+# Calendar months of the event time (all years together, like the Month-wise temporal view)
+MONTH_LABELS = ["ALL", "January", "February", "March", "April", "May", "June",
+                "July", "August", "September", "October", "November", "December"]
+
+# Tests of every heatmap ('matrix') and heatmap row
+DRIFT_TESTS = ['chi2', 'dof', 'p_chi2', 'ks', 'p_ks', 'js']
+
+
+def _labels(df_a, df_b, col):
+    """Sorted distinct values of a column over both datasets."""
+    values = [df[col].dropna().astype(str).unique() for df in (df_a, df_b) if col in df.columns]
+    return sorted(set(np.concatenate(values))) if values else []
+
+
+def _codes(df, col, labels):
+    """Position of each row's value in labels (-1 for missing or unknown values)."""
+    if col not in df.columns:
+        return np.full(len(df), -1, dtype=np.int64)
+    return pd.Categorical(df[col].astype(str).where(df[col].notna()), categories=labels).codes.astype(np.int64)
+
+
+def _group_pairs(df, sessions, directions, session_col, time_col):
+    """
+    (group, row) pairs of df: every row counts in its own Session x Direction x Month group and
+    in the ALL level of each dimension (8 groups per row; position 0 of every dimension is ALL).
+    """
+    sess = _codes(df, session_col, sessions)
+    dirs = _codes(df, 'Direction', directions)
+    months = df[time_col].dt.month.to_numpy(dtype=float, na_value=0).astype(np.int64) - 1 if time_col in df.columns \
+        else np.full(len(df), -1, dtype=np.int64)
+
+    def levels(codes):
+        # (2, n) choices: ALL or the row's own value (not available for missing values)
+        return np.stack([np.zeros_like(codes), codes + 1]), np.stack([np.ones(len(codes), dtype=bool), codes >= 0])
+
+    (s, s_ok), (d, d_ok), (m, m_ok) = levels(sess), levels(dirs), levels(months)
+    n_dir, n_month = len(directions) + 1, len(MONTH_LABELS)
+    group = (s[:, None, None] * n_dir + d[None, :, None]) * n_month + m[None, None, :]
+    ok = s_ok[:, None, None] & d_ok[None, :, None] & m_ok[None, None, :]
+    combo, rows = np.nonzero(ok.reshape(8, -1))
+    return group.reshape(8, -1)[combo, rows], rows
+
+
+def _side(df, pairs, ranges, y_col, n_groups):
+    """Heatmap counts, per-row and per-matrix Reversal % samples of one dataset, for every group."""
+    group, rows = pairs
+    n_ranges, n_bins = len(ranges), len(REVERSAL_LABELS)
+    y = df[y_col].to_numpy(dtype=float)
+    starts = np.array([r[0] for r in ranges], dtype=float)
+    ends = np.array([r[1] for r in ranges], dtype=float)
+    inside = (y[:, None] >= starts) & (y[:, None] <= ends)
+
+    # Heatmap rows: one entry per (group, row, range holding the row's Y value)
+    pair, rng = np.nonzero(inside[rows])
+    entry_group, entry_row = group[pair], rows[pair]
+    reversal = df['Reversal%'].to_numpy(dtype=float)
+    bins = reversal_bin_index(reversal)[entry_row]
+    binned = bins >= 0
+    cells = ((entry_group * n_ranges + rng) * n_bins + bins)[binned]
+    counts = np.bincount(cells, minlength=n_groups * n_ranges * n_bins).reshape(n_groups, n_ranges, n_bins)
+
+    # Whole heatmap: every event in at least one range, once
+    in_matrix = inside[rows].any(axis=1)
+    return {
+        'counts': counts,
+        'row_seg': entry_group * n_ranges + rng,
+        'row_values': reversal[entry_row],
+        'matrix_seg': group[in_matrix],
+        'matrix_values': reversal[rows[in_matrix]],
+        'events': np.bincount(group[in_matrix], minlength=n_groups),
+    }
+
+
+def _tests(counts_a, counts_b, seg_a, values_a, seg_b, values_b):
+    """Chi-square, KS and Jensen-Shannon results of matching count tables and samples."""
+    chi2, dof, p_chi2 = chi2_homogeneity(counts_a, counts_b)
+    ks, p_ks, _, _ = ks_2samp_segments(seg_a, values_a, seg_b, values_b, int(np.prod(counts_a.shape[:-1])))
+    shape = counts_a.shape[:-1]
+    return {'chi2': chi2, 'dof': dof, 'p_chi2': p_chi2, 'ks': ks.reshape(shape), 'p_ks': p_ks.reshape(shape),
+            'js': jensen_shannon(counts_a, counts_b)}
+
+
+def calculate_drift(df_a, df_b, ranges, y_col='Impulse', session_col='Session_Peak', time_col='Time'):
+    """
+    Divergence of a current impulse dataset (b) from a baseline (a), heatmap by heatmap, for every
+    Session x Direction x Month group (each dimension with an ALL level) at once.
+
+    Each dataset's rows are expanded once into (group, Y range) pairs and one bincount fills
+    the (range, Reversal bin) counts of every group's heatmap. The tests are then array
+    operations over all groups together:
+      - chi-square homogeneity and Jensen-Shannon divergence of each heatmap row's Reversal bins
+        and of each whole heatmap (its cells flattened);
+      - two-sample KS on the raw Reversal % of each row and of each heatmap's events;
+      - a two-proportion z-score per cell (row % of b against row % of a).
+
+    Returns:
+        Dict with the 'sessions', 'directions' and 'months' labels (ALL first), 'range_labels',
+        'x_labels', 'counts_a' / 'counts_b' and 'cell_z' (session, direction, month, range, bin),
+        'events_a' / 'events_b' (session, direction, month), and 'row' / 'matrix' dicts of
+        DRIFT_TESTS arrays over (session, direction, month[, range]).
+    """
+    sessions = _labels(df_a, df_b, session_col)
+    directions = _labels(df_a, df_b, 'Direction')
+    shape = (len(sessions) + 1, len(directions) + 1, len(MONTH_LABELS))
+    n_groups = int(np.prod(shape))
+    n_ranges, n_bins = len(ranges), len(REVERSAL_LABELS)
+
+    a, b = (_side(df, _group_pairs(df, sessions, directions, session_col, time_col), ranges, y_col, n_groups)
+            for df in (df_a, df_b))
+    row = _tests(a['counts'], b['counts'], a['row_seg'], a['row_values'], b['row_seg'], b['row_values'])
+    matrix = _tests(a['counts'].reshape(n_groups, -1), b['counts'].reshape(n_groups, -1),
+                    a['matrix_seg'], a['matrix_values'], b['matrix_seg'], b['matrix_values'])
+
+    # Cell z-scores: row % of b vs row % of a, pooled standard error
+    n_a = a['counts'].sum(axis=-1, keepdims=True)
+    n_b = b['counts'].sum(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = (a['counts'] + b['counts']) / (n_a + n_b)
+        se = np.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+        cell_z = np.where(se > 0, (b['counts'] / n_b - a['counts'] / n_a) / se, np.nan)
+
+    unit = "%" if "Percent" in y_col or "%" in y_col else " pts"
+    return {
+        'sessions': ['ALL'] + sessions,
+        'directions': ['ALL'] + directions,
+        'months': list(MONTH_LABELS),
+        'range_labels': [f"{y_col} {start}-{end}{unit}" for start, end in ranges],
+        'x_labels': list(REVERSAL_LABELS),
+        'counts_a': a['counts'].reshape(shape + (n_ranges, n_bins)),
+        'counts_b': b['counts'].reshape(shape + (n_ranges, n_bins)),
+        'cell_z': cell_z.reshape(shape + (n_ranges, n_bins)),
+        'events_a': a['events'].reshape(shape),
+        'events_b': b['events'].reshape(shape),
+        'row': {k: v.reshape(shape + (n_ranges,)) for k, v in row.items()},
+        'matrix': {k: v.reshape(shape) for k, v in matrix.items()},
+    }
+
+
+def calculate_drift_split(df, split, ranges, y_col='Impulse', session_col='Session_Peak', time_col='Time'):
+    """calculate_drift() of the events before split (baseline) against the events from split on."""
+    after = (df[time_col] >= pd.Timestamp(split)).to_numpy()
+    return calculate_drift(df[~after], df[after], ranges, y_col=y_col, session_col=session_col, time_col=time_col)
+
+
+def drift_summary(drift, alpha=DRIFT_ALPHA, min_events=DRIFT_MIN_EVENTS):
+    """
+    Every tested heatmap (Range 'ALL') and heatmap row, one line each.
+
+    Only heatmaps and rows with min_events on both sides are tested; the chi-square and KS
+    p-values of all of them are adjusted together (Benjamini-Hochberg), and Drift flags the
+    lines where either q-value is below alpha.
+
+    Returns:
+        DataFrame: Session, Direction, Month, Range, N_A, N_B, Chi2, DoF, P_Chi2, KS, P_KS, JS,
+        Q_Chi2, Q_KS, Drift; drifted lines first, then by Jensen-Shannon divergence.
+    """
+    columns = ['Session', 'Direction', 'Month', 'Range', 'N_A', 'N_B', 'Chi2', 'DoF', 'P_Chi2', 'KS', 'P_KS', 'JS',
+               'Q_Chi2', 'Q_KS', 'Drift']
+    levels = [
+        (drift['matrix'], drift['events_a'], drift['events_b'], np.array(['ALL'])),
+        (drift['row'], drift['counts_a'].sum(axis=-1), drift['counts_b'].sum(axis=-1), np.array(drift['range_labels'])),
+    ]
+
+    frames = []
+    for tests, n_a, n_b, range_labels in levels:
+        tested = (n_a >= min_events) & (n_b >= min_events)
+        idx = np.nonzero(tested)
+        frames.append(pd.DataFrame({
+            'Session': np.array(drift['sessions'])[idx[0]],
+            'Direction': np.array(drift['directions'])[idx[1]],
+            'Month': np.array(drift['months'])[idx[2]],
+            'Range': range_labels[idx[3]] if len(idx) > 3 else np.repeat(range_labels, len(idx[0])),
+            'N_A': n_a[idx], 'N_B': n_b[idx],
+            'Chi2': tests['chi2'][idx], 'DoF': tests['dof'][idx], 'P_Chi2': tests['p_chi2'][idx],
+            'KS': tests['ks'][idx], 'P_KS': tests['p_ks'][idx], 'JS': tests['js'][idx],
+        }))
+    summary = pd.concat(frames, ignore_index=True)
+    if summary.empty:
+        return pd.DataFrame(columns=columns)
+
+    q = benjamini_hochberg(np.concatenate([summary['P_Chi2'].to_numpy(), summary['P_KS'].to_numpy()]))
+    summary['Q_Chi2'], summary['Q_KS'] = q[:len(summary)], q[len(summary):]
+    summary['Drift'] = (summary['Q_Chi2'] < alpha) | (summary['Q_KS'] < alpha)
+    return summary.sort_values(['Drift', 'JS'], ascending=[False, False], ignore_index=True)[columns]
+
+
+def drift_matrix(drift, session='ALL', direction='ALL', month='ALL'):
+    """
+    Difference heatmap of one group: row % of the current dataset minus row % of the baseline.
+
+    Returns:
+        delta_pcts, cell_z, counts_a, counts_b, y_labels, x_labels (empty lists if neither side has events)
+    """
+    s = drift['sessions'].index(session) if session in drift['sessions'] else None
+    d = drift['directions'].index(direction) if direction in drift['directions'] else None
+    if s is None or d is None:
+        return [], [], [], [], [], []
+    m = drift['months'].index(month)
+    counts_a, counts_b = drift['counts_a'][s, d, m], drift['counts_b'][s, d, m]
+    if not counts_a.sum() and not counts_b.sum():
+        return [], [], [], [], [], []
+
+    n_a = counts_a.sum(axis=1, keepdims=True)
+    n_b = counts_b.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(n_b > 0, counts_b / n_b, 0.0) * 100.0 - np.where(n_a > 0, counts_a / n_a, 0.0) * 100.0
+    row = {k: v[s, d, m] for k, v in drift['row'].items()}
+    y_labels = []
+    for r, label in enumerate(drift['range_labels']):
+        tests = f" | JS {row['js'][r]:.3f} | p(χ²) {row['p_chi2'][r]:.2g} | p(KS) {row['p_ks'][r]:.2g}" if not np.isnan(row['js'][r]) else ""
+        y_labels.append(f"{label} (N {int(n_a[r, 0])} → {int(n_b[r, 0])}{tests})")
+    return delta.tolist(), drift['cell_z'][s, d, m].tolist(), counts_a.tolist(), counts_b.tolist(), y_labels, list(drift['x_labels'])
+
+
+def render_drift_ui(source, df, ranges, key_prefix, baseline_source=None, time_col='Time'):
+    """
+    Renders the Drift Detection view (baseline vs current heatmaps) for a tab.
+
+    Args:
+        source: Pipeline stage holding the tab's filtered events ('stage' or ('stage', item)).
+        df: The same filtered events (for the split date range).
+        ranges: Heatmap Y ranges.
+        baseline_source: Stage holding a separately uploaded baseline export (None: split df by date only).
+    """
+    st.markdown("### 🧪 Drift Detection")
+    if not ranges:
+        st.caption("Enter ranges above to compare heatmaps.")
+        return
+
+    modes = ["Split at Date"] + (["Baseline Upload"] if baseline_source is not None else [])
+    c1, c2, c3 = st.columns(3)
+    mode = c1.radio("Compare", modes, horizontal=True, key=f"{key_prefix}_drift_mode",
+                    help="Split at Date: events before the date are the baseline. Baseline Upload: the uploaded export is the baseline.")
+    alpha = c3.number_input("False Discovery Rate", min_value=0.001, max_value=0.2, value=DRIFT_ALPHA, step=0.005, format="%.3f",
+                            key=f"{key_prefix}_drift_alpha")
+    params = {'ranges': ranges, 'y_col': 'Impulse', 'session_col': 'Session_Peak', 'time_col': time_col}
+    if mode == "Split at Date":
+        times = df[time_col].dropna()
+        if times.empty:
+            st.caption("No event times to split.")
+            return
+        first, last = times.min(), times.max()
+        split = c2.date_input("Split Date", value=(first + (last - first) / 2).date(), min_value=first.date(), max_value=last.date(),
+                              key=f"{key_prefix}_drift_split")
+        drift = run_stage(f"{key_prefix}.drift", calculate_drift_split, deps={'df': source}, params={'split': split, **params})
+        names = (f"before {split}", f"from {split}")
+    else:
+        drift = run_stage(f"{key_prefix}.drift", calculate_drift, deps={'df_a': baseline_source, 'df_b': source}, params=params)
+        names = ("baseline export", "current export")
+
+    summary = drift_summary(drift, alpha=alpha)
+    flagged = summary[summary['Drift']]
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Heatmaps Tested", int((summary['Range'] == 'ALL').sum()))
+    m2.metric("Heatmaps Drifted", int(((summary['Range'] == 'ALL') & summary['Drift']).sum()))
+    m3.metric("Rows Drifted", f"{int(((summary['Range'] != 'ALL') & summary['Drift']).sum())} / {int((summary['Range'] != 'ALL').sum())}")
+    st.caption(f"Baseline: {names[0]} | Current: {names[1]}. Session x Direction x Month groups with at least {DRIFT_MIN_EVENTS} events on both sides are tested; "
+               f"flags keep the false discovery rate at {alpha:g} over all tests.")
+
+    with st.expander(f"Drifted Heatmaps & Rows ({len(flagged)})", expanded=False):
+        st.dataframe(flagged if not flagged.empty else summary.head(20), use_container_width=True, hide_index=True)
+
+    c1, c2, c3 = st.columns(3)
+    session = c1.selectbox("Session", drift['sessions'], key=f"{key_prefix}_drift_sess")
+    direction = c2.selectbox("Direction", drift['directions'], key=f"{key_prefix}_drift_dir")
+    month = c3.selectbox("Month", drift['months'], key=f"{key_prefix}_drift_month")
+    delta, cell_z, counts_a, counts_b, y_labels, x_labels = drift_matrix(drift, session, direction, month)
+    if not delta:
+        st.caption("No events in this group on either side.")
+        return
+    st.plotly_chart(plot_drift_heatmap(delta, cell_z, counts_a, counts_b, x_labels, y_labels, f" — {session} | {direction} | {month}",
+                                       z_threshold=DRIFT_CELL_Z), use_container_width=True)
@@ -0,0 +1,218 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import (EVENT_STUDY_BARS_BEFORE, EVENT_STUDY_BARS_AFTER, EVENT_STUDY_ATR_PERIOD, EVENT_STUDY_QUANTILES,
+                    SESSION_TIME_COLS, TIMEFRAMES)
+from data.bar_store import open_bars, list_symbols, store_meta
+from engines.pipeline import run_stage
+from plots.event_plots import plot_event_bands
+
+# Path units: move from the entry close in % of the entry price, or in entry ATRs
+EVENT_NORMALIZATIONS = ["Price %", "ATR"]
+
+
+def event_bar_positions(bar_times, event_times):
+    """
+    Position of the bar holding each event (the last bar opening at or before it; the EA
+    stamps events with their bar's open time). -1 for events before the first bar or NaT.
+    """
+    events = np.asarray(event_times).astype('datetime64[s]')
+    positions = np.searchsorted(bar_times, events, side='right') - 1
+    positions[np.isnat(events)] = -1
+    return positions
+
+
+def event_windows(values, positions, before, after):
+    """
+    Windows of `before` bars before to `after` bars after each event position, one row per event.
+
+    The windows are rows of a strided view over the bar column (no bar is copied to build
+    them); the events are aligned by gathering their rows in one fancy-indexing operation.
+    Events too close to either end of the history are left out.
+
+    Returns:
+        (windows (n_valid, before + after + 1) array, boolean mask of the events kept)
+    """
+    length = before + after + 1
+    if len(values) < length:
+        return np.empty((0, length)), np.zeros(len(positions), dtype=bool)
+    view = sliding_window_view(values, length)
+    starts = np.asarray(positions) - before
+    valid = (np.asarray(positions) >= 0) & (starts >= 0) & (starts < len(view))
+    return view[starts[valid]], valid
+
+
+def entry_atr(bars, positions, period=EVENT_STUDY_ATR_PERIOD):
+    """
+    ATR at each event bar: simple average of the `period` True Ranges ending at it, gathered
+    from strided windows (the whole history is never scanned). NaN where the history before
+    the event is too short.
+    """
+    positions = np.asarray(positions)
+    out = np.full(len(positions), np.nan)
+    ok = (positions >= period) & (positions < len(bars['close']))
+    if not ok.any():
+        return out
+    starts = positions[ok] - period + 1
+    highs = sliding_window_view(bars['high'], period)[starts]
+    lows = sliding_window_view(bars['low'], period)[starts]
+    prev_closes = sliding_window_view(bars['close'], period)[starts - 1]
+    true_range = np.maximum(highs, prev_closes) - np.minimum(lows, prev_closes)
+    out[ok] = true_range.mean(axis=1)
+    return out
+
+
+def build_event_paths(bars, df, time_col, session_col=None, before=EVENT_STUDY_BARS_BEFORE, after=EVENT_STUDY_BARS_AFTER,
+                      normalize="Price %", align_direction=True):
+    """
+    Close-price path around every event of df, normalized by its entry (the event bar's close).
+
+    Args:
+        bars: Bar store series (data.bar_store.open_bars / slice_bars).
+        time_col: Event time column, e.g. 'StartTime', 'EndTime' or 'Time'.
+        normalize: 'Price %' (move in % of the entry close) or 'ATR' (move in entry ATRs).
+        align_direction: Flip BEARISH paths so that positive always means 'in the trend's direction'.
+
+    Returns:
+        Dict with 'offsets' (bar offsets, 0 = event bar), 'paths' (one row per aligned event),
+        'rows' (df row of each path), 'direction' and 'session' labels per path.
+    """
+    positions = event_bar_positions(bars['time'], df[time_col].to_numpy())
+    windows, valid = event_windows(bars['close'], positions, before, after)
+    entry = windows[:, before]
+
+    if normalize == "ATR":
+        atr = entry_atr(bars, positions[valid])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            paths = (windows - entry[:, None]) / np.where(atr > 0, atr, np.nan)[:, None]
+    else:
+        paths = (windows / entry[:, None] - 1.0) * 100.0
+
+    directions = df['Direction'].to_numpy().astype(str)[valid]
+    if align_direction:
+        paths = np.where((directions == "BEARISH")[:, None], -paths, paths)
+
+    sessions = df[session_col].to_numpy().astype(str)[valid] if session_col in df.columns else np.full(int(valid.sum()), "ALL")
+    kept = ~np.isnan(paths).any(axis=1)
+    return {
+        'offsets': np.arange(-before, after + 1),
+        'paths': paths[kept],
+        'rows': np.flatnonzero(valid)[kept],
+        'direction': directions[kept],
+        'session': sessions[kept],
+    }
+
+
+def event_path_bands(study, quantiles=EVENT_STUDY_QUANTILES):
+    """
+    Mean and quantile bands of the aligned paths per (Direction, Session), including ALL rows.
+
+    Returns:
+        Long DataFrame: Direction, Session, Offset, N, Mean, P10, P25, ... (one row per bar offset).
+    """
+    q_cols = [f"P{int(round(q * 100))}" for q in quantiles]
+    columns = ['Direction', 'Session', 'Offset', 'N', 'Mean'] + q_cols
+    paths = study['paths']
+    if not len(paths):
+        return pd.DataFrame(columns=columns)
+
+    # One contiguous row per bar offset: every quantile is a partition of a contiguous row
+    by_offset = np.ascontiguousarray(paths.T)
+    frames = []
+    for direction in ['ALL'] + sorted(set(study['direction'])):
+        dir_mask = np.ones(len(paths), dtype=bool) if direction == 'ALL' else study['direction'] == direction
+        for session in ['ALL'] + sorted(set(study['session'][dir_mask]) - {'ALL'}):
+            mask = dir_mask if session == 'ALL' else dir_mask & (study['session'] == session)
+            group = by_offset if mask.all() else by_offset[:, mask]
+            band = pd.DataFrame(np.quantile(group, quantiles, axis=1).T, columns=q_cols)
+            band.insert(0, 'Mean', group.mean(axis=1))
+            band.insert(0, 'N', group.shape[1])
+            band.insert(0, 'Offset', study['offsets'])
+            band.insert(0, 'Session', session)
+            band.insert(0, 'Direction', direction)
+            frames.append(band)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def run_event_study(df, symbol, timeframe, time_col, session_col=None, before=EVENT_STUDY_BARS_BEFORE, after=EVENT_STUDY_BARS_AFTER,
+                    normalize="Price %", align_direction=True, root=None, bars_version=None):
+    """
+    Event study of df's events against a symbol's stored bars.
+    bars_version is not used here: it puts the imported bars (rows, last bar) into the stage key.
+
+    Returns:
+        (bands DataFrame from event_path_bands(), number of events aligned, number of events)
+    """
+    bars = open_bars(symbol, timeframe, root)
+    study = build_event_paths(bars, df, time_col, session_col, before, after, normalize, align_direction)
+    return event_path_bands(study), len(study['paths']), len(df)
+
+
+def _export_timeframe(df):
+    """Bar store timeframe of an export's TF column ('PERIOD_M5' -> 'M5'), None if unknown."""
+    if 'TF' not in df.columns or df.empty:
+        return None
+    tf = str(df['TF'].iloc[0]).replace("PERIOD_", "")
+    return tf if tf in TIMEFRAMES else None
+
+
+def render_event_study_ui(source, df, time_cols, key_prefix):
+    """
+    Renders the Event Study view (average price path around events) for a tab.
+
+    Args:
+        source: Pipeline stage holding the tab's filtered events ('stage' or ('stage', item)).
+        df: The same filtered events (for the export's symbol and timeframe).
+    """
+    st.markdown("### 🧭 Event Study")
+
+    stored = list_symbols()
+    if not stored:
+        st.caption("No OHLC bars stored yet. Import an MT5 history export with data.bar_store.import_mt5_history() to align price paths around events.")
+        return
+
+    symbols = list(stored)
+    export_symbol = str(df['Symbol'].iloc[0]) if 'Symbol' in df.columns and not df.empty else None
+    c1, c2, c3 = st.columns(3)
+    symbol = c1.selectbox("Bars Symbol", symbols, index=symbols.index(export_symbol) if export_symbol in symbols else 0,
+                          key=f"{key_prefix}_event_symbol")
+    # The imported timeframe and the ones it can be resampled to
+    base_tf = stored[symbol][0]
+    timeframes = [tf for tf, seconds in TIMEFRAMES.items() if seconds >= TIMEFRAMES[base_tf]]
+    export_tf = _export_timeframe(df)
+    timeframe = c2.selectbox("Bars Timeframe", timeframes, index=timeframes.index(export_tf) if export_tf in timeframes else 0,
+                             key=f"{key_prefix}_event_tf", help="Timeframes above the stored one are resampled (and cached) on first use.")
+    time_col = c3.selectbox("Event", time_cols, key=f"{key_prefix}_event_time")
+
+    c1, c2, c3, c4 = st.columns(4)
+    before = c1.number_input("Bars Before", min_value=0, value=EVENT_STUDY_BARS_BEFORE, step=5, key=f"{key_prefix}_event_before")
+    after = c2.number_input("Bars After", min_value=1, value=EVENT_STUDY_BARS_AFTER, step=5, key=f"{key_prefix}_event_after")
+    normalize = c3.radio("Units", EVENT_NORMALIZATIONS, horizontal=True, key=f"{key_prefix}_event_norm")
+    align = c4.checkbox("Align Direction", value=True, key=f"{key_prefix}_event_align",
+                        help="Flips BEARISH paths: positive = move in the trend's direction.")
+
+    session_col = {time: col for col, time in SESSION_TIME_COLS.items()}.get(time_col)
+    meta = store_meta(symbol, base_tf) or {}
+    try:
+        bands, n_aligned, n_events = run_stage(f"{key_prefix}.event_study", run_event_study, deps={'df': source},
+                                               params={'symbol': symbol, 'timeframe': timeframe, 'time_col': time_col, 'session_col': session_col,
+                                                       'before': int(before), 'after': int(after), 'normalize': normalize, 'align_direction': align,
+                                                       'bars_version': (meta.get('rows'), meta.get('last'))})
+    except FileNotFoundError as e:
+        st.warning(f"⚠️ {e}")
+        return
+    if bands.empty:
+        st.caption(f"None of the {n_events} events fall inside the stored {symbol} {timeframe} bars.")
+        return
+
+    c1, c2 = st.columns(2)
+    direction = c1.radio("Direction", bands['Direction'].unique().tolist(), horizontal=True, key=f"{key_prefix}_event_dir")
+    sessions = bands.loc[bands['Direction'] == direction, 'Session'].unique().tolist()
+    session = c2.radio("Session", sessions, horizontal=True, key=f"{key_prefix}_event_sess")
+
+    unit = "% of entry" if normalize == "Price %" else "entry ATRs"
+    st.caption(f"Aligned {n_aligned} of {n_events} events on {symbol} {timeframe} bars (events near the ends of the history are skipped).")
+    band = bands[(bands['Direction'] == direction) & (bands['Session'] == session)]
+    st.plotly_chart(plot_event_bands(band, unit, f"{time_col} | {direction} | {session} | N={int(band['N'].iloc[0])}"),
+                    use_container_width=True)
@@ -0,0 +1,147 @@
+import pandas as pd
+import numpy as np
+from engines.sequence_engine import build_impulse_sequences, sequence_lengths, SEQUENCE_COLUMNS
+
+# Default rule grids. The EA only logs pullbacks deeper than InpRevThresholdPct (30%),
+# so retracement exits below that level cannot be observed in the impulse log.
+DEFAULT_REV_THRESHOLDS = np.arange(30, 101, 1.0)
+DEFAULT_ATR_MULTIPLES = np.round(np.arange(0.5, 10.01, 0.05), 2)
+
+
+def _first_trigger(trigger, offsets):
+    """
+    Positional index of the first triggering impulse in every trend segment, per rule.
+
+    trigger is a (rules x impulses) boolean matrix whose columns are grouped by trend;
+    a value of n_impulses means the rule never fired inside that trend.
+    """
+    n = trigger.shape[1]
+    positions = np.where(trigger, np.arange(n, dtype=np.int32), np.int32(n))
+    return np.minimum.reduceat(positions, offsets, axis=1)
+
+
+def _evaluate_rules(score, exit_scale, thresholds, offsets, seg_sign, seg_entry, seg_hold, peak, imp_sign):
+    """
+    Profit (points) of every trend that has impulses, under every rule.
+
+    A rule fires on the first impulse with score > threshold and exits at
+    peak - sign * exit_scale * threshold; trends where it never fires are held to the end.
+
+    Returns:
+        (rules x segments) profit matrix and the number of exits triggered per rule.
+    """
+    n = len(score)
+    trigger = score[None, :] > thresholds[:, None]
+    first = _first_trigger(trigger, offsets)
+    fired = first < n
+
+    f = np.minimum(first, n - 1)
+    exit_price = peak[f] - imp_sign[f] * exit_scale[f] * thresholds[:, None]
+    profit = np.where(fired, seg_sign * (exit_price - seg_entry), seg_hold)
+    return profit, fired.sum(axis=1)
+
+
+def _summarize(profit, mfe, atr_unit):
+    """Per-rule expectancy, hit rate and giveback from a (rules x trends) profit matrix."""
+    n_trades = profit.shape[1]
+    total = profit.sum(axis=1)
+    wins = np.maximum(profit, 0.0).sum(axis=1)
+    losses = wins - total
+    n_wins = (profit > 0).sum(axis=1)
+    n_losses = (profit < 0).sum(axis=1)
+
+    # Normalized means as matrix-vector products (no per-rule masking copies)
+    atr_w = np.divide(1.0, atr_unit, out=np.zeros(n_trades), where=atr_unit > 0)
+    mfe_w = np.divide(1.0, mfe, out=np.zeros(n_trades), where=mfe > 0)
+    n_atr = max(1, (atr_unit > 0).sum())
+    n_mfe = max(1, (mfe > 0).sum())
+
+    return {
+        'Trades': np.full(profit.shape[0], n_trades),
+        'Expectancy': total / n_trades,
+        'Expectancy_ATR': (profit @ atr_w) / n_atr,
+        'HitRate%': n_wins / n_trades * 100.0,
+        'Avg_Win': np.divide(wins, n_wins, out=np.zeros(len(wins)), where=n_wins > 0),
+        'Avg_Loss': np.divide(losses, n_losses, out=np.zeros(len(losses)), where=n_losses > 0),
+        'Profit_Factor': np.divide(wins, losses, out=np.full(len(wins), np.inf), where=losses > 0),
+        'Avg_Giveback': mfe.mean() - total / n_trades,
+        'Giveback%': ((mfe > 0).sum() - profit @ mfe_w) / n_mfe * 100.0,
+    }
+
+
+def run_exit_simulation(stats_df, impulse_df, rev_thresholds=None, atr_multiples=None, atr_col='PeakATR_Live'):
+    """
+    Back-tests candidate exit rules over every trend and its logged impulses.
+
+    Each trend is entered at StartPrice. A rule exits at the first impulse whose pullback
+    breaches it (retracement % of the impulse, or a multiple of the impulse's ATR), filled at
+    the threshold price; otherwise the position is held to the crossover end (EndPrice).
+    All rules are evaluated at once by broadcasting thresholds against impulses.
+
+    Returns:
+        results dict (baseline and best rules) and a DataFrame with one row per rule.
+    """
+    results = {}
+    rev_thresholds = DEFAULT_REV_THRESHOLDS if rev_thresholds is None else np.asarray(rev_thresholds, dtype=float)
+    atr_multiples = DEFAULT_ATR_MULTIPLES if atr_multiples is None else np.asarray(atr_multiples, dtype=float)
+
+    if stats_df.empty:
+        return results, pd.DataFrame()
+
+    # 1. Trend arrays
+    sign = np.where(stats_df['Direction'].to_numpy() == 'BULLISH', 1.0, -1.0)
+    entry = stats_df['StartPrice'].to_numpy(dtype=float)
+    hold_profit = sign * (stats_df['EndPrice'].to_numpy(dtype=float) - entry)
+    mfe = sign * (stats_df['MaxMinPrice'].to_numpy(dtype=float) - entry)
+    atr_unit = stats_df['StartATR_Live'].to_numpy(dtype=float)
+
+    # 2. Impulses grouped by trend, in time order (segments of the sequence store)
+    seq = build_impulse_sequences(stats_df, impulse_df, columns=SEQUENCE_COLUMNS + [atr_col])
+    lengths = sequence_lengths(seq)
+    seg_trends = np.flatnonzero(lengths > 0)
+    offsets = seq['offsets'][seg_trends]
+
+    # Trends with impulses come first; column order is irrelevant to the summary
+    no_impulse = np.flatnonzero(lengths == 0)
+    trend_order = np.r_[seg_trends, no_impulse]
+
+    imp_sign = sign[seq['trend']]
+    peak = seq['values']['Peak']
+    impulse = seq['values']['Impulse']
+    pullback = seq['values']['Pullback']
+    rev_pct = seq['values']['Reversal%']
+    atr = seq['values'][atr_col]
+    atr_ratio = np.divide(pullback, atr, out=np.full(len(atr), -np.inf), where=atr > 0)
+
+    def simulate(score, exit_scale, thresholds):
+        profit = np.empty((len(thresholds), len(trend_order)))
+        profit[:, len(seg_trends):] = hold_profit[no_impulse]
+        exits = np.zeros(len(thresholds), dtype=np.int64)
+        if len(seg_trends):
+            profit[:, :len(seg_trends)], exits = _evaluate_rules(
+                score, exit_scale, thresholds, offsets,
+                sign[seg_trends], entry[seg_trends], hold_profit[seg_trends], peak, imp_sign
+            )
+        return profit, exits
+
+    # 3. Retracement exits (thresholds x impulses) and ATR-multiple exits (multiples x impulses)
+    rev_profit, rev_exits = simulate(rev_pct, impulse / 100.0, rev_thresholds)
+    atr_profit, atr_exits = simulate(atr_ratio, atr, atr_multiples)
+
+    # 4. Summary table (baseline first)
+    profit = np.vstack([hold_profit[trend_order][None, :], rev_profit, atr_profit])
+    rules_df = pd.DataFrame({
+        'Rule': ['Hold'] + ['Retracement %'] * len(rev_thresholds) + [f'ATR x ({atr_col})'] * len(atr_multiples),
+        'Threshold': np.r_[np.nan, rev_thresholds, atr_multiples],
+        'Exits_Triggered': np.r_[0, rev_exits, atr_exits],
+        **_summarize(profit, mfe[trend_order], atr_unit[trend_order])
+    })
+
+    results['baseline'] = rules_df.iloc[0]
+    candidates = rules_df.iloc[1:]
+    if not candidates.empty:
+        results['best_expectancy'] = candidates.loc[candidates['Expectancy'].idxmax()]
+        results['best_hit_rate'] = candidates.loc[candidates['HitRate%'].idxmax()]
+        results['least_giveback'] = candidates.loc[candidates['Avg_Giveback'].idxmin()]
+
+    return results, rules_df
@@ -1,42 +1,30 @@
 import pandas as pd
 import numpy as np
+from data.validation import column_view
+from engines.results import FusionResult
+from engines.survival_engine import calculate_max_retracement
 
 def run_fusion_analysis(stats_df, impulse_df):
     """
     Combines Crossover_Stats and Impulse_Reversal to find deep insights.
+    Both frames are only read; the per-trend max retracement is a separate array
+    (see calculate_max_retracement).
     """
-    results = {}
-    
     # --- 1. Correlation of Max Retracement vs Trend Success ---
     # For each trend in stats_df, find the maximum Reversal% recorded in impulse_df
-    max_revs = []
-    for idx, row in stats_df.iterrows():
-        # Find pullbacks that happened during this trend's lifetime
-        related_pb = impulse_df[
-            (impulse_df['Time'] >= row['StartTime']) & 
-            (impulse_df['Time'] <= row['EndTime']) &
-            (impulse_df['Direction'] == row['Direction'])
-        ]
-        
-        if not related_pb.empty:
-            max_revs.append(related_pb['Reversal%'].max())
-        else:
-            max_revs.append(0.0)
-            
-    stats_df['Max_Observed_Retracement'] = max_revs
-    
+    max_revs = calculate_max_retracement(stats_df, impulse_df)
+
     # --- 2. Safe Zone Map ---
     # A safe zone is a retracement level that 90% of trends survive
-    surviving_trends = stats_df[stats_df['Max_Observed_Retracement'] > 0]
-    if not surviving_trends.empty:
-        results['safe_zone_90'] = surviving_trends['Max_Observed_Retracement'].quantile(0.10) # 10th percentile of max retracements that finished? No.
-        # Actually, we want the level that most trends stay above.
-        # Let's say: "90% of observed pullbacks were below X%"
-        results['pullback_90th_percentile'] = impulse_df['Reversal%'].quantile(0.90)
-    
+    surviving = max_revs[max_revs > 0]
+    safe_zone_90 = pullback_90 = np.nan
+    if len(surviving):
+        safe_zone_90 = pd.Series(surviving, copy=False).quantile(0.10)
+        # "90% of observed pullbacks were below X%"
+        pullback_90 = pd.Series(column_view(impulse_df, 'Reversal%'), copy=False).quantile(0.90)
+
     # --- 3. Expectancy Envelope ---
-    avg_gain = stats_df['Distance'].mean()
     # Loss is harder to define without a real SL, but we can use the 90th percentile pullback as a proxy for SL
-    results['avg_expectancy'] = avg_gain # Placeholder for more complex math
-    
-    return results, stats_df
+    avg_gain = pd.Series(column_view(stats_df, 'Distance'), copy=False).mean()
+
+    return FusionResult(safe_zone_90=safe_zone_90, pullback_90th_percentile=pullback_90, avg_expectancy=avg_gain)
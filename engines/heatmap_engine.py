@@ -1,9 +1,53 @@
 import pandas as pd
 import numpy as np
+from config import HEATMAP_CELL_STATS
+from data.validation import column_view, column_mask
+
+# Reversal Bins (0-100% in 5% steps + Overflow) shared by every heatmap
+REVERSAL_BINS = list(range(0, 105, 5)) + [9999]  # Catch all up to 10000%
+REVERSAL_LABELS = [f"{REVERSAL_BINS[i]}-{REVERSAL_BINS[i+1]}%" if REVERSAL_BINS[i+1] <= 100 else ">100%" for i in range(len(REVERSAL_BINS)-1)]
+
+def reversal_bin_index(values):
+    """
+    Maps Reversal % values to their bin position (same left-closed edges as pd.cut(right=False)).
+    Values outside the bins (or NaN) get -1.
+    """
+    values = np.asarray(values, dtype=float)
+    idx = np.searchsorted(REVERSAL_BINS, values, side='right') - 1
+    idx[(idx < 0) | (idx >= len(REVERSAL_LABELS)) | np.isnan(values)] = -1
+    return idx
+
+def _binned_row(bins, atr, mask, total_n):
+    """
+    One matrix row (counts, row %, total %, mean ATR per Reversal bin) of the rows in mask.
+    Works on the binned arrays directly: no subset frame is built.
+    """
+    n_bins = len(REVERSAL_LABELS)
+    row_bins = bins[mask]
+    row_atr = atr[mask]
+    subset_n = len(row_bins)
+
+    binned = row_bins >= 0
+    counts = np.bincount(row_bins[binned], minlength=n_bins)
+
+    # Mean ATR per bin, skipping missing ATRs (0 for empty bins)
+    has_atr = binned & ~np.isnan(row_atr)
+    atr_sums = np.bincount(row_bins[has_atr], weights=row_atr[has_atr], minlength=n_bins)
+    atr_n = np.bincount(row_bins[has_atr], minlength=n_bins)
+    atr_means = np.divide(atr_sums, atr_n, out=np.zeros(n_bins), where=atr_n > 0)
+
+    row_counts = counts.tolist()
+    return (
+        row_counts,
+        [(c / subset_n) * 100.0 if subset_n > 0 else 0.0 for c in row_counts],
+        [(c / total_n) * 100.0 if total_n > 0 else 0.0 for c in row_counts],
+        atr_means.tolist(),
+    )
 
 def calculate_heatmap_matrix(df, ranges, y_col='Impulse'):
     """
     Calculates a frequency matrix for Reversal % across specified ranges of a Y column.
+    df is only read: every row is a mask over column views.
     
     Args:
         df: DataFrame containing the data.
@@ -11,14 +55,17 @@ def calculate_heatmap_matrix(df, ranges, y_col='Impulse'):
         y_col: The column to use for the Y-axis (e.g. 'Impulse' or 'Impulse%').
         
     Returns:
-        matrix_pcts, matrix_counts, matrix_atrs, y_labels, x_labels
+        matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, y_labels, x_labels
+        (six empty lists if there is nothing to bin).
     """
     if df.empty or not ranges:
-        return [], [], [], [], []
+        return [], [], [], [], [], []
 
-    # 1. Define Reversal Bins (0-100% in 5% steps + Overflow)
-    bins = list(range(0, 105, 5)) + [9999]  # Catch all up to 10000%
-    x_labels = [f"{bins[i]}-{bins[i+1]}%" if bins[i+1] <= 100 else ">100%" for i in range(len(bins)-1)]
+    # 1. Reversal Bins (0-100% in 5% steps + Overflow), assigned once for all rows
+    x_labels = list(REVERSAL_LABELS)
+    bins = reversal_bin_index(column_view(df, 'Reversal%'))
+    atr = column_view(df, 'BaseATR_Live').astype(float, copy=False)
+    y_values = column_view(df, y_col)
     
     matrix_counts = []
     matrix_pcts = []
@@ -29,12 +76,11 @@ def calculate_heatmap_matrix(df, ranges, y_col='Impulse'):
     total_n = len(df)
 
     for start, end in ranges:
-        # Filter Data for this Range in the specified Y column
-        mask = (df[y_col] >= start) & (df[y_col] <= end)
-        subset = df[mask].copy() # copy to avoid slice warnings
+        # Rows of this Range in the specified Y column
+        mask = (y_values >= start) & (y_values <= end)
         
         # Create Label with Total Count and % of Total Data
-        subset_n = len(subset)
+        subset_n = int(mask.sum())
         subset_pct_of_total = (subset_n / total_n * 100) if total_n > 0 else 0
         
         # Format requested: Impulse 0.5% (N=225 | 15% of total)
@@ -42,46 +88,280 @@ def calculate_heatmap_matrix(df, ranges, y_col='Impulse'):
         label = f"{y_col} {start}-{end}{unit} (N={subset_n} | {subset_pct_of_total:.1f}% of total)"
         y_labels.append(label)
         
-        if subset.empty:
+        if subset_n == 0:
             matrix_counts.append([0] * len(x_labels))
             matrix_pcts.append([0] * len(x_labels))
             matrix_atrs.append([0] * len(x_labels))
             matrix_total_pcts.append([0] * len(x_labels))
         else:
-            # Bin the Reversal % (including overflow)
-            subset['Bin'] = pd.cut(subset['Reversal%'], bins=bins, include_lowest=True, right=False)
-            counts_series = subset['Bin'].value_counts().sort_index()
-            
-            # Ensure all bins are present even if empty
-            counts_series = counts_series.reindex(subset['Bin'].cat.categories).fillna(0)
-            
-            row_counts = counts_series.astype(int).tolist()
+            row_counts, row_pcts, row_total_pcts, row_atrs = _binned_row(bins, atr, mask, total_n)
             matrix_counts.append(row_counts)
-            
-            # Use subset_n for perfect row-wise percentages
-            matrix_pcts.append([(c / subset_n) * 100.0 if subset_n > 0 else 0.0 for c in row_counts])
+            matrix_pcts.append(row_pcts)
+            matrix_total_pcts.append(row_total_pcts)
+            matrix_atrs.append(row_atrs)
+
+    return matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, y_labels, x_labels
+
+def build_heatmap_index(df, y_col='Impulse', atr_col='BaseATR_Live', session_col='Session_Peak', stat_cols=None):
+    """
+    Precomputes a summed-area index of Reversal % bins over every distinct Y value,
+    per (Session, Direction) group, so any set of Y ranges resolves without rescanning rows.
 
-            # Total Density % (Cell Count / Total dataframe count)
-            matrix_total_pcts.append([(c / total_n) * 100.0 if total_n > 0 else 0.0 for c in row_counts])
+    The fine Y grid is each group's sorted distinct values: a range [start, end] maps to a
+    contiguous block of grid rows with two binary searches, and the block totals are the
+    difference of two cumulative rows. Grid rows are the data values themselves, so rows on
+    a range boundary fall on the same side as with '>= start & <= end'.
 
-            # ATR Calculation Logic
-            atr_series = subset.groupby('Bin', observed=False)['BaseATR_Live'].mean()
-            atr_series = atr_series.reindex(subset['Bin'].cat.categories).fillna(0)
-            matrix_atrs.append(atr_series.tolist())
+    The rows are also kept in grid order with their Reversal bin and the stat_cols values
+    (default: the columns of config.HEATMAP_CELL_STATS), so a block of grid rows is a
+    contiguous slice of rows for query_cell_stats().
 
-    return matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, y_labels, x_labels
+    Memory: the grid has one row per distinct (group, Y) value, so a continuous Y column gives
+    about one grid row per data row. The three cumulative tables are (n_grid + 1) x 22 (the 21
+    Reversal bins + rows outside them) 8-byte values each, ~0.5 KB per grid row: about 0.5 GB per
+    index at 1M rows, plus ~16 bytes per row and stat column for the cell statistics.
+
+    Returns:
+        Dict consumed by query_heatmap_index().
+    """
+    n_bins = len(REVERSAL_LABELS)
+    sessions = df[session_col].to_numpy() if session_col in df.columns else np.full(len(df), None, dtype=object)
+    sess_codes, sess_labels = pd.factorize(sessions, use_na_sentinel=False)
+    dir_codes, dir_labels = pd.factorize(df['Direction'].to_numpy(), use_na_sentinel=False)
+    groups = sess_codes.astype(np.int64) * len(dir_labels) + dir_codes
+    n_groups = len(sess_labels) * len(dir_labels)
+
+    # Every row counts in its group's total (the matrix's '% of total'), even without a Y value
+    group_rows = np.bincount(groups, minlength=n_groups)
+
+    y = df[y_col].to_numpy(dtype=float)
+    keep = ~np.isnan(y)
+    order = np.lexsort((y[keep], groups[keep]))
+    g_sorted = groups[keep][order]
+    y_sorted = y[keep][order]
+
+    # 1. Fine grid: one row per distinct (group, Y) pair, groups contiguous and Y ascending
+    new_row = np.ones(len(y_sorted), dtype=bool)
+    new_row[1:] = (g_sorted[1:] != g_sorted[:-1]) | (y_sorted[1:] != y_sorted[:-1])
+    grid_pos = np.cumsum(new_row) - 1
+    grid_y = y_sorted[new_row]
+    grid_group = g_sorted[new_row]
+    n_grid = len(grid_y)
+
+    # 2. Cell totals per grid row (last column: rows outside the Reversal bins, still part of N)
+    rev_bin = reversal_bin_index(df['Reversal%'].to_numpy(dtype=float)[keep][order])
+    col = np.where(rev_bin >= 0, rev_bin, n_bins)
+    cells = grid_pos * (n_bins + 1) + col
+    counts = np.bincount(cells, minlength=n_grid * (n_bins + 1)).reshape(n_grid, n_bins + 1)
+
+    atr = df[atr_col].to_numpy(dtype=float)[keep][order]
+    has_atr = (rev_bin >= 0) & ~np.isnan(atr)
+    atr_n = np.bincount(cells[has_atr], minlength=n_grid * (n_bins + 1)).reshape(n_grid, n_bins + 1)[:, :n_bins]
+    atr_sum = np.bincount(cells[has_atr], weights=atr[has_atr], minlength=n_grid * (n_bins + 1)).reshape(n_grid, n_bins + 1)[:, :n_bins]
+
+    # 3. Summed-area rows (leading zero row): block [a, b) = cum[b] - cum[a]
+    def cumulative(table, dtype):
+        out = np.zeros((n_grid + 1, table.shape[1]), dtype=dtype)
+        np.cumsum(table, axis=0, out=out[1:])
+        return out
+
+    # 4. Stat columns in grid-row order, as ranks into each column's sorted values (NaN last):
+    #    ordering a cell's values is then an integer sort
+    if stat_cols is None:
+        stat_cols = [col for col, _ in HEATMAP_CELL_STATS.values()]
+    row_ranks, sorted_values = {}, {}
+    for col in dict.fromkeys(stat_cols):
+        if col not in df.columns:
+            continue
+        values = np.asarray(column_view(df, col), dtype=float)[keep][order]
+        by_value = np.argsort(values, kind='stable')
+        row_ranks[col] = np.empty(len(values), dtype=np.int64)
+        row_ranks[col][by_value] = np.arange(len(values))
+        sorted_values[col] = values[by_value]
+
+    return {
+        'y_col': y_col,
+        'sessions': list(sess_labels),
+        'directions': list(dir_labels),
+        'group_rows': group_rows,
+        'group_bounds': np.searchsorted(grid_group, np.arange(n_groups + 1)),
+        'grid_y': grid_y,
+        'cum_counts': cumulative(counts, np.int64),
+        'cum_atr_n': cumulative(atr_n, np.int64),
+        'cum_atr_sum': cumulative(atr_sum, np.float64),
+        'row_bounds': np.append(np.flatnonzero(new_row), len(y_sorted)),
+        'row_bins': rev_bin,
+        'row_ranks': row_ranks,
+        'sorted_values': sorted_values,
+    }
+
+def query_heatmap_index(index, ranges, session='ALL', direction='ALL'):
+    """
+    Heatmap matrices for a set of Y ranges from a build_heatmap_index() index.
+
+    Same output as calculate_heatmap_matrix() on the matching rows: counts are identical,
+    ATR means agree up to floating-point rounding of the cumulative sums.
+    """
+    if not ranges:
+        return [], [], [], [], [], []
+
+    n_dir = len(index['directions'])
+    sess_idx = [i for i, s in enumerate(index['sessions']) if session == 'ALL' or s == session]
+    dir_idx = [i for i, d in enumerate(index['directions']) if direction == 'ALL' or d == direction]
+    groups = [s * n_dir + d for s in sess_idx for d in dir_idx]
+
+    total_n = int(index['group_rows'][groups].sum()) if groups else 0
+    if total_n == 0:
+        return [], [], [], [], [], []
+
+    n_bins = len(REVERSAL_LABELS)
+    starts = np.array([r[0] for r in ranges], dtype=float)
+    ends = np.array([r[1] for r in ranges], dtype=float)
+    counts = np.zeros((len(ranges), n_bins + 1), dtype=np.int64)
+    atr_n = np.zeros((len(ranges), n_bins), dtype=np.int64)
+    atr_sum = np.zeros((len(ranges), n_bins))
+
+    # Two binary searches per range and group, then a difference of cumulative rows
+    for g in groups:
+        lo, hi = index['group_bounds'][g], index['group_bounds'][g + 1]
+        grid_y = index['grid_y'][lo:hi]
+        a = lo + np.searchsorted(grid_y, starts, side='left')
+        b = lo + np.maximum(np.searchsorted(grid_y, ends, side='right'), a - lo)
+        counts += index['cum_counts'][b] - index['cum_counts'][a]
+        atr_n += index['cum_atr_n'][b] - index['cum_atr_n'][a]
+        atr_sum += index['cum_atr_sum'][b] - index['cum_atr_sum'][a]
+
+    y_col = index['y_col']
+    unit = "%" if "Percent" in y_col or "%" in y_col else " pts"
+
+    matrix_counts = []
+    matrix_pcts = []
+    matrix_atrs = []
+    matrix_total_pcts = []
+    y_labels = []
+
+    for r, (start, end) in enumerate(ranges):
+        subset_n = int(counts[r].sum())
+        subset_pct_of_total = (subset_n / total_n * 100) if total_n > 0 else 0
+        y_labels.append(f"{y_col} {start}-{end}{unit} (N={subset_n} | {subset_pct_of_total:.1f}% of total)")
+
+        if subset_n == 0:
+            matrix_counts.append([0] * n_bins)
+            matrix_pcts.append([0] * n_bins)
+            matrix_atrs.append([0] * n_bins)
+            matrix_total_pcts.append([0] * n_bins)
+            continue
+
+        row_counts = counts[r, :n_bins].tolist()
+        matrix_counts.append(row_counts)
+        matrix_pcts.append([(c / subset_n) * 100.0 for c in row_counts])
+        matrix_total_pcts.append([(c / total_n) * 100.0 for c in row_counts])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix_atrs.append(np.where(atr_n[r] > 0, atr_sum[r] / atr_n[r], 0.0).tolist())
+
+    return matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, y_labels, list(REVERSAL_LABELS)
+
+def _stat_quantile(stat):
+    """Quantile of a HEATMAP_CELL_STATS statistic ('median' -> 0.5, 'p90' -> 0.9; None for 'mean')."""
+    if stat == 'mean':
+        return None
+    if stat == 'median':
+        return 0.5
+    if stat.startswith('p') and stat[1:].isdigit():
+        return int(stat[1:]) / 100.0
+    raise ValueError(f"Unknown cell statistic '{stat}' (expected 'mean', 'median' or 'pNN')")
+
+def query_cell_stats(index, ranges, stats=None, session='ALL', direction='ALL'):
+    """
+    Per-cell statistics (config.HEATMAP_CELL_STATS labels) of the heatmap cells that
+    query_heatmap_index() returns for the same arguments.
+
+    The rows of every (range, Reversal bin) cell are gathered as slices of the index, then all
+    requested columns are reduced together: one integer sort orders the values by (column,
+    cell, value rank), so every cell's values are a contiguous sorted run; means come from one
+    bincount and quantiles (linear interpolation, as np.quantile) from each run's start and length.
+
+    Returns:
+        Dict {label: matrix (rows = ranges, columns = Reversal bins)}, NaN for empty cells.
+        Statistics of columns the index does not hold are left out.
+    """
+    stats = [label for label in (HEATMAP_CELL_STATS if stats is None else stats)
+             if HEATMAP_CELL_STATS[label][0] in index['row_ranks']]
+    n_bins = len(REVERSAL_LABELS)
+    n_cells = len(ranges) * n_bins
+    if not stats or not ranges:
+        return {label: [] for label in stats}
+
+    n_dir = len(index['directions'])
+    sess_idx = [i for i, s in enumerate(index['sessions']) if session == 'ALL' or s == session]
+    dir_idx = [i for i, d in enumerate(index['directions']) if direction == 'ALL' or d == direction]
+
+    # 1. Row positions of each range: contiguous slices of the grid-ordered rows per group
+    starts = np.array([r[0] for r in ranges], dtype=float)
+    ends = np.array([r[1] for r in ranges], dtype=float)
+    slices = []
+    for g in (s * n_dir + d for s in sess_idx for d in dir_idx):
+        lo, hi = index['group_bounds'][g], index['group_bounds'][g + 1]
+        grid_y = index['grid_y'][lo:hi]
+        a = lo + np.searchsorted(grid_y, starts, side='left')
+        b = lo + np.maximum(np.searchsorted(grid_y, ends, side='right'), a - lo)
+        slices += [(r, index['row_bounds'][a[r]], index['row_bounds'][b[r]]) for r in range(len(ranges))]
+    lengths = np.array([hi - lo for _, lo, hi in slices], dtype=np.int64)
+    rows = np.concatenate([np.arange(lo, hi) for _, lo, hi in slices]) if slices else np.empty(0, dtype=np.int64)
+    range_of = np.repeat([r for r, _, _ in slices], lengths) if slices else np.empty(0, dtype=np.int64)
+
+    bins = index['row_bins'][rows]
+    binned = bins >= 0
+    cell = range_of[binned] * n_bins + bins[binned]
+    rows = rows[binned]
+
+    # 2. One integer sort over every requested column: key = column * n_cells + cell, then value rank
+    cols = list(dict.fromkeys(HEATMAP_CELL_STATS[label][0] for label in stats))
+    n_rows = len(index['row_bins'])
+    ranks = np.concatenate([index['row_ranks'][col][rows] for col in cols])
+    keys = np.repeat(np.arange(len(cols)) * n_cells, len(rows)) + np.tile(cell, len(cols))
+    composite = np.sort(keys * n_rows + ranks)
+    keys, ranks = np.divmod(composite, n_rows)
+    values = np.concatenate([index['sorted_values'][col] for col in cols])[keys // n_cells * n_rows + ranks]
+    ok = ~np.isnan(values)  # NaN ranks sort last: each cell's run stays contiguous
+    values, keys = values[ok], keys[ok]
+    counts = np.bincount(keys, minlength=len(cols) * n_cells)
+    sums = np.bincount(keys, weights=values, minlength=len(cols) * n_cells)
+    run_starts = np.cumsum(counts) - counts
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for label in stats:
+            col, stat = HEATMAP_CELL_STATS[label]
+            span = slice(cols.index(col) * n_cells, (cols.index(col) + 1) * n_cells)
+            n, first = counts[span], run_starts[span]
+            q = _stat_quantile(stat)
+            if q is None:
+                result = np.where(n > 0, sums[span] / n, np.nan)
+            else:
+                # Position q * (n - 1) inside each cell's sorted run (empty cells read a padded NaN)
+                padded = np.append(values, np.nan)
+                pos = q * np.maximum(n - 1, 0)
+                lo = np.floor(pos).astype(np.int64)
+                hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+                v_lo = padded[np.where(n > 0, first + lo, len(values))]
+                v_hi = padded[np.where(n > 0, first + hi, len(values))]
+                result = v_lo + (v_hi - v_lo) * (pos - lo)
+            out[label] = result.reshape(len(ranges), n_bins).tolist()
+    return out
 
 def calculate_session_comparison_matrix(df):
     """
     Calculates a frequency matrix comparing Reversal % distributions across Sessions.
+    df is only read (same row computation as calculate_heatmap_matrix).
     """
     if df.empty:
         return [], [], [], [], [], []
 
     sessions = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
-    # Bins including overflow
-    bins = list(range(0, 105, 5)) + [9999]
-    x_labels = [f"{bins[i]}-{bins[i+1]}%" if bins[i+1] <= 100 else ">100%" for i in range(len(bins)-1)]
+    x_labels = list(REVERSAL_LABELS)
+    bins = reversal_bin_index(column_view(df, 'Reversal%'))
+    atr = column_view(df, 'BaseATR_Live').astype(float, copy=False)
     
     matrix_counts = []
     matrix_pcts = []
@@ -92,36 +372,22 @@ def calculate_session_comparison_matrix(df):
     total_n = len(df)
 
     for sess in sessions:
-        mask = (df['Session_Peak'] == sess)
-        subset = df[mask].copy()
+        mask = column_mask(df, 'Session_Peak', sess)
         
-        subset_n = len(subset)
+        subset_n = int(mask.sum())
         subset_pct = (subset_n / total_n * 100) if total_n > 0 else 0
         y_labels.append(f"{sess} (N={subset_n} | {subset_pct:.1f}% of total)")
         
-        if subset.empty:
+        if subset_n == 0:
             matrix_counts.append([0] * len(x_labels))
             matrix_pcts.append([0] * len(x_labels))
             matrix_atrs.append([0] * len(x_labels))
             matrix_total_pcts.append([0] * len(x_labels))
         else:
-            # Binning with overflow
-            subset['Bin'] = pd.cut(subset['Reversal%'], bins=bins, include_lowest=True, right=False)
-            counts_series = subset['Bin'].value_counts().sort_index()
-            counts_series = counts_series.reindex(subset['Bin'].cat.categories).fillna(0)
-            
-            row_counts = counts_series.astype(int).tolist()
+            row_counts, row_pcts, row_total_pcts, row_atrs = _binned_row(bins, atr, mask, total_n)
             matrix_counts.append(row_counts)
-            
-            # Pcts (Row-wise) using subset_n for perfect math
-            matrix_pcts.append([(c / subset_n) * 100.0 if subset_n > 0 else 0.0 for c in row_counts])
-            
-            # Total Density %
-            matrix_total_pcts.append([(c / total_n) * 100.0 if total_n > 0 else 0.0 for c in row_counts])
-
-            # ATRs
-            atr_series = subset.groupby('Bin', observed=False)['BaseATR_Live'].mean()
-            atr_series = atr_series.reindex(subset['Bin'].cat.categories).fillna(0)
-            matrix_atrs.append(atr_series.tolist())
+            matrix_pcts.append(row_pcts)
+            matrix_total_pcts.append(row_total_pcts)
+            matrix_atrs.append(row_atrs)
 
     return matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, y_labels, x_labels
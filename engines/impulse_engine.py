@@ -1,33 +1,49 @@
-import pandas as pd
 import numpy as np
-from analytics.statistics import calculate_distribution_stats, calculate_quantiles
+from data.validation import column_view, column_mask
+from engines.results import ImpulseResult, distribution_stats, quantiles
+
+def _scaling_fit(impulse, pullback):
+    """
+    Pearson correlation and least-squares line Pullback = alpha * Impulse + intercept,
+    both from the same centered moments (rows missing either value are skipped).
+    Returns NaNs with fewer than 2 rows.
+    """
+    valid = ~(np.isnan(impulse) | np.isnan(pullback))
+    if not valid.all():
+        impulse, pullback = impulse[valid], pullback[valid]
+    if len(impulse) < 2:
+        return np.nan, np.nan, np.nan
+
+    x_mean, y_mean = impulse.mean(), pullback.mean()
+    dx = impulse - x_mean
+    dy = pullback - y_mean
+    sxx, syy, sxy = dx @ dx, dy @ dy, dx @ dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = sxy / np.sqrt(sxx * syy)
+        alpha = sxy / sxx
+    return correlation, alpha, y_mean - alpha * x_mean
 
 def run_impulse_analysis(df):
     """
     Analyzes Impulse_Reversal.csv data for behavioral intelligence.
+    df is only read (column views, no copies).
     """
-    results = {}
-    
-    # 1. Pullback % Distribution
-    results['pullback_stats'] = calculate_distribution_stats(df['Reversal%'])
-    results['pullback_quantiles'] = calculate_quantiles(df['Reversal%'])
-    
+    reversal = column_view(df, 'Reversal%')
+    impulse = column_view(df, 'Impulse')
+    pullback = column_view(df, 'Pullback')
+
     # 2. Scaling Law (Correlating Impulse Size with Pullback Size)
     # We want to see if larger impulses lead to larger pullbacks
-    correlation = df['Impulse'].corr(df['Pullback'])
-    results['impulse_pullback_corr'] = correlation
-    
-    # Simple Linear Regression: Pullback = alpha * Impulse + epsilon
-    if len(df) > 1:
-        z = np.polyfit(df['Impulse'], df['Pullback'], 1)
-        results['scaling_alpha'] = z[0]  # The slope
-        results['scaling_intercept'] = z[1]
-    
-    # 3. Directional Shock Analysis
-    bullish_rev = df[df['Direction'] == 'BULLISH']['Reversal%']
-    bearish_rev = df[df['Direction'] == 'BEARISH']['Reversal%']
-    
-    results['bullish_rev_stats'] = calculate_distribution_stats(bullish_rev)
-    results['bearish_rev_stats'] = calculate_distribution_stats(bearish_rev)
-    
-    return results, df
+    correlation, alpha, intercept = _scaling_fit(impulse, pullback)
+
+    return ImpulseResult(
+        # 1. Pullback % Distribution
+        pullback_stats=distribution_stats(reversal),
+        pullback_quantiles=quantiles(reversal),
+        impulse_pullback_corr=correlation,
+        scaling_alpha=alpha,  # The slope
+        scaling_intercept=intercept,
+        # 3. Directional Shock Analysis
+        bullish_rev_stats=distribution_stats(reversal[column_mask(df, 'Direction', 'BULLISH')]),
+        bearish_rev_stats=distribution_stats(reversal[column_mask(df, 'Direction', 'BEARISH')]),
+    )
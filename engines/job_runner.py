@@ -0,0 +1,126 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Engine calls are numpy/pandas heavy (GIL released in most kernels), so threads suffice
+MAX_WORKERS = 4
+
+@st.cache_resource
+def get_worker_pool():
+    """Process-wide worker pool shared by every session."""
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="engine")
+
+def _update_fingerprint(h, obj):
+    """Feeds an engine input (frames, arrays, containers, scalars) into a hash."""
+    if isinstance(obj, pd.DataFrame):
+        h.update(repr(tuple(obj.columns)).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(repr(obj.name).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _update_fingerprint(h, item)
+        h.update(b"]")
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=repr):
+            h.update(repr(k).encode())
+            _update_fingerprint(h, obj[k])
+        h.update(b"}")
+    elif hasattr(obj, 'getvalue'):
+        # Uploaded files and in-memory buffers: content hash
+        h.update(obj.getvalue())
+    elif callable(obj):
+        h.update(f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}".encode())
+    else:
+        h.update(repr(obj).encode())
+
+def fingerprint(*objs):
+    """Stable content hash of a set of inputs (same data + same parameters -> same key)."""
+    h = hashlib.sha1()
+    for obj in objs:
+        _update_fingerprint(h, obj)
+    return h.hexdigest()
+
+def _is_frame(obj):
+    return isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray))
+
+def _session_jobs(group):
+    """This session's job handles for one group: {slot: (input_key, Future)}."""
+    jobs = st.session_state.setdefault('_engine_jobs', {})
+    return jobs.setdefault(group, {})
+
+def submit_job(group, slot, fn, *args, input_key=None, **kwargs):
+    """
+    Runs fn(*args, **kwargs) on the worker pool under a named slot of this session.
+
+    If the slot's inputs are unchanged the existing job (running or finished) is reused
+    instead of starting the work again. If they changed, the superseded job is cancelled
+    if it has not started yet; one that is already running runs to completion and its
+    result is dropped.
+
+    input_key: Caller-supplied key of the frame/array arguments (e.g. the pipeline key of the
+        stage they come from, see engines.pipeline.stage_key()); only the other arguments are
+        then hashed. None hashes the frames by content on every call.
+    """
+    jobs = _session_jobs(group)
+    if input_key is None:
+        key = fingerprint(fn, args, kwargs)
+    else:
+        key = fingerprint(fn, input_key, [None if _is_frame(a) else a for a in args],
+                          {k: None if _is_frame(v) else v for k, v in kwargs.items()})
+
+    current = jobs.get(slot)
+    if current is not None:
+        old_key, future = current
+        if old_key == key and not future.cancelled():
+            return future
+        future.cancel()
+
+    future = get_worker_pool().submit(fn, *args, **kwargs)
+    jobs[slot] = (key, future)
+    return future
+
+def cancel_jobs(group, keep=()):
+    """Cancels every job of a group whose slot is not in keep (e.g. charts no longer shown)."""
+    jobs = _session_jobs(group)
+    for slot in [s for s in jobs if s not in keep]:
+        jobs.pop(slot)[1].cancel()
+
+def submit_jobs(group, specs, input_key=None):
+    """
+    Submits one job per slot and cancels the group's jobs for slots that are no longer requested.
+
+    Args:
+        group: Name of the job group (e.g. "imp_heatmaps").
+        specs: Ordered dict {slot: (fn, args, kwargs)}.
+        input_key: Key of the frames the jobs share (see submit_job()).
+
+    Returns:
+        Dict {slot: Future}.
+    """
+    cancel_jobs(group, keep=specs.keys())
+    return {slot: submit_job(group, slot, fn, *args, input_key=input_key, **kwargs) for slot, (fn, args, kwargs) in specs.items()}
+
+def render_as_completed(futures, placeholders, render, pending_text="⏳ Computing..."):
+    """
+    Renders each slot into its placeholder in the order its job finishes, waiting for all of
+    them (jobs reused from an earlier run by submit_job() may already be done).
+    render(slot, result) is called on the script thread, inside the slot's placeholder.
+    """
+    for slot, placeholder in placeholders.items():
+        if not futures[slot].done():
+            placeholder.caption(f"{pending_text} {slot}")
+
+    pending = {futures[slot]: slot for slot in placeholders}
+    for future in as_completed(pending):
+        slot = pending[future]
+        with placeholders[slot].container():
+            render(slot, future.result())
@@ -0,0 +1,90 @@
+import time
+import pandas as pd
+import streamlit as st
+from engines.job_runner import fingerprint
+
+# Stage kinds in dependency order (stage names are '<tab>.<kind>[.<detail>]')
+STAGE_KINDS = ["ingest", "validate", "filter", "engine", "matrix", "figure"]
+
+def begin_run(panel=None):
+    """
+    Starts a rerun: clears the per-run stage log (cached stage outputs are kept).
+    panel: optional placeholder that shows the live diagnostics table.
+    """
+    st.session_state['_stage_log'] = []
+    st.session_state['_stage_panel'] = panel
+
+def _stage_store():
+    """This session's stage outputs: {stage name: (key, output)}."""
+    return st.session_state.setdefault('_stage_outputs', {})
+
+def _upstream(store, dep):
+    """Resolves a dependency: 'stage' or ('stage', item) for one element of a tuple output."""
+    name, item = (dep, None) if isinstance(dep, str) else dep
+    key, value = store[name]
+    return key, (value if item is None else value[item])
+
+def run_stage(name, fn, deps=None, params=None):
+    """
+    Runs one pipeline stage, or reuses its output from an earlier rerun.
+
+    A stage's key is a fingerprint of its name, function, parameters (widget values) and the
+    keys of the stages it reads. Data is never hashed past ingest, so checking a stage is
+    free, and changing a widget only recomputes the stages downstream of it.
+
+    Args:
+        name: Unique stage name, e.g. 'trend.filter'.
+        fn: Called as fn(**upstream_outputs, **params).
+        deps: Dict {argument: 'stage' or ('stage', item)} of upstream outputs to pass.
+        params: Dict of plain keyword arguments.
+
+    Returns:
+        The stage output.
+    """
+    deps = deps or {}
+    params = params or {}
+    store = _stage_store()
+    upstream = {arg: _upstream(store, dep) for arg, dep in deps.items()}
+    key = fingerprint(name, fn, [upstream[arg][0] for arg in deps], params)
+
+    started = time.perf_counter()
+    cached = store.get(name)
+    if cached is not None and cached[0] == key:
+        _log(name, "reused", started)
+        return cached[1]
+
+    value = fn(**{arg: v for arg, (_, v) in upstream.items()}, **params)
+    store[name] = (key, value)
+    _log(name, "computed", started)
+    return value
+
+def stage_key(name):
+    """Key of a stage's current output (fingerprint of its inputs), e.g. to key worker jobs on it."""
+    return _stage_store()[name][0]
+
+def drop_stages(suffix):
+    """Forgets the outputs of the stages whose name ends with suffix, so the next rerun recomputes them."""
+    store = _stage_store()
+    for name in [name for name in store if name.endswith(suffix)]:
+        del store[name]
+
+def _log(name, status, started):
+    """Appends a stage to the rerun's log and refreshes the diagnostics panel."""
+    log = st.session_state.setdefault('_stage_log', [])
+    log.append({'Stage': name, 'Status': status, 'Time (ms)': round((time.perf_counter() - started) * 1000, 1)})
+
+    panel = st.session_state.get('_stage_panel')
+    if panel is not None:
+        with panel.container():
+            render_stage_diagnostics()
+
+def render_stage_diagnostics():
+    """Table of this rerun's stages: which were reused and what the recomputed ones cost."""
+    log = st.session_state.get('_stage_log', [])
+    if not log:
+        st.caption("No pipeline stages ran.")
+        return
+    df = pd.DataFrame(log)
+    reused = int((df['Status'] == "reused").sum())
+    st.caption(f"{reused} of {len(df)} stages reused | {df.loc[df['Status'] == 'computed', 'Time (ms)'].sum():.0f} ms recomputing")
+    st.dataframe(df, hide_index=True, use_container_width=True)
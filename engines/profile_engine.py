@@ -0,0 +1,154 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from config import PROFILE_RESOLUTIONS_MIN, PROFILE_SKETCH_STEP, PROFILE_SKETCH_MAX
+from data.validation import column_view, DERIVED_COLUMNS, DAY_NAMES
+from engines.session_engine import minute_of_week, MINUTES_PER_DAY, MINUTES_PER_WEEK
+from engines.pipeline import run_stage
+from plots.profile_plots import plot_intraday_profile
+
+# Profile cycles: bucket count at 1-minute resolution (broker time, Monday 00:00 = week minute 0)
+PROFILE_CYCLES = {'Day': MINUTES_PER_DAY, 'Week': MINUTES_PER_WEEK}
+
+def build_time_profile(df, time_col, value_cols, sketch_col=None, cycle='Day'):
+    """
+    Minute-resolution profile of events by time of day (or of week), in one pass per column.
+
+    Every event's time is mapped to its minute bucket once; counts, per-column sums and a
+    Reversal% histogram per bucket (a quantile sketch: fixed PROFILE_SKETCH_STEP bins, so
+    adjacent buckets merge by adding) are bincount reductions over those bucket codes.
+
+    Returns:
+        Dict consumed by rollup_profile() and profile_table().
+    """
+    n_buckets = PROFILE_CYCLES[cycle]
+    minutes = minute_of_week(df[time_col]) if time_col in df.columns else np.empty(0, dtype=np.int64)
+    valid = minutes >= 0
+    if cycle == 'Day':
+        minutes = minutes % MINUTES_PER_DAY
+
+    profile = {
+        'cycle': cycle,
+        'bucket_minutes': 1,
+        'counts': np.bincount(minutes[valid], minlength=n_buckets),
+        'sums': {},
+        'value_counts': {},
+        'sketch_col': None,
+        'sketch': None,
+    }
+
+    for col in value_cols:
+        if col not in df.columns and col not in DERIVED_COLUMNS:
+            continue
+        values = np.asarray(column_view(df, col), dtype=float)
+        ok = valid & ~np.isnan(values)
+        profile['sums'][col] = np.bincount(minutes[ok], weights=values[ok], minlength=n_buckets)
+        profile['value_counts'][col] = np.bincount(minutes[ok], minlength=n_buckets)
+
+        if col == sketch_col:
+            n_bins = int(PROFILE_SKETCH_MAX / PROFILE_SKETCH_STEP) + 1
+            bins = np.clip((values[ok] / PROFILE_SKETCH_STEP).astype(np.int64), 0, n_bins - 1)
+            sketch = np.bincount(minutes[ok] * n_bins + bins, minlength=n_buckets * n_bins)
+            profile['sketch_col'] = col
+            profile['sketch'] = sketch.reshape(n_buckets, n_bins).astype(np.int32)
+
+    return profile
+
+def rollup_profile(profile, bucket_minutes):
+    """
+    Coarser view of a profile (e.g. 5, 15 or 60-minute buckets) by adding adjacent buckets;
+    the events are not scanned again.
+    """
+    factor, rest = divmod(bucket_minutes, profile['bucket_minutes'])
+    if rest or factor < 1 or len(profile['counts']) % factor:
+        raise ValueError(f"{bucket_minutes}-minute buckets do not divide {profile['bucket_minutes']}-minute buckets of a {profile['cycle']}")
+    if factor == 1:
+        return profile
+
+    def fold(array):
+        return array.reshape(-1, factor, *array.shape[1:]).sum(axis=1)
+
+    return {
+        **profile,
+        'bucket_minutes': bucket_minutes,
+        'counts': fold(profile['counts']),
+        'sums': {col: fold(v) for col, v in profile['sums'].items()},
+        'value_counts': {col: fold(v) for col, v in profile['value_counts'].items()},
+        'sketch': None if profile['sketch'] is None else fold(profile['sketch']),
+    }
+
+def sketch_quantiles(sketch, q):
+    """Quantile q of each bucket's histogram (linear within the bin; NaN for empty buckets)."""
+    total = sketch.sum(axis=1)
+    cum = np.cumsum(sketch, axis=1)
+    target = q * total
+    rows = np.arange(len(sketch))
+    idx = np.minimum((cum < target[:, None]).sum(axis=1), sketch.shape[1] - 1)
+    below = np.where(idx > 0, cum[rows, idx - 1], 0)
+    in_bin = sketch[rows, idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.where(in_bin > 0, (target - below) / in_bin, 0.0)
+    values = (idx + frac) * PROFILE_SKETCH_STEP
+    return np.where(total > 0, values, np.nan)
+
+def bucket_labels(cycle, bucket_minutes, n_buckets):
+    """'HH:MM' (or 'Mon HH:MM' for weekly profiles) of each bucket's start."""
+    starts = np.arange(n_buckets) * bucket_minutes
+    clock = [f"{(m % MINUTES_PER_DAY) // 60:02d}:{m % 60:02d}" for m in starts]
+    if cycle == 'Week':
+        return [f"{DAY_NAMES[m // MINUTES_PER_DAY][:3]} {c}" for m, c in zip(starts, clock)]
+    return clock
+
+def profile_table(profile, quantiles=(0.50, 0.90)):
+    """
+    Per-bucket table of a profile: Count, 'Mean <col>' per value column and, for the sketch
+    column, 'P50 <col>', 'P90 <col>', ...
+    """
+    counts = profile['counts']
+    table = pd.DataFrame({'Count': counts},
+                         index=pd.Index(bucket_labels(profile['cycle'], profile['bucket_minutes'], len(counts)), name='Bucket'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for col, sums in profile['sums'].items():
+            n = profile['value_counts'][col]
+            table[f"Mean {col}"] = np.where(n > 0, sums / n, np.nan)
+    if profile['sketch'] is not None:
+        for q in quantiles:
+            table[f"P{int(round(q * 100))} {profile['sketch_col']}"] = sketch_quantiles(profile['sketch'], q)
+    return table
+
+def render_profile_ui(source, time_cols, value_cols, key_prefix, sketch_col=None):
+    """
+    Renders the Intraday Time Profile view for a tab.
+
+    Args:
+        source: Pipeline stage holding the tab's filtered events ('stage' or ('stage', item)).
+    """
+    st.markdown("### 🕰️ Intraday Time Profile")
+
+    c1, c2, c3 = st.columns(3)
+    time_col = c1.selectbox("Event Time", time_cols, key=f"{key_prefix}_profile_time")
+    cycle = c2.radio("Cycle", list(PROFILE_CYCLES), horizontal=True, key=f"{key_prefix}_profile_cycle")
+    resolution = c3.select_slider("Bucket (Minutes)", PROFILE_RESOLUTIONS_MIN, value=15, key=f"{key_prefix}_profile_res")
+
+    # Minute-resolution profile per time column and cycle; resolution changes are roll-ups of it
+    profile = run_stage(f"{key_prefix}.profile", build_time_profile, deps={'df': source},
+                        params={'time_col': time_col, 'value_cols': value_cols, 'sketch_col': sketch_col, 'cycle': cycle})
+    table = profile_table(rollup_profile(profile, resolution))
+    if table['Count'].sum() == 0:
+        st.caption("No event times available for a profile.")
+        return
+
+    c1, c2 = st.columns(2)
+    metric = c1.selectbox("Metric", [c for c in table.columns if c != 'Count'], key=f"{key_prefix}_profile_metric")
+    min_count = c2.number_input("Min Events per Bucket", min_value=1, value=5, step=1, key=f"{key_prefix}_profile_min",
+                                help="Buckets with fewer events are greyed out and ignored for the peak.")
+
+    ranked = table.loc[table['Count'] >= min_count, metric].dropna()
+    m1, m2, m3 = st.columns(3)
+    if not ranked.empty:
+        m1.metric(f"Peak {metric}", f"{ranked.max():.2f}", delta=f"at {ranked.idxmax()}", delta_color="off")
+        m2.metric(f"Lowest {metric}", f"{ranked.min():.2f}", delta=f"at {ranked.idxmin()}", delta_color="off")
+    m3.metric("Busiest Bucket", table['Count'].idxmax(), delta=f"{int(table['Count'].max())} events", delta_color="off")
+
+    st.plotly_chart(plot_intraday_profile(table, metric, min_count, f"{cycle} by {time_col}, {resolution}-min buckets (broker time)"),
+                    use_container_width=True)
@@ -0,0 +1,89 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from analytics.statistics import rolling_window_bounds, calculate_rolling_moments, calculate_rolling_quantiles
+from engines.pipeline import run_stage
+from plots.regime_plots import plot_rolling_distribution
+
+def calculate_rolling_distribution(df, value_col, time_col, window_days=30, step='1D', quantiles=(0.50, 0.90), z_threshold=3.0):
+    """
+    Trailing-window distribution statistics of one column, evaluated on a regular time grid.
+
+    Returns:
+        DataFrame indexed by window end: Count, Mean, Std Dev, Skewness, one column per
+        quantile (P50, P90, ...), Drift_Z and a Regime_Shift flag.
+    """
+    data = df[[time_col, value_col]].dropna()
+    if data.empty:
+        return pd.DataFrame()
+
+    # 1. Sort once; every window is a contiguous slice of the sorted arrays
+    order = np.argsort(data[time_col].to_numpy(), kind='stable')
+    times = data[time_col].to_numpy()[order]
+    values = data[value_col].to_numpy(dtype=float)[order]
+
+    first = pd.Timestamp(times[0]).floor('D')
+    last = pd.Timestamp(times[-1]).ceil('D')
+    eval_times = pd.date_range(first + pd.Timedelta(step), last, freq=step)
+    starts, ends = rolling_window_bounds(times, pd.Timedelta(days=window_days), eval_times.to_numpy())
+
+    # 2. Running moments + order statistics for all windows at once
+    roll = pd.DataFrame(calculate_rolling_moments(values, starts, ends), index=eval_times)
+    for q, series in calculate_rolling_quantiles(values, starts, ends, quantiles).items():
+        roll[f"P{int(round(q * 100))}"] = series
+
+    # 3. Drift vs the whole sample: z-score of the window mean
+    global_mean = values.mean()
+    global_std = values.std(ddof=1) if len(values) > 1 else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roll['Drift_Z'] = (roll['Mean'] - global_mean) / (global_std / np.sqrt(roll['Count']))
+    roll['Regime_Shift'] = roll['Drift_Z'].abs() > z_threshold
+
+    return roll[roll['Count'] > 0]
+
+def regime_view(df, value_col, time_col, window_days=30, z_threshold=3.0):
+    """
+    calculate_rolling_distribution() of one column and the whole sample's (median, P90)
+    that the latest window is compared with.
+    """
+    roll = calculate_rolling_distribution(df, value_col, time_col, window_days=window_days, z_threshold=z_threshold)
+    return roll, tuple(df[value_col].quantile([0.50, 0.90]))
+
+def available_columns(df, columns):
+    """The columns of a list that df has, in list order."""
+    return [c for c in columns if c in df.columns]
+
+def render_regime_ui(source, value_cols, time_col, key_prefix):
+    """
+    Renders the Regime Change view (rolling distribution of a chosen metric) for a tab.
+
+    Args:
+        source: Pipeline stage holding the tab's filtered events ('stage' or ('stage', item)).
+    """
+    st.markdown("### 📈 Regime Change View")
+
+    available = run_stage(f"{key_prefix}.regime.metrics", available_columns, deps={'df': source}, params={'columns': value_cols})
+    if not available:
+        st.caption("No metrics available for regime analysis.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    metric = c1.selectbox("Metric", available, key=f"{key_prefix}_regime_metric")
+    window_days = c2.number_input("Trailing Window (Days)", min_value=1, value=30, step=1, key=f"{key_prefix}_regime_window")
+    z_threshold = c3.number_input("Shift Threshold (|Z|)", min_value=0.5, value=3.0, step=0.5, key=f"{key_prefix}_regime_z")
+
+    # Rolling moments and quantiles are recomputed only when the data, metric, window or threshold change
+    roll, (overall_p50, overall_p90) = run_stage(f"{key_prefix}.regime", regime_view, deps={'df': source},
+                                                 params={'value_col': metric, 'time_col': time_col, 'window_days': window_days, 'z_threshold': z_threshold})
+    if roll.empty:
+        st.caption("Not enough data for a rolling view.")
+        return
+
+    latest = roll.iloc[-1]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric(f"Latest Median {metric}", f"{latest['P50']:.2f}", delta=f"{latest['P50'] - overall_p50:.2f} vs all")
+    m2.metric(f"Latest P90 {metric}", f"{latest['P90']:.2f}", delta=f"{latest['P90'] - overall_p90:.2f} vs all")
+    m3.metric("Latest Skew", f"{latest['Skewness']:.2f}")
+    m4.metric("Days Flagged as Shifted", f"{int(roll['Regime_Shift'].sum())} / {len(roll)}")
+
+    st.plotly_chart(plot_rolling_distribution(roll, metric, window_days), use_container_width=True)
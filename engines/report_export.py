@@ -0,0 +1,297 @@
+"""
+Static report export: every configured chart of one or more datasets in one HTML file.
+
+Run with:  python -m engines.report_export --dataset Crossover_Stats.csv Impulse_Reversal.csv
+                                            [--dataset ...] --ranges "0-10, 10-20" [--out report.html]
+
+Figures are built and serialized in a process pool (plotly figure construction is pure
+Python, so threads would serialize on the GIL). The bundle embeds plotly.js and the plotly
+template once; each figure is stored as gzip-compressed JSON and drawn when it scrolls into
+view, so hundreds of figures open quickly. "Print / Save as PDF" turns every figure into a
+static image first, which gives the PDF version through the browser's print dialog.
+"""
+import os
+import gzip
+import json
+import html
+import base64
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+import config
+from data.validation import ensure_derived_columns
+from engines.heatmap_engine import build_heatmap_index, query_heatmap_index
+from engines.session_engine import session_names
+from plots.heatmap_plots import plot_heatmap_matrix, plot_heatmap_3d
+from plots.trend_plots import plot_distance_distribution, plot_duration_vs_distance
+from plots.pullback_plots import plot_reversal_distribution, plot_impulse_vs_pullback
+
+# Distribution charts: chart kind -> (export, plot function, columns it reads)
+DISTRIBUTION_CHARTS = {
+    'distance_distribution': ('stats', plot_distance_distribution, ['Distance', 'Direction']),
+    'duration_vs_distance': ('stats', plot_duration_vs_distance,
+                             ['Duration_Min', 'Distance', 'Direction', 'StartTime', 'EndTime', 'Session_Start']),
+    'reversal_distribution': ('impulse', plot_reversal_distribution, ['Reversal%', 'Direction']),
+    'impulse_vs_pullback': ('impulse', plot_impulse_vs_pullback, ['Impulse', 'Pullback', 'Direction']),
+}
+
+DEFAULT_HEIGHT = 450  # plotly's default when a figure sets no height
+
+def dataset_name(stats=None, impulse=None):
+    """'SYMBOL TF' from the export metadata, or a generic name."""
+    for df in (stats, impulse):
+        if df is not None and not df.empty and 'Symbol' in df.columns:
+            return f"{df['Symbol'].iloc[0]} {df['TF'].iloc[0] if 'TF' in df.columns else ''}".strip()
+    return "Dataset"
+
+def _distribution_tasks(stats, impulse, charts):
+    """(section, plot function, args) of the distribution and scatter charts."""
+    frames = {'stats': stats, 'impulse': impulse}
+    tasks = []
+    for chart in charts:
+        if chart not in DISTRIBUTION_CHARTS:
+            continue
+        kind, plot_fn, columns = DISTRIBUTION_CHARTS[chart]
+        df = frames[kind]
+        if df is None or df.empty:
+            continue
+        if 'Duration_Min' in columns:
+            df = ensure_derived_columns(df.copy(), ['Duration_Min'])
+        # Only the columns the chart reads travel to the render process
+        tasks.append(("Distributions", plot_fn, (df[[c for c in columns if c in df.columns]],)))
+    return tasks
+
+def _heatmap_tasks(impulse, ranges, charts):
+    """(section, plot function, args) of every heatmap: period x direction x (Global Master + sessions)."""
+    from engines.temporal_analysis import get_temporal_options, filter_dataframe_by_period
+    styles = [c for c in ("heatmap_2d", "heatmap_3d") if c in charts]
+    if impulse is None or impulse.empty or not ranges or not styles:
+        return []
+
+    slots = [("Global Master", "ALL")] + [(s, s) for s in session_names()]
+    periods = get_temporal_options(config.REPORT_PERIOD_TYPE)
+    tasks = []
+    for period in periods:
+        df = impulse if period == periods[0] else filter_dataframe_by_period(impulse, config.REPORT_PERIOD_TYPE, period)
+        if df.empty:
+            continue
+        # One summed-area index per period; every direction and session is a lookup
+        index = build_heatmap_index(df, y_col='Impulse', stat_cols=[])
+        for direction in config.REPORT_DIRECTIONS:
+            section = f"{period} · {direction}"
+            for slot, session in slots:
+                matrices = query_heatmap_index(index, ranges, session=session, direction=direction)
+                if not matrices[0]:
+                    continue
+                m_pcts, m_counts, m_atrs, m_tpcts, y_labels, x_labels = matrices
+                title_suffix = f" — {slot} | {period} | {direction}"
+                if "heatmap_2d" in styles:
+                    tasks.append((section, plot_heatmap_matrix, (m_pcts, m_counts, m_atrs, m_tpcts, x_labels, y_labels, title_suffix)))
+                if "heatmap_3d" in styles:
+                    tasks.append((section, plot_heatmap_3d, (m_pcts, x_labels, y_labels, title_suffix)))
+    return tasks
+
+def _render_figure(task):
+    """
+    Builds one figure in a render process.
+
+    Returns:
+        (base64 gzip JSON of the figure without its template, height in px)
+    """
+    plot_fn, args = task
+    fig = plot_fn(*args)
+    # The template is embedded once per report and re-attached in the browser
+    fig.layout.template = None
+    payload = gzip.compress(pio.to_json(fig, validate=False).encode(), compresslevel=6)
+    return base64.b64encode(payload).decode('ascii'), fig.layout.height or DEFAULT_HEIGHT
+
+def render_figures(tasks, max_workers=None, progress=None):
+    """
+    Renders (plot function, args) tasks in a process pool, in task order.
+    progress(done, total) is called as figures arrive.
+    """
+    workers = max_workers or config.REPORT_WORKERS or os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        results = map(_render_figure, tasks)
+        pool = None
+    else:
+        # spawn: the dashboard process runs server threads, which fork would duplicate mid-flight
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        results = pool.map(_render_figure, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+    try:
+        rendered = []
+        for figure in results:
+            rendered.append(figure)
+            if progress is not None:
+                progress(len(rendered), len(tasks))
+        return rendered
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def build_report(datasets, ranges, charts=None, title="Market Research Report", max_workers=None, progress=None):
+    """
+    Renders the report of one or more datasets.
+
+    Args:
+        datasets: List of dicts with 'stats' and/or 'impulse' frames and an optional 'name'.
+        ranges: Impulse ranges [(start, end), ...] of the heatmap rows.
+        charts: Chart kinds to render (default config.REPORT_CHARTS).
+
+    Returns:
+        (HTML document as a string, number of figures)
+    """
+    charts = config.REPORT_CHARTS if charts is None else charts
+    sections = []  # (dataset name, [(section, first task, task count)])
+    tasks = []
+    for dataset in datasets:
+        stats, impulse = dataset.get('stats'), dataset.get('impulse')
+        name = dataset.get('name') or dataset_name(stats, impulse)
+        groups = []
+        for section, plot_fn, args in _distribution_tasks(stats, impulse, charts) + _heatmap_tasks(impulse, ranges, charts):
+            if not groups or groups[-1][0] != section:
+                groups.append((section, len(tasks), 0))
+            groups[-1] = (section, groups[-1][1], groups[-1][2] + 1)
+            tasks.append((plot_fn, args))
+        sections.append((name, groups))
+
+    figures = render_figures(tasks, max_workers=max_workers, progress=progress) if tasks else []
+    return _report_html(title, sections, figures, ranges), len(figures)
+
+def export_report(datasets, ranges, path=None, **kwargs):
+    """Writes build_report() to path (default: a timestamped file in config.REPORTS_DIR) and returns the path."""
+    if path is None:
+        os.makedirs(config.REPORTS_DIR, exist_ok=True)
+        path = os.path.join(config.REPORTS_DIR, f"report_{datetime.datetime.now():%Y%m%d_%H%M%S}.html")
+    document, _ = build_report(datasets, ranges, **kwargs)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(document)
+    return path
+
+# --- HTML bundle ---
+
+REPORT_STYLE = """
+body { background: #0e1117; color: #fafafa; font-family: Arial, sans-serif; margin: 0 auto; max-width: 1400px; padding: 0 24px; }
+a { color: #7fb3ff; }
+nav li { margin: 2px 0; }
+.figure { margin: 12px 0; background: #111; }
+#print { float: right; margin-top: 24px; padding: 6px 14px; }
+@media print {
+  body { background: white; color: black; max-width: none; }
+  nav, #print { display: none; }
+  .figure { break-inside: avoid; page-break-inside: avoid; }
+  .figure img { width: 100%; }
+  h2 { page-break-before: always; }
+}
+"""
+
+# Decompresses plotly.js and the figures (gzip + base64) with the browser's DecompressionStream.
+# Figures are drawn near the viewport and purged far from it, which also keeps the number of
+# live WebGL contexts (3D charts) under the browser limit.
+REPORT_SCRIPT = """
+const inflate = b64 => new Response(new Blob([Uint8Array.from(atob(b64), c => c.charCodeAt(0))])
+    .stream().pipeThrough(new DecompressionStream('gzip'))).text();
+const ready = inflate(document.getElementById('plotly-js').textContent).then(src => {
+    const s = document.createElement('script'); s.textContent = src; document.head.appendChild(s);
+});
+const template = JSON.parse(document.getElementById('plotly-template').textContent);
+const config = {responsive: true, displaylogo: false};
+
+async function draw(div) {
+    if (div.dataset.drawn) return;
+    div.dataset.drawn = '1';
+    await ready;
+    const fig = JSON.parse(await inflate(div.dataset.figure));
+    fig.layout.template = template;
+    await Plotly.newPlot(div, fig.data, fig.layout, config);
+}
+
+const observer = new IntersectionObserver(entries => entries.forEach(e => {
+    if (e.isIntersecting) draw(e.target);
+    else if (e.target.dataset.drawn && !e.target.querySelector('img')) { Plotly.purge(e.target); delete e.target.dataset.drawn; }
+}), {rootMargin: '1500px 0px'});
+document.querySelectorAll('.figure').forEach(div => observer.observe(div));
+
+// Static images of every figure (one at a time), then the print dialog
+document.getElementById('print').addEventListener('click', async () => {
+    observer.disconnect();
+    for (const div of document.querySelectorAll('.figure')) {
+        if (div.querySelector('img')) continue;
+        delete div.dataset.drawn;
+        await draw(div);
+        const url = await Plotly.toImage(div, {format: 'png', width: 1200, height: div.clientHeight});
+        Plotly.purge(div);
+        div.innerHTML = `<img src="${url}">`;
+        div.style.height = 'auto';
+    }
+    window.print();
+});
+"""
+
+def _report_html(title, sections, figures, ranges):
+    """Assembles the report; plotly.js and the template appear once, figures as compressed JSON."""
+    # '</' escaped so the template JSON cannot close its script element
+    template = json.dumps(pio.templates[config.REPORT_TEMPLATE].to_plotly_json()).replace("</", "<\\/")
+    plotly_js = base64.b64encode(gzip.compress(get_plotlyjs().encode(), compresslevel=9)).decode('ascii')
+    range_text = ", ".join(f"{start:g}-{end:g}" for start, end in ranges) or "none (heatmaps skipped)"
+
+    nav, body = [], []
+    for i, (name, groups) in enumerate(sections):
+        nav.append(f'<li><a href="#ds{i}">{html.escape(name)}</a>: '
+                   + " | ".join(f'<a href="#ds{i}-{j}">{html.escape(section)}</a>' for j, (section, _, _) in enumerate(groups))
+                   + "</li>")
+        body.append(f'<h2 id="ds{i}">{html.escape(name)}</h2>')
+        if not groups:
+            body.append("<p>No charts (empty dataset).</p>")
+        for j, (section, first, count) in enumerate(groups):
+            body.append(f'<h3 id="ds{i}-{j}">{html.escape(section)}</h3>')
+            for payload, height in figures[first:first + count]:
+                body.append(f'<div class="figure" style="height:{height}px" data-figure="{payload}"></div>')
+
+    return "\n".join([
+        "<!DOCTYPE html>",
+        f'<html><head><meta charset="utf-8"><title>{html.escape(title)}</title><style>{REPORT_STYLE}</style></head><body>',
+        '<button id="print">Print / Save as PDF</button>',
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>Generated {datetime.datetime.now():%Y-%m-%d %H:%M} · {len(figures)} figures · Impulse ranges: {html.escape(range_text)}</p>",
+        f"<nav><ul>{''.join(nav)}</ul></nav>",
+        *body,
+        f'<script type="application/octet-stream" id="plotly-js">{plotly_js}</script>',
+        f'<script type="application/json" id="plotly-template">{template}</script>',
+        f"<script>{REPORT_SCRIPT}</script>",
+        "</body></html>",
+    ])
+
+def _parse_ranges(text):
+    """'0-10, 10-20' -> [(0.0, 10.0), (10.0, 20.0)]; a single value v is the range (v, v)."""
+    ranges = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        start, _, end = part.partition('-')
+        ranges.append((float(start), float(end or start)))
+    return ranges
+
+if __name__ == "__main__":
+    from data.validation import load_exports, read_uploads
+    parser = argparse.ArgumentParser(description="Export every configured chart of one or more datasets to one HTML report")
+    parser.add_argument("--dataset", nargs=2, action="append", required=True, metavar=("STATS_CSV", "IMPULSE_CSV"),
+                        help="Crossover_Stats and Impulse_Reversal export of one symbol (repeat for more; '-' skips one)")
+    parser.add_argument("--ranges", default="", help="Impulse ranges of the heatmap rows, e.g. '0-10, 10-20'")
+    parser.add_argument("--charts", nargs="+", choices=config.REPORT_CHARTS, default=config.REPORT_CHARTS)
+    parser.add_argument("--title", default="Market Research Report")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help=f"Output HTML file (default: {config.REPORTS_DIR})")
+    args = parser.parse_args()
+
+    datasets = []
+    for stats_path, impulse_path in args.dataset:
+        datasets.append({
+            'stats': load_exports(read_uploads([stats_path]), 'stats') if stats_path != '-' else None,
+            'impulse': load_exports(read_uploads([impulse_path]), 'impulse') if impulse_path != '-' else None,
+        })
+    path = export_report(datasets, _parse_ranges(args.ranges), path=args.out, charts=args.charts, title=args.title,
+                         max_workers=args.workers, progress=lambda done, total: print(f"\r{done}/{total} figures", end="", flush=True))
+    print(f"\nReport written to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
@@ -0,0 +1,70 @@
+import pandas as pd
+from dataclasses import dataclass
+
+# Typed engine results. They only hold scalars (no frames or per-row arrays), so they are
+# cheap to keep in stage caches and to send over the analytics service.
+
+QUANTILE_LEVELS = [0.25, 0.50, 0.75, 0.90, 0.95]
+
+@dataclass(frozen=True, slots=True)
+class DistributionStats:
+    """Higher-order statistics of one column (missing values skipped, as in pandas)."""
+    mean: float
+    median: float
+    std: float
+    skew: float
+    kurtosis: float
+    count: int
+
+@dataclass(frozen=True, slots=True)
+class Quantiles:
+    """Key trading quantiles (QUANTILE_LEVELS) of one column."""
+    q25: float
+    q50: float
+    q75: float
+    q90: float
+    q95: float
+
+@dataclass(frozen=True, slots=True)
+class TrendResult:
+    """Output of run_trend_analysis()."""
+    global_stats: DistributionStats
+    global_quantiles: Quantiles
+    bullish_stats: DistributionStats
+    bearish_stats: DistributionStats
+    avg_duration: float
+    efficiency_stats: DistributionStats
+
+@dataclass(frozen=True, slots=True)
+class ImpulseResult:
+    """Output of run_impulse_analysis(); scaling_* are NaN with fewer than 2 events."""
+    pullback_stats: DistributionStats
+    pullback_quantiles: Quantiles
+    impulse_pullback_corr: float
+    scaling_alpha: float
+    scaling_intercept: float
+    bullish_rev_stats: DistributionStats
+    bearish_rev_stats: DistributionStats
+
+@dataclass(frozen=True, slots=True)
+class FusionResult:
+    """Output of run_fusion_analysis(); the zone levels are NaN when no trend saw a retracement."""
+    safe_zone_90: float
+    pullback_90th_percentile: float
+    avg_expectancy: float
+
+def distribution_stats(values):
+    """DistributionStats of an array (wrapped in a Series view, not copied)."""
+    series = pd.Series(values, copy=False)
+    return DistributionStats(
+        mean=series.mean(),
+        median=series.median(),
+        std=series.std(),
+        skew=series.skew(),
+        kurtosis=series.kurtosis(),
+        count=len(series),
+    )
+
+def quantiles(values):
+    """Quantiles of an array (linear interpolation, missing values skipped)."""
+    return Quantiles(*pd.Series(values, copy=False).quantile(QUANTILE_LEVELS).tolist())
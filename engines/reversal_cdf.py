@@ -0,0 +1,364 @@
+"""
+Conditional Reversal% CDF tables: "given an impulse of size X in session S, how likely is a
+reversal deeper than Y%", per (Direction, Session, Impulse bucket) cell.
+
+Each cell holds its event count N and cumulative counts cum[k] = #(Reversal% < grid[k]) on a
+fixed Reversal% grid. Counts only ever add, so new impulses update a table in place (no
+rescan of older events), and an exported table can be reloaded and extended.
+
+Binary layout (little-endian, read once by an EA with FileReadInteger/Long/Double/String):
+    char[8]   magic "REVCDF01"
+    int32     n_directions, n_sessions, n_buckets, n_points
+    int64     n_events, last_time (broker time, seconds since 1970 = MQL5 datetime)
+    double    grid_start, grid_step             grid[k] = grid_start + k * grid_step
+    double    edges[n_buckets - 1]              bucket = number of edges <= Impulse
+    char[16]  direction names, then session names (NUL padded; the last of each is "ALL")
+    int32     cells[n_directions][n_sessions][n_buckets][1 + n_points]   N, cum[0..n_points-1]
+P(Reversal% > y) = 1 - (cum[k] + (cum[k+1] - cum[k]) * (y - grid[k]) / grid_step) / N.
+
+Build, extend and export from the command line with:
+    python -m engines.reversal_cdf Impulse_Reversal.csv [...] --out reversal_cdf.bin [--update reversal_cdf.bin] [--csv]
+"""
+import io
+import struct
+import argparse
+import streamlit as st
+import pandas as pd
+import numpy as np
+from config import (CDF_IMPULSE_COL, CDF_SESSION_COL, CDF_IMPULSE_BUCKETS, CDF_REVERSAL_STEP, CDF_REVERSAL_MAX,
+                    CDF_MIN_EVENTS, SESSION_SCHEME_EA, VALID_DIRECTIONS)
+from engines.session_engine import session_names
+from engines.pipeline import run_stage
+from plots.reversal_plots import plot_reversal_odds
+
+CDF_MAGIC = b"REVCDF01"
+CDF_NAME_BYTES = 16
+ALL = "ALL"
+
+
+def impulse_bucket_edges(values, n_buckets=CDF_IMPULSE_BUCKETS):
+    """Inner edges of (up to) n_buckets equal-count buckets of the given Impulse values."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values) or n_buckets < 2:
+        return np.empty(0)
+    return np.unique(np.quantile(values, np.arange(1, n_buckets) / n_buckets))
+
+
+def new_reversal_cdf(edges, impulse_col=CDF_IMPULSE_COL, session_col=CDF_SESSION_COL, scheme=SESSION_SCHEME_EA,
+                     step=CDF_REVERSAL_STEP, max_reversal=CDF_REVERSAL_MAX):
+    """Empty table over the given Impulse bucket edges (filled by update_reversal_cdf())."""
+    edges = np.asarray(edges, dtype=float)
+    directions = list(VALID_DIRECTIONS) + [ALL]
+    sessions = session_names(scheme) + [ALL]
+    grid = np.arange(int(round(max_reversal / step)) + 1) * step
+    shape = (len(directions), len(sessions), len(edges) + 1)
+    return {
+        'impulse_col': impulse_col,
+        'session_col': session_col,
+        'directions': directions,
+        'sessions': sessions,
+        'edges': edges,
+        'grid': grid,
+        'n': np.zeros(shape, dtype=np.int64),
+        'cum': np.zeros(shape + (len(grid),), dtype=np.int64),
+        'n_events': 0,
+        'last_time': None,
+    }
+
+
+def _epoch_seconds(times):
+    """datetime64 values -> int64 seconds since 1970 (MQL5 datetime); NaT -> int64 min."""
+    return np.asarray(times).astype('datetime64[s]').astype(np.int64)
+
+
+def update_reversal_cdf(table, impulse_df):
+    """
+    Adds the impulses logged after the table's last event (Time > last_time) to a table.
+
+    The EA logs at most one impulse per bar, so later times are exactly the events the table
+    has not seen: re-feeding an overlapping or full export only adds its new tail. Every event
+    counts in its own cell and in the ALL session / ALL direction cells.
+    """
+    if impulse_df.empty:
+        return table
+    times = _epoch_seconds(impulse_df['Time'].to_numpy())
+    impulse = impulse_df[table['impulse_col']].to_numpy(dtype=float)
+    reversal = impulse_df['Reversal%'].to_numpy(dtype=float)
+    ok = (times != np.iinfo(np.int64).min) & ~np.isnan(impulse) & ~np.isnan(reversal)
+    if table['last_time'] is not None:
+        ok &= times > table['last_time']
+    if not ok.any():
+        return table
+
+    n_dir, n_sess, n_buckets, n_points = table['cum'].shape
+    bucket = np.searchsorted(table['edges'], impulse[ok], side='right')
+    # Event counts in cum[k] for every grid point above it: histogram over the first such k
+    first_point = np.searchsorted(table['grid'], reversal[ok], side='right')
+
+    def codes(col, labels):
+        values = impulse_df[col].to_numpy()[ok] if col in impulse_df.columns else np.full(int(ok.sum()), None, dtype=object)
+        uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+        lookup = np.array([labels.index(u) if u in labels[:-1] else -1 for u in uniques], dtype=np.int64)
+        return lookup[inverse]
+
+    dir_code = codes('Direction', table['directions'])
+    sess_code = codes(table['session_col'], table['sessions'])
+
+    hist = np.zeros(n_dir * n_sess * n_buckets * (n_points + 1), dtype=np.int64)
+    for d in (dir_code, np.full_like(dir_code, n_dir - 1)):
+        for s in (sess_code, np.full_like(sess_code, n_sess - 1)):
+            known = (d >= 0) & (s >= 0)
+            cell = (d[known] * n_sess + s[known]) * n_buckets + bucket[known]
+            hist += np.bincount(cell * (n_points + 1) + first_point[known], minlength=len(hist))
+    hist = hist.reshape(n_dir, n_sess, n_buckets, n_points + 1)
+
+    table['n'] += hist.sum(axis=-1)
+    table['cum'] += np.cumsum(hist, axis=-1)[..., :n_points]
+    table['n_events'] += int(ok.sum())
+    latest = int(times[ok].max())
+    table['last_time'] = latest if table['last_time'] is None else max(table['last_time'], latest)
+    return table
+
+
+def build_reversal_cdf(impulse_df, edges=None, n_buckets=CDF_IMPULSE_BUCKETS, impulse_col=CDF_IMPULSE_COL,
+                       session_col=CDF_SESSION_COL, scheme=SESSION_SCHEME_EA):
+    """
+    Reversal% CDF table of an impulse log (edges default to equal-count Impulse buckets).
+    Later exports extend it with update_reversal_cdf(); its edges stay fixed.
+    """
+    if edges is None:
+        edges = impulse_bucket_edges(impulse_df[impulse_col].to_numpy(dtype=float), n_buckets)
+    table = new_reversal_cdf(edges, impulse_col=impulse_col, session_col=session_col, scheme=scheme)
+    return update_reversal_cdf(table, impulse_df)
+
+
+def _cell_rows(table, impulse, value, session, direction):
+    """
+    (cum table of the session/direction, bucket of each impulse, N of each cell, values);
+    impulse sizes and the per-lookup values broadcast against each other.
+    """
+    if session not in table['sessions'] or direction not in table['directions']:
+        raise ValueError(f"Unknown cell {direction}/{session} (directions: {table['directions']}, sessions: {table['sessions']})")
+    d, s = table['directions'].index(direction), table['sessions'].index(session)
+    impulse, value = np.broadcast_arrays(np.atleast_1d(np.asarray(impulse, dtype=float)), np.asarray(value, dtype=float))
+    bucket = np.searchsorted(table['edges'], impulse.ravel(), side='right')
+    return table['cum'][d, s], bucket, table['n'][d, s, bucket], value.ravel()
+
+
+def reversal_probability(table, impulse, reversal, session=ALL, direction=ALL):
+    """
+    P(Reversal% > reversal) for impulses of the given size(s), interpolated linearly between
+    grid points (binary search on the bucket edges and the grid).
+
+    Returns:
+        (probabilities, N of each cell) arrays; NaN probability for empty cells.
+    """
+    cum, bucket, n, y = _cell_rows(table, impulse, reversal, session, direction)
+    grid = table['grid']
+    k = np.clip(np.searchsorted(grid, y, side='right') - 1, 0, len(grid) - 2)
+    frac = np.clip((y - grid[k]) / (grid[k + 1] - grid[k]), 0.0, 1.0)
+    below = cum[bucket, k] + (cum[bucket, k + 1] - cum[bucket, k]) * frac
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n > 0, 1.0 - below / n, np.nan), n
+
+
+def reversal_quantile(table, impulse, q, session=ALL, direction=ALL):
+    """
+    Reversal% depth that a share q of the cell's impulses stay below (inverse of the CDF by
+    binary search over each cell's cumulative counts). Depths beyond the grid return the
+    last grid point.
+
+    Returns:
+        (depths, N of each cell) arrays; NaN depth for empty cells.
+    """
+    cum, bucket, n, q = _cell_rows(table, impulse, q, session, direction)
+    grid = table['grid']
+    target = q * n
+
+    # First grid point whose cumulative count reaches the target, all lookups halving together
+    lo = np.zeros(len(n), dtype=np.int64)
+    hi = np.full(len(n), len(grid), dtype=np.int64)
+    while (lo < hi).any():
+        mid = (lo + hi) // 2
+        below = cum[bucket, np.minimum(mid, len(grid) - 1)] < target
+        active = lo < hi
+        lo = np.where(active & below, mid + 1, lo)
+        hi = np.where(active & ~below, mid, hi)
+    k = lo
+
+    prev = np.clip(k - 1, 0, len(grid) - 1)
+    at = np.clip(k, 0, len(grid) - 1)
+    c_prev, c_at = cum[bucket, prev], cum[bucket, at]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.where(c_at > c_prev, (target - c_prev) / (c_at - c_prev), 0.0)
+    depth = np.where(k <= 0, grid[0], np.where(k >= len(grid), grid[-1], grid[prev] + frac * (grid[at] - grid[prev])))
+    return np.where(n > 0, depth, np.nan), n
+
+
+def bucket_labels(table):
+    """'lo-hi' Impulse range of each bucket."""
+    bounds = [-np.inf] + list(table['edges']) + [np.inf]
+    return [f"<{hi:g}" if lo == -np.inf else (f">={lo:g}" if hi == np.inf else f"{lo:g}-{hi:g}") for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def reversal_odds_table(table, session=ALL, direction=ALL, thresholds=(40, 50, 75, 100), quantiles=(0.50, 0.90)):
+    """Per Impulse bucket: N, P(Reversal% > t) per threshold and the Reversal% quantiles."""
+    d, s = table['directions'].index(direction), table['sessions'].index(session)
+    n_buckets = len(table['edges']) + 1
+    # Bucket b holds impulses in [edges[b-1], edges[b]): look up each bucket's lower edge
+    probes = np.r_[-np.inf, table['edges']] if n_buckets > 1 else np.array([0.0])
+    odds = pd.DataFrame({'N': table['n'][d, s]}, index=pd.Index(bucket_labels(table), name=table['impulse_col']))
+    for t in thresholds:
+        odds[f"P(>{t:g}%)"] = reversal_probability(table, probes, t, session, direction)[0] * 100.0
+    for q in quantiles:
+        odds[f"P{int(round(q * 100))} Reversal%"] = reversal_quantile(table, probes, q, session, direction)[0]
+    return odds
+
+
+def reversal_cdf_to_bytes(table):
+    """Fixed-layout binary export (see the module docstring)."""
+    n_dir, n_sess, n_buckets, n_points = table['cum'].shape
+    grid = table['grid']
+    cells = np.concatenate([table['n'][..., None], table['cum']], axis=-1)
+    if cells.max(initial=0) > np.iinfo(np.int32).max:
+        raise ValueError("Cell counts exceed the int32 export layout")
+    return b"".join([
+        CDF_MAGIC,
+        struct.pack("<4i", n_dir, n_sess, n_buckets, n_points),
+        struct.pack("<2q", table['n_events'], table['last_time'] or 0),
+        struct.pack("<2d", grid[0], grid[1] - grid[0]),
+        table['edges'].astype('<f8').tobytes(),
+        b"".join(label.encode('ascii')[:CDF_NAME_BYTES].ljust(CDF_NAME_BYTES, b"\0") for label in table['directions'] + table['sessions']),
+        cells.astype('<i4').tobytes(),
+    ])
+
+
+def read_reversal_cdf(data, impulse_col=CDF_IMPULSE_COL, session_col=CDF_SESSION_COL):
+    """
+    Table from reversal_cdf_to_bytes() output (e.g. to extend an exported table).
+
+    Raises:
+        ValueError: If the data is not a Reversal% CDF export.
+    """
+    if data[:8] != CDF_MAGIC:
+        raise ValueError("Not a Reversal% CDF table (bad magic)")
+    n_dir, n_sess, n_buckets, n_points = struct.unpack_from("<4i", data, 8)
+    n_events, last_time = struct.unpack_from("<2q", data, 24)
+    start, step = struct.unpack_from("<2d", data, 40)
+    pos = 56
+    edges = np.frombuffer(data, dtype='<f8', count=n_buckets - 1, offset=pos).astype(float)
+    pos += 8 * (n_buckets - 1)
+    names = [data[pos + i * CDF_NAME_BYTES:pos + (i + 1) * CDF_NAME_BYTES].rstrip(b"\0").decode('ascii') for i in range(n_dir + n_sess)]
+    pos += CDF_NAME_BYTES * (n_dir + n_sess)
+    cells = np.frombuffer(data, dtype='<i4', offset=pos).astype(np.int64).reshape(n_dir, n_sess, n_buckets, n_points + 1)
+    return {
+        'impulse_col': impulse_col,
+        'session_col': session_col,
+        'directions': names[:n_dir],
+        'sessions': names[n_dir:],
+        'edges': edges,
+        'grid': start + np.arange(n_points) * step,
+        'n': cells[..., 0].copy(),
+        'cum': cells[..., 1:].copy(),
+        'n_events': n_events,
+        'last_time': last_time if n_events else None,
+    }
+
+
+def reversal_cdf_to_csv(table):
+    """
+    One CSV row per cell: Direction, Session, Bucket, ImpulseFrom, ImpulseTo, N, then the
+    cumulative count below each grid point (columns 'LT<grid value>').
+    """
+    n_dir, n_sess, n_buckets, n_points = table['cum'].shape
+    bounds = np.r_[-np.inf, table['edges'], np.inf]
+    d, s, b = np.meshgrid(np.arange(n_dir), np.arange(n_sess), np.arange(n_buckets), indexing='ij')
+    d, s, b = d.ravel(), s.ravel(), b.ravel()
+    frame = pd.DataFrame({
+        'Direction': np.array(table['directions'])[d],
+        'Session': np.array(table['sessions'])[s],
+        'Bucket': b,
+        'ImpulseFrom': bounds[b],
+        'ImpulseTo': bounds[b + 1],
+        'N': table['n'].ravel(),
+    })
+    cum = pd.DataFrame(table['cum'].reshape(-1, n_points), columns=[f"LT{g:g}" for g in table['grid']])
+    buffer = io.BytesIO()
+    pd.concat([frame, cum], axis=1).to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def render_reversal_cdf_ui(source, key_prefix):
+    """
+    Renders the Reversal Odds view (conditional Reversal% CDFs) for a tab, with EA exports.
+
+    Args:
+        source: Pipeline stage holding the tab's filtered impulses ('stage' or ('stage', item)).
+    """
+    st.markdown("### 🎲 Reversal Odds")
+
+    c1, c2, c3 = st.columns(3)
+    n_buckets = c1.number_input("Impulse Buckets (Equal Count)", min_value=2, max_value=30, value=CDF_IMPULSE_BUCKETS, step=1,
+                                key=f"{key_prefix}_cdf_buckets")
+    table = run_stage(f"{key_prefix}.cdf", build_reversal_cdf, deps={'impulse_df': source}, params={'n_buckets': n_buckets})
+    if table['n_events'] == 0:
+        st.caption("No impulses with Impulse and Reversal% values for a CDF table.")
+        return
+    session = c2.selectbox("Session", table['sessions'][::-1], key=f"{key_prefix}_cdf_session")
+    direction = c3.selectbox("Direction", table['directions'][::-1], key=f"{key_prefix}_cdf_direction")
+
+    c1, c2 = st.columns(2)
+    impulse = c1.number_input(f"{table['impulse_col']} Size", min_value=0.0, value=float(np.median(table['edges'])) if len(table['edges']) else 0.0,
+                              key=f"{key_prefix}_cdf_impulse")
+    depth = c2.number_input("Reversal Deeper Than (%)", min_value=0.0, max_value=float(table['grid'][-1]), value=50.0, step=5.0,
+                            key=f"{key_prefix}_cdf_depth")
+
+    prob, n = reversal_probability(table, impulse, depth, session, direction)
+    median, _ = reversal_quantile(table, impulse, 0.5, session, direction)
+    m1, m2, m3 = st.columns(3)
+    m1.metric(f"P(Reversal > {depth:g}%)", "—" if np.isnan(prob[0]) else f"{prob[0] * 100:.1f}%")
+    m2.metric("Median Reversal %", "—" if np.isnan(median[0]) else f"{median[0]:.1f}%")
+    m3.metric("Events in Cell", int(n[0]), delta="thin cell" if n[0] < CDF_MIN_EVENTS else None, delta_color="inverse")
+
+    odds = reversal_odds_table(table, session, direction)
+    curves = {label: reversal_probability(table, probe, table['grid'], session, direction)[0] * 100.0
+              for label, probe in zip(odds.index, np.r_[-np.inf, table['edges']]) if odds.loc[label, 'N'] >= CDF_MIN_EVENTS}
+    st.plotly_chart(plot_reversal_odds(table['grid'], curves, f"{direction} | {session} | cells with N >= {CDF_MIN_EVENTS}"),
+                    use_container_width=True)
+    st.dataframe(odds.style.format("{:.1f}", subset=[c for c in odds.columns if c != 'N']), use_container_width=True)
+
+    c1, c2 = st.columns(2)
+    c1.download_button("⬇️ EA Table (Binary)", reversal_cdf_to_bytes(table), file_name="reversal_cdf.bin",
+                       mime="application/octet-stream", key=f"{key_prefix}_cdf_bin")
+    c2.download_button("⬇️ EA Table (CSV)", reversal_cdf_to_csv(table), file_name="reversal_cdf.csv", mime="text/csv",
+                       key=f"{key_prefix}_cdf_csv")
+
+
+if __name__ == "__main__":
+    from data.validation import load_exports, read_uploads
+
+    parser = argparse.ArgumentParser(description="Build or extend Reversal% CDF tables for the EA from Impulse_Reversal exports")
+    parser.add_argument("exports", nargs="+", help="Impulse_Reversal CSV files")
+    parser.add_argument("--out", default="reversal_cdf.bin")
+    parser.add_argument("--update", default=None, help="Existing binary table to extend with the exports' newer impulses")
+    parser.add_argument("--buckets", type=int, default=CDF_IMPULSE_BUCKETS)
+    parser.add_argument("--edges", default=None, help="Comma-separated Impulse bucket edges (default: equal-count buckets)")
+    parser.add_argument("--csv", action="store_true", help="Also write the table as CSV next to --out")
+    args = parser.parse_args()
+
+    impulse_df = load_exports(read_uploads(args.exports), 'impulse')
+    if args.update:
+        with open(args.update, 'rb') as f:
+            table = update_reversal_cdf(read_reversal_cdf(f.read()), impulse_df)
+    else:
+        edges = None if args.edges is None else sorted(float(e) for e in args.edges.split(","))
+        table = build_reversal_cdf(impulse_df, edges=edges, n_buckets=args.buckets)
+
+    with open(args.out, 'wb') as f:
+        f.write(reversal_cdf_to_bytes(table))
+    if args.csv:
+        with open(args.out.rsplit(".", 1)[0] + ".csv", 'wb') as f:
+            f.write(reversal_cdf_to_csv(table))
+    print(f"{table['n_events']} impulses in {len(table['edges']) + 1} buckets x {len(table['sessions'])} sessions x "
+          f"{len(table['directions'])} directions -> {args.out}")
@@ -0,0 +1,132 @@
+import pandas as pd
+import numpy as np
+from data.validation import column_mask
+from engines.survival_engine import map_impulses_to_trends, DIRECTIONS
+
+# Impulse columns gathered into a sequence store unless others are requested
+SEQUENCE_COLUMNS = ['Impulse', 'Pullback', 'Reversal%', 'Peak']
+
+
+def build_impulse_sequences(stats_df, impulse_df, columns=None):
+    """
+    Ragged store of every trend's impulse sequence, in time order.
+
+    Impulses are assigned to trends with one sorted join (map_impulses_to_trends) and
+    ordered by (trend, Time) once. Trend t's events are the flat positions
+    offsets[t]:offsets[t + 1] of every value column, so per-trend queries are
+    reductions over contiguous segments rather than loops over trends.
+
+    Returns:
+        Dict with 'offsets' (n_trends + 1), 'rows' (impulse row of each flat position),
+        'trend' (trend of each flat position), 'trend_sign' (+1 BULLISH / -1 BEARISH per
+        trend) and 'values' {column: flat float array}.
+    """
+    columns = SEQUENCE_COLUMNS if columns is None else columns
+    n_trends = len(stats_df)
+
+    trend_idx = map_impulses_to_trends(stats_df, impulse_df)
+    keep = np.flatnonzero(trend_idx >= 0)
+    rows = keep[np.lexsort((impulse_df['Time'].to_numpy()[keep], trend_idx[keep]))]
+    trend = trend_idx[rows]
+
+    offsets = np.zeros(n_trends + 1, dtype=np.int64)
+    np.cumsum(np.bincount(trend, minlength=n_trends), out=offsets[1:])
+
+    return {
+        'offsets': offsets,
+        'rows': rows,
+        'trend': trend,
+        'trend_sign': np.where(column_mask(stats_df, 'Direction', 'BULLISH'), 1.0, -1.0),
+        'values': {col: impulse_df[col].to_numpy(dtype=float)[rows] for col in dict.fromkeys(columns) if col in impulse_df.columns},
+    }
+
+
+def sequence_lengths(seq):
+    """Number of impulses of every trend."""
+    return np.diff(seq['offsets'])
+
+
+def sequence_positions(seq):
+    """0-based position of every flat entry inside its own sequence."""
+    return np.arange(len(seq['trend'])) - seq['offsets'][seq['trend']]
+
+
+def nth_event(seq, col, n):
+    """
+    Value of each trend's n-th impulse (0 = first, -1 = last), NaN for shorter sequences.
+    nth_event(seq, 'Reversal%', 1) is the depth of every trend's second pullback.
+    """
+    lengths = sequence_lengths(seq)
+    has = lengths > n if n >= 0 else lengths >= -n
+    pos = (seq['offsets'][:-1] if n >= 0 else seq['offsets'][1:]) + n
+    out = np.full(len(lengths), np.nan)
+    out[has] = seq['values'][col][pos[has]]
+    return out
+
+
+def pullbacks_before_peak(seq):
+    """
+    Number of pullbacks each trend made before the impulse that set its extreme Peak
+    (highest for BULLISH, lowest for BEARISH); -1 for trends without impulses.
+    """
+    lengths = sequence_lengths(seq)
+    out = np.full(len(lengths), -1, dtype=np.int64)
+    filled = np.flatnonzero(lengths > 0)
+    if not len(filled):
+        return out
+
+    # Signed peaks make both directions a segment maximum; the first position reaching it wins
+    signed = seq['values']['Peak'] * seq['trend_sign'][seq['trend']]
+    starts = seq['offsets'][filled]
+    seg_max = np.full(len(lengths), np.nan)
+    seg_max[filled] = np.fmax.reduceat(signed, starts)
+    positions = sequence_positions(seq)
+    at_peak = np.where(signed == seg_max[seq['trend']], positions, np.iinfo(np.int64).max)
+    first = np.minimum.reduceat(at_peak, starts)
+    out[filled] = np.where(first < lengths[filled], first, -1)
+    return out
+
+
+def impulse_decay_ratio(seq, col='Impulse'):
+    """
+    Geometric-mean ratio of consecutive impulse sizes inside each trend (< 1: impulses shrink
+    as the trend ages). NaN for trends with fewer than two positive impulses.
+    """
+    values = seq['values'][col]
+    trend = seq['trend']
+    same = trend[1:] == trend[:-1]
+    ok = same & (values[1:] > 0) & (values[:-1] > 0)
+    log_steps = np.log(values[1:][ok] / values[:-1][ok])
+
+    n_trends = len(seq['offsets']) - 1
+    n_steps = np.bincount(trend[1:][ok], minlength=n_trends)
+    sums = np.bincount(trend[1:][ok], weights=log_steps, minlength=n_trends)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n_steps > 0, np.exp(sums / n_steps), np.nan)
+
+
+def summarize_pullback_sequence(seq, col='Reversal%', max_n=5):
+    """
+    Depth of the 1st..max_n-th pullback of every trend, by trend direction.
+
+    Returns:
+        DataFrame: Direction, Pullback (1-based), Trends (reaching that pullback), Median, P90.
+    """
+    columns = ['Direction', 'Pullback', 'Trends', 'Median', 'P90']
+    positions = sequence_positions(seq)
+    first_n = positions < max_n
+    if not first_n.any():
+        return pd.DataFrame(columns=columns)
+
+    flat = pd.DataFrame({
+        'Direction': np.where(seq['trend_sign'][seq['trend'][first_n]] > 0, DIRECTIONS[0], DIRECTIONS[1]),
+        'Pullback': positions[first_n] + 1,
+        'Depth': seq['values'][col][first_n],
+    })
+    grouped = flat.groupby(['Direction', 'Pullback'])['Depth']
+    summary = pd.DataFrame({
+        'Trends': grouped.size(),
+        'Median': grouped.median(),
+        'P90': grouped.quantile(0.90),
+    }).reset_index()
+    return summary[columns]
@@ -0,0 +1,168 @@
+import pandas as pd
+import numpy as np
+from functools import lru_cache
+from config import SESSION_SCHEMES, SESSION_SCHEME_EA, SESSION_TZ_OFFSET_MIN, SESSION_TIME_COLS, SESSION_PROXY_TIME_COLS
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+NO_SESSION = "NONE"
+
+# The epoch (1970-01-01) was a Thursday: shifts epoch minutes onto a Monday-based week
+_EPOCH_WEEK_SHIFT = 3 * MINUTES_PER_DAY
+
+
+def _to_minutes(hhmm):
+    """'HH:MM' -> minutes after midnight."""
+    hours, minutes = map(int, hhmm.split(':'))
+    return hours * 60 + minutes
+
+
+def session_names(scheme=SESSION_SCHEME_EA):
+    """Session labels of a scheme in table order (without NONE)."""
+    return list(dict.fromkeys(window[0] for window in SESSION_SCHEMES[scheme]))
+
+
+def build_session_lookup(table):
+    """
+    Builds the minute-of-week -> session code array of a session table (IST, Monday 00:00 = 0).
+
+    Windows are painted in table order, so later windows win where they overlap, exactly like
+    the EA's chain of 'if(active) current = ...'. A window whose end is not after its start
+    runs past midnight into the next day.
+
+    Returns:
+        (lookup, names): int8 array of MINUTES_PER_WEEK codes and the label of each code
+        (code 0 is NONE).
+    """
+    names = [NO_SESSION] + list(dict.fromkeys(window[0] for window in table))
+    lookup = np.zeros(MINUTES_PER_WEEK, dtype=np.int8)
+
+    for window in table:
+        name, start, end = window[:3]
+        days = window[3] if len(window) > 3 else range(7)
+        start_min, end_min = _to_minutes(start), _to_minutes(end)
+        if end_min <= start_min:
+            end_min += MINUTES_PER_DAY
+
+        code = names.index(name)
+        for day in days:
+            minutes = np.arange(day * MINUTES_PER_DAY + start_min, day * MINUTES_PER_DAY + end_min)
+            lookup[minutes % MINUTES_PER_WEEK] = code
+
+    return lookup, names
+
+
+@lru_cache(maxsize=64)
+def get_session_lookup(scheme, broker_offset_min):
+    """
+    Lookup of a scheme indexed by *broker* minute-of-week (IST = broker - offset + 5:30).
+    Cached, so switching schemes or offsets only costs the gather.
+    """
+    lookup, names = build_session_lookup(SESSION_SCHEMES[scheme])
+    lookup = np.roll(lookup, broker_offset_min - SESSION_TZ_OFFSET_MIN)
+    lookup.flags.writeable = False
+    return lookup, tuple(names)
+
+
+def minute_of_week(times):
+    """Monday-based minute-of-week of each timestamp (-1 for NaT)."""
+    values = pd.to_datetime(times).to_numpy().astype('datetime64[m]')
+    minutes = (values.astype(np.int64) + _EPOCH_WEEK_SHIFT) % MINUTES_PER_WEEK
+    minutes[np.isnat(values)] = -1
+    return minutes
+
+
+def tag_sessions(times, scheme=SESSION_SCHEME_EA, broker_offset_min=0):
+    """
+    Session label of every timestamp under a scheme, in one indexed gather.
+
+    Args:
+        times: Broker timestamps (Series/array of datetimes) as exported by the EA.
+        scheme: Key of config.SESSION_SCHEMES.
+        broker_offset_min: Broker time minus GMT, in minutes.
+
+    Returns:
+        Object array of session labels (NaN where the time is missing).
+    """
+    lookup, names = get_session_lookup(scheme, int(broker_offset_min))
+    minutes = minute_of_week(times)
+    labels = np.array(names, dtype=object)[lookup[minutes]]
+    labels[minutes < 0] = np.nan
+    return labels
+
+
+def infer_broker_offset(times, tags, scheme=SESSION_SCHEME_EA, step_min=15):
+    """
+    Finds the broker GMT offset that best reproduces existing session tags.
+
+    The tags are counted once per (minute-of-week, session) cell; every candidate offset is
+    then scored by a gather over that table, so the cost does not grow with the candidates.
+
+    Returns:
+        (offset_min, agreement%) or (None, nan) when there are no usable tags.
+    """
+    lookup, names = build_session_lookup(SESSION_SCHEMES[scheme])
+    codes = pd.Categorical(tags, categories=names).codes.astype(np.int64)
+    minutes = minute_of_week(times)
+    valid = (codes >= 0) & (minutes >= 0)
+    if not valid.any():
+        return None, np.nan
+
+    counts = np.bincount(minutes[valid] * len(names) + codes[valid], minlength=MINUTES_PER_WEEK * len(names))
+    counts = counts.reshape(MINUTES_PER_WEEK, len(names))
+
+    # Candidates ordered by distance from GMT so ties resolve to the smallest offset
+    candidates = np.arange(-12 * 60, 14 * 60 + 1, step_min)
+    candidates = candidates[np.argsort(np.abs(candidates), kind='stable')]
+    all_minutes = np.arange(MINUTES_PER_WEEK)
+    scores = np.array([
+        counts[all_minutes, np.roll(lookup, int(offset) - SESSION_TZ_OFFSET_MIN)].sum() for offset in candidates
+    ])
+
+    best = int(np.argmax(scores))
+    return int(candidates[best]), scores[best] / valid.sum() * 100
+
+
+def apply_session_scheme(df, scheme, broker_offset_min=None):
+    """
+    Re-tags the session columns that have an exported timestamp (config.SESSION_TIME_COLS).
+    v1 exports also get their untimed columns from proxy timestamps (config.SESSION_PROXY_TIME_COLS).
+
+    Args:
+        df: Stats or Impulse DataFrame as loaded.
+        scheme: Key of config.SESSION_SCHEMES.
+        broker_offset_min: Broker time minus GMT in minutes; None infers it from the EA's own
+            tags (falls back to 0 for exports without session columns).
+
+    Returns:
+        A copy of df with the session columns replaced. The offset used and its agreement
+        with the EA tags are stored in df.attrs.
+    """
+    # v1 exports have no session columns at all: tag every derivable one
+    add_missing = df.attrs.get('schema_version') == 1
+    pairs = [(sess_col, time_col) for sess_col, time_col in SESSION_TIME_COLS.items()
+             if time_col in df.columns and (sess_col in df.columns or add_missing)]
+    if add_missing:
+        for sess_col, time_col in SESSION_PROXY_TIME_COLS:
+            if time_col in df.columns and sess_col not in df.columns and sess_col not in dict(pairs):
+                pairs.append((sess_col, time_col))
+    if not pairs:
+        return df
+
+    agreement = np.nan
+    if broker_offset_min is None:
+        broker_offset_min = 0
+        tagged = [(s, t) for s, t in pairs if s in df.columns]
+        if tagged:
+            inferred, agreement = infer_broker_offset(df[tagged[0][1]], df[tagged[0][0]])
+            if inferred is not None:
+                broker_offset_min = inferred
+
+    df = df.copy(deep=False)
+    for sess_col, time_col in pairs:
+        df[sess_col] = tag_sessions(df[time_col], scheme, broker_offset_min)
+
+    df.attrs['session_scheme'] = scheme
+    df.attrs['broker_offset_min'] = broker_offset_min
+    df.attrs['session_agreement'] = agreement
+    return df
@@ -0,0 +1,209 @@
+import pandas as pd
+import numpy as np
+from data.validation import column_mask
+
+# Retracement depths (%) at which survival is evaluated: 0-200% in 1% steps
+SURVIVAL_LEVELS = np.arange(0, 201, 1.0)
+SESSIONS = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
+DIRECTIONS = ["BULLISH", "BEARISH"]
+
+
+def map_impulses_to_trends(stats_df, impulse_df):
+    """
+    Returns, for every impulse row, the positional index of the trend it belongs to (-1 if none).
+
+    The EA only runs one trend at a time, so every impulse is mapped to the latest trend
+    starting at or before it with a single sorted join instead of a per-trend scan.
+    """
+    trend_idx = np.full(len(impulse_df), -1, dtype=np.int64)
+    if stats_df.empty or impulse_df.empty:
+        return trend_idx
+
+    starts = stats_df['StartTime'].to_numpy()
+    order = np.argsort(starts, kind='stable')
+    times = impulse_df['Time'].to_numpy()
+
+    # Latest trend whose StartTime <= impulse Time
+    pos = np.searchsorted(starts[order], times, side='right') - 1
+    candidate = order[np.clip(pos, 0, None)]
+
+    # Impulse must fall inside the trend and share its direction
+    valid = (pos >= 0) & (times <= stats_df['EndTime'].to_numpy()[candidate])
+    # (directions are validated to BULLISH/BEARISH, so comparing the BULLISH flags is enough)
+    valid &= column_mask(impulse_df, 'Direction', 'BULLISH') == column_mask(stats_df, 'Direction', 'BULLISH')[candidate]
+
+    trend_idx[valid] = candidate[valid]
+    return trend_idx
+
+
+def time_to_trigger_minutes(stats_df, impulse_df):
+    """
+    Minutes from each impulse's base bar to its trigger bar (NaN outside every logged trend).
+
+    The EA sets the base at the trend start and moves it to the trigger bar of every impulse,
+    so the base is the trend's StartTime for its first impulse and the previous impulse's
+    Time within the same trend otherwise.
+    """
+    out = np.full(len(impulse_df), np.nan)
+    trend_idx = map_impulses_to_trends(stats_df, impulse_df)
+    mapped = np.flatnonzero(trend_idx >= 0)
+    if len(mapped) == 0:
+        return out
+
+    times = impulse_df['Time'].to_numpy()[mapped]
+    trends = trend_idx[mapped]
+    order = np.lexsort((times, trends))
+    times, trends = times[order], trends[order]
+
+    bases = stats_df['StartTime'].to_numpy()[trends]
+    same_trend = np.r_[False, trends[1:] == trends[:-1]]
+    bases[same_trend] = times[:-1][same_trend[1:]]
+    out[mapped[order]] = (times - bases) / np.timedelta64(1, 'm')
+    return out
+
+
+def add_time_to_trigger(impulse_df, stats_df):
+    """Copy of impulse_df with TimeToTrigger_Min (see time_to_trigger_minutes()) from the trend log."""
+    impulse_df = impulse_df.copy(deep=False)
+    impulse_df['TimeToTrigger_Min'] = time_to_trigger_minutes(stats_df, impulse_df)
+    return impulse_df
+
+
+def calculate_max_retracement(stats_df, impulse_df):
+    """Returns the deepest Reversal% recorded during each trend's lifetime (0.0 if none)."""
+    max_revs = np.zeros(len(stats_df))
+    trend_idx = map_impulses_to_trends(stats_df, impulse_df)
+    valid = trend_idx >= 0
+
+    np.maximum.at(max_revs, trend_idx[valid], impulse_df['Reversal%'].to_numpy(dtype=float)[valid])
+    return max_revs
+
+
+def _cumulative_survival(depths, group_codes, n_groups, levels):
+    """
+    Counts, per group, how many rows stayed at or below every level.
+
+    Each depth is placed on the level grid once (binary search), the per-group histogram
+    is built with a single bincount and the running total along the levels gives the
+    survivors, so no level ever re-thresholds the data.
+    """
+    n_levels = len(levels)
+    # First level >= depth -> the row survives that level and every deeper one
+    level_idx = np.searchsorted(levels, depths, side='left')
+    hist = np.bincount(group_codes * (n_levels + 1) + level_idx, minlength=n_groups * (n_levels + 1))
+    hist = hist.reshape(n_groups, n_levels + 1)[:, :n_levels]  # drop the overflow column
+    return np.cumsum(hist, axis=1)
+
+
+def calculate_survival_table(df, depth_col, session_col, range_col=None, ranges=None, depths=None, levels=None, sessions=None):
+    """
+    Builds the full survival table of a depth column broken down by Direction, Session and Range.
+
+    Args:
+        df: DataFrame with 'Direction', the session column and (optionally) the range column.
+        depth_col: Column holding the retracement depth in % (ignored if depths is given).
+        session_col: Session column used for the breakdown (e.g. 'Session_Peak').
+        range_col: Column the ranges apply to (e.g. 'Impulse' or 'Distance').
+        ranges: List of tuples [(start, end), ...], inclusive on both ends.
+        depths: Optional precomputed depth array aligned with df.
+        levels: Retracement levels to evaluate (defaults to SURVIVAL_LEVELS).
+        sessions: Session labels to break down by (defaults to SESSIONS).
+
+    Returns:
+        Long DataFrame: Direction, Session, Range, Level, N, Survived, Survival%.
+        Every dimension also carries an 'ALL' aggregate.
+    """
+    levels = SURVIVAL_LEVELS if levels is None else np.asarray(levels, dtype=float)
+    sessions = SESSIONS if sessions is None else list(sessions)
+    columns = ['Direction', 'Session', 'Range', 'Level', 'N', 'Survived', 'Survival%']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    depths = df[depth_col].to_numpy(dtype=float) if depths is None else np.asarray(depths, dtype=float)
+
+    # 1. Encode Direction x Session as a single group code (unknown labels are dropped)
+    dir_codes = pd.Categorical(df['Direction'], categories=DIRECTIONS).codes
+    sess_codes = pd.Categorical(df[session_col], categories=sessions).codes
+    known = (dir_codes >= 0) & (sess_codes >= 0)
+    n_dir, n_sess = len(DIRECTIONS), len(sessions)
+
+    # 2. Range membership (ranges may overlap, so each one gets its own mask)
+    range_labels = ['ALL']
+    range_masks = [known]
+    if ranges and range_col is not None:
+        values = df[range_col].to_numpy(dtype=float)
+        for start, end in ranges:
+            range_labels.append(f"{start}-{end}")
+            range_masks.append(known & (values >= start) & (values <= end))
+
+    # 3. Cumulative counts per (Range, Direction, Session) cell
+    cube = np.zeros((len(range_labels), n_dir + 1, n_sess + 1, len(levels)), dtype=np.int64)
+    n_cube = np.zeros((len(range_labels), n_dir + 1, n_sess + 1), dtype=np.int64)
+    for r, mask in enumerate(range_masks):
+        codes = dir_codes[mask].astype(np.int64) * n_sess + sess_codes[mask]
+        survived = _cumulative_survival(depths[mask], codes, n_dir * n_sess, levels)
+        cube[r, :n_dir, :n_sess] = survived.reshape(n_dir, n_sess, len(levels))
+
+        # Totals per cell (rows deeper than the last level still count in N)
+        n_cube[r, :n_dir, :n_sess] = np.bincount(codes, minlength=n_dir * n_sess).reshape(n_dir, n_sess)
+
+    # 4. 'ALL' marginals along Direction and Session
+    cube[:, n_dir] = cube[:, :n_dir].sum(axis=1)
+    cube[:, :, n_sess] = cube[:, :, :n_sess].sum(axis=2)
+    n_cube[:, n_dir] = n_cube[:, :n_dir].sum(axis=1)
+    n_cube[:, :, n_sess] = n_cube[:, :, :n_sess].sum(axis=2)
+
+    # 5. Flatten into a tidy table
+    dir_labels = DIRECTIONS + ['ALL']
+    sess_labels = sessions + ['ALL']
+    r_idx, d_idx, s_idx, l_idx = np.indices(cube.shape).reshape(4, -1)
+    n_flat = n_cube[r_idx, d_idx, s_idx]
+    survived_flat = cube.reshape(-1)
+
+    table = pd.DataFrame({
+        'Direction': np.array(dir_labels, dtype=object)[d_idx],
+        'Session': np.array(sess_labels, dtype=object)[s_idx],
+        'Range': np.array(range_labels, dtype=object)[r_idx],
+        'Level': levels[l_idx],
+        'N': n_flat,
+        'Survived': survived_flat,
+        'Survival%': np.divide(survived_flat * 100.0, n_flat, out=np.zeros(len(n_flat)), where=n_flat > 0),
+    })
+    return table[table['N'] > 0].reset_index(drop=True)
+
+
+def query_survival(table, level, direction='ALL', session='ALL', range_label='ALL'):
+    """Returns the interpolated Survival% of one group at an arbitrary retracement level."""
+    curve = table[
+        (table['Direction'] == direction) &
+        (table['Session'] == session) &
+        (table['Range'] == range_label)
+    ]
+    if curve.empty:
+        return np.nan
+    return float(np.interp(level, curve['Level'].to_numpy(), curve['Survival%'].to_numpy()))
+
+
+def run_survival_analysis(stats_df, impulse_df, ranges=None, trend_sessions=None):
+    """
+    Retracement survival curves for trends (Crossover_Stats) and impulses (Impulse_Reversal).
+
+    A trend survives a level if its deepest observed pullback never exceeded it; an impulse
+    survives if its own Reversal% stayed at or below it. trend_sessions overrides the
+    Session_Start labels when trends were re-tagged with another session scheme.
+    """
+    results = {}
+
+    if stats_df is not None and not stats_df.empty:
+        max_revs = calculate_max_retracement(stats_df, impulse_df) if impulse_df is not None else np.zeros(len(stats_df))
+        results['trend_survival'] = calculate_survival_table(
+            stats_df, None, 'Session_Start', range_col='Distance', ranges=ranges, depths=max_revs,
+            sessions=trend_sessions
+        )
+
+    if impulse_df is not None and not impulse_df.empty:
+        results['impulse_survival'] = calculate_survival_table(
+            impulse_df, 'Reversal%', 'Session_Peak', range_col='Impulse', ranges=ranges
+        )
+
+    return results
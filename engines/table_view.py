@@ -0,0 +1,78 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+PAGE_SIZES = [25, 50, 100, 250, 1000]
+NO_SORT = "(file order)"
+
+def sort_permutation(df, column, ascending=True):
+    """Row positions of df ordered by one column (stable, missing values last)."""
+    values = pd.Series(df[column].to_numpy())
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+def _cached_permutation(key_prefix, df, column, ascending):
+    """
+    Sort permutations of the frame currently shown under key_prefix, computed once per
+    (column, direction). A new frame (e.g. after a filter change) drops the old ones.
+    """
+    cache = st.session_state.setdefault('_table_sort_cache', {})
+    entry = cache.get(key_prefix)
+    if entry is None or entry['frame'] is not df:
+        entry = {'frame': df, 'perms': {}}
+        cache[key_prefix] = entry
+
+    perm_key = (column, ascending)
+    if perm_key not in entry['perms']:
+        entry['perms'][perm_key] = sort_permutation(df, column, ascending)
+    return entry['perms'][perm_key]
+
+def get_page(df, page, page_size, columns=None, perm=None):
+    """
+    One page of a frame as a small DataFrame (only these rows and columns are copied).
+
+    Args:
+        df: Full frame.
+        page: 1-based page number.
+        page_size: Rows per page.
+        columns: Columns to include (None = all).
+        perm: Optional row order (positions), e.g. from sort_permutation().
+    """
+    start = (page - 1) * page_size
+    rows = np.arange(start, min(start + page_size, len(df))) if perm is None else perm[start:start + page_size]
+    col_idx = [df.columns.get_loc(c) for c in columns] if columns is not None else slice(None)
+    return df.iloc[rows, col_idx]
+
+def _first_page(page_key):
+    """Widget callback: a new sort or page size starts again at page 1."""
+    st.session_state[page_key] = 1
+
+def render_paginated_table(df, key_prefix, default_columns=None):
+    """
+    Renders a raw data table that only sends the current page to the browser.
+    Sorting is done server-side on cached permutations, so paging a sorted view is a slice.
+    """
+    if df.empty:
+        st.caption("No rows to display.")
+        return
+
+    all_columns = list(df.columns)
+    page_key = f"{key_prefix}_tbl_page"
+    reset = {'on_change': _first_page, 'args': (page_key,)}
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    columns = c1.multiselect("Columns", all_columns, default=default_columns or all_columns, key=f"{key_prefix}_tbl_cols")
+    sort_col = c2.selectbox("Sort By", [NO_SORT] + all_columns, key=f"{key_prefix}_tbl_sort", **reset)
+    descending = c3.radio("Order", ["Asc", "Desc"], horizontal=True, key=f"{key_prefix}_tbl_order", **reset) == "Desc"
+    page_size = c4.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key_prefix}_tbl_size", **reset)
+
+    # A filter change can shrink the frame below the stored page
+    n_pages = max(1, -(-len(df) // page_size))
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    perm = None if sort_col == NO_SORT else _cached_permutation(key_prefix, df, sort_col, not descending)
+    page_df = get_page(df, page, page_size, columns=columns or all_columns, perm=perm)
+
+    start = (page - 1) * page_size
+    st.dataframe(page_df, use_container_width=True)
+    st.caption(f"Rows {start + 1:,}–{start + len(page_df):,} of {len(df):,}")
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-from engines.heatmap_engine import calculate_heatmap_matrix
-from plots.heatmap_plots import plot_heatmap_matrix, plot_heatmap_3d
+from engines.heatmap_engine import calculate_heatmap_matrix, reversal_bin_index, REVERSAL_LABELS
+from plots.heatmap_plots import plot_heatmap_matrix, plot_heatmap_3d, plot_heatmap_animation
+from engines.job_runner import submit_jobs, render_as_completed
 
 def get_temporal_options(period_type):
     """
@@ -24,8 +26,10 @@ def filter_dataframe_by_period(df, period_type, selected_period):
     if time_col not in df.columns:
         return pd.DataFrame()
 
-    # Ensure datetime
-    dt_series = pd.to_datetime(df[time_col])
+    # Ensure datetime (skip the parse when the loader already converted it)
+    dt_series = df[time_col]
+    if not pd.api.types.is_datetime64_any_dtype(dt_series):
+        dt_series = pd.to_datetime(dt_series)
     
     if period_type == "Month-wise":
         month_map = {
@@ -46,11 +50,129 @@ def filter_dataframe_by_period(df, period_type, selected_period):
 
     return pd.DataFrame()
 
-def _render_period_chart(df_sub, pm_ranges, period_name, chart_style, period_type_label):
+def calculate_rolling_heatmaps(df, ranges, window_days=90, step_days=7, y_col='Impulse%', atr_col='BaseATR_Live'):
+    """
+    Walk-forward heatmaps over a sliding time window (e.g. 90-day window, 7-day step).
+
+    Rows are sorted by time once and every row's heatmap cells are precomputed. Each step then
+    adds the rows entering the window and subtracts the rows leaving it, so a step costs time
+    proportional to the rows crossing the window edges, not to the window size.
+
+    Returns:
+        frames, range_labels, x_labels. Each frame is a dict with 'start', 'end', 'n' and the
+        same matrices as calculate_heatmap_matrix ('pcts', 'counts', 'atrs', 'total_pcts', 'y_labels').
+    """
+    time_col = 'Time' if 'Time' in df.columns else 'StartTime'
+    if df.empty or not ranges or time_col not in df.columns:
+        return [], [], []
+
+    x_labels = list(REVERSAL_LABELS)
+    n_bins = len(x_labels)
+    n_ranges = len(ranges)
+    unit = "%" if "Percent" in y_col or "%" in y_col else " pts"
+    range_labels = [f"{y_col} {start}-{end}{unit}" for start, end in ranges]
+
+    # 1. Sort once by time
+    times = df[time_col]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times)
+    order = np.argsort(times.to_numpy(), kind='stable')
+    t = times.to_numpy()[order]
+    y = df[y_col].to_numpy(dtype=float)[order]
+    rev_bin = reversal_bin_index(df['Reversal%'].to_numpy(dtype=float)[order])
+    atr = df[atr_col].to_numpy(dtype=float)[order]
+
+    # 2. Row -> cell memberships as a CSR list (ranges may overlap, so a row can hit several cells).
+    # Slot n_bins of each range holds rows outside the Reversal bins: counted in N, never in a cell.
+    member = np.stack([(y >= start) & (y <= end) for start, end in ranges], axis=1)
+    pair_rows, pair_range = np.nonzero(member)
+    row_offsets = np.searchsorted(pair_rows, np.arange(len(t) + 1))
+    slot = np.where(rev_bin[pair_rows] >= 0, rev_bin[pair_rows], n_bins)
+    pair_cell = pair_range * (n_bins + 1) + slot
+    pair_atr = atr[pair_rows]
+    pair_has_atr = ~np.isnan(pair_atr)
+    pair_atr = np.where(pair_has_atr, pair_atr, 0.0)
+
+    n_cells = n_ranges * (n_bins + 1)
+    counts = np.zeros(n_cells, dtype=np.int64)
+    atr_sums = np.zeros(n_cells)
+    atr_counts = np.zeros(n_cells, dtype=np.int64)
+
+    def apply_rows(i0, i1, sign):
+        """Adds (sign=+1) or subtracts (sign=-1) sorted rows [i0, i1) from the running cells."""
+        p0, p1 = row_offsets[i0], row_offsets[i1]
+        if p0 == p1:
+            return
+        cells = pair_cell[p0:p1]
+        counts[:] += sign * np.bincount(cells, minlength=n_cells)
+        atr_sums[:] += sign * np.bincount(cells, weights=pair_atr[p0:p1], minlength=n_cells)
+        atr_counts[:] += sign * np.bincount(cells, weights=pair_has_atr[p0:p1], minlength=n_cells).astype(np.int64)
+
+    # 3. Window grid (half-open [start, end)), bounds resolved with one searchsorted each.
+    # The last window is closed: when the span is a whole number of steps its end is the latest row.
+    window = pd.Timedelta(days=window_days)
+    step = pd.Timedelta(days=step_days)
+    first = pd.Timestamp(t[0]).floor('D')
+    span = pd.Timestamp(t[-1]) - first
+    n_windows = max(1, int(np.ceil((span - window) / step)) + 1) if span >= window else 1
+    starts = pd.date_range(first, periods=n_windows, freq=step)
+    ends = starts + window
+    lo = np.searchsorted(t, starts.to_numpy().astype(t.dtype), side='left')
+    hi = np.searchsorted(t, ends.to_numpy().astype(t.dtype), side='left')
+    hi[-1] = np.searchsorted(t, ends[-1].to_datetime64().astype(t.dtype), side='right')
+
+    # 4. Slide: subtract the rows leaving, add the rows entering
+    frames = []
+    prev_lo, prev_hi = 0, 0
+    for w in range(n_windows):
+        if lo[w] >= prev_hi:
+            # No overlap with the previous window (step >= window): start from scratch
+            counts[:] = 0
+            atr_sums[:] = 0.0
+            atr_counts[:] = 0
+            apply_rows(lo[w], hi[w], 1)
+        else:
+            apply_rows(prev_lo, lo[w], -1)
+            apply_rows(prev_hi, hi[w], 1)
+        prev_lo, prev_hi = lo[w], hi[w]
+
+        grid = counts.reshape(n_ranges, n_bins + 1)
+        subset_n = grid.sum(axis=1)
+        total_n = int(hi[w] - lo[w])
+        cell_counts = grid[:, :n_bins]
+        cell_atr_n = atr_counts.reshape(n_ranges, n_bins + 1)[:, :n_bins]
+        cell_atr_sum = atr_sums.reshape(n_ranges, n_bins + 1)[:, :n_bins]
+
+        frames.append({
+            'start': starts[w],
+            'end': ends[w],
+            'n': total_n,
+            'counts': cell_counts.tolist(),
+            'pcts': np.divide(cell_counts * 100.0, subset_n[:, None], out=np.zeros(cell_counts.shape), where=subset_n[:, None] > 0).tolist(),
+            'total_pcts': (cell_counts * 100.0 / total_n if total_n > 0 else np.zeros(cell_counts.shape)).tolist(),
+            'atrs': np.divide(cell_atr_sum, cell_atr_n, out=np.zeros(cell_atr_sum.shape), where=cell_atr_n > 0).tolist(),
+            'y_labels': [
+                f"{label} (N={n} | {(n / total_n * 100) if total_n > 0 else 0:.1f}% of total)"
+                for label, n in zip(range_labels, subset_n)
+            ],
+        })
+
+    return frames, range_labels, x_labels
+
+def _period_matrix(df, period_type, period_name, pm_ranges):
+    """
+    Worker-side helper: filters one period and computes its heatmap matrix (None if empty).
+    """
+    df_sub = filter_dataframe_by_period(df, period_type, period_name)
+    if df_sub.empty:
+        return None
+    return calculate_heatmap_matrix(df_sub, pm_ranges, y_col='Impulse%')
+
+def _render_period_chart(matrices, period_name, chart_style, period_type_label):
     """
     Helper to render a single heatmap chart for a specific period.
     """
-    pcts, counts, atrs, total_pcts, y_labels, x_labels = calculate_heatmap_matrix(df_sub, pm_ranges, y_col='Impulse%')
+    pcts, counts, atrs, total_pcts, y_labels, x_labels = matrices
 
     st.markdown(f"##### {period_name} ({period_type_label})")
     title_suffix = f" — {period_name}"
@@ -62,16 +184,53 @@ def _render_period_chart(df_sub, pm_ranges, period_name, chart_style, period_typ
         fig = plot_heatmap_3d(pcts, x_labels, y_labels, title_suffix=title_suffix)
         st.plotly_chart(fig, use_container_width=True)
 
-def render_temporal_analysis_ui(df_pm, pm_ranges):
+def _render_rolling_chart(df_sub, pm_ranges, window_days, step_days, chart_style):
+    """
+    Helper to render the walk-forward view: an animated heatmap over every window,
+    plus a slider to inspect one window in the regular chart style.
+    """
+    frames, range_labels, x_labels = calculate_rolling_heatmaps(df_sub, pm_ranges, window_days, step_days, y_col='Impulse%')
+    if not frames:
+        st.warning("No data found for rolling analysis.")
+        return
+
+    st.caption(f"{len(frames)} windows of {window_days} days, stepping {step_days} days.")
+    st.plotly_chart(plot_heatmap_animation(frames, range_labels, x_labels, title_suffix=f" — {window_days}D / {step_days}D"), use_container_width=True)
+
+    if len(frames) > 1:
+        w = st.slider("Inspect Window", 1, len(frames), len(frames), key="temp_roll_idx") - 1
+    else:
+        w = 0
+    frame = frames[w]
+    period_name = f"{frame['start']:%Y.%m.%d} — {frame['end']:%Y.%m.%d}"
+    st.markdown(f"##### {period_name} (Rolling)")
+
+    if chart_style == "2D Grid":
+        fig = plot_heatmap_matrix(frame['pcts'], frame['counts'], frame['atrs'], frame['total_pcts'], x_labels, frame['y_labels'], title_suffix=f" — {period_name}")
+    else:
+        fig = plot_heatmap_3d(frame['pcts'], x_labels, frame['y_labels'], title_suffix=f" — {period_name}")
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_temporal_analysis_ui(df_pm, pm_ranges, input_key=None):
     """
     Renders the UI and Heatmaps for Temporal Analysis.
     Isolates this logic from main.py.
+    input_key: key of df_pm for the period jobs (see job_runner.submit_job()).
     """
-    st.markdown("#### ⏳ Temporal Analysis (Month/Quarter)")
+    st.markdown("#### ⏳ Temporal Analysis (Month/Quarter/Rolling)")
     
     # 1. Period Type Selector
     c1, c2, c3 = st.columns(3)
-    period_type = c1.selectbox("Select Time View", ["Month-wise", "Quarter-wise"], key="temp_period_type")
+    period_type = c1.selectbox("Select Time View", ["Month-wise", "Quarter-wise", "Rolling Window"], key="temp_period_type")
+    
+    if period_type == "Rolling Window":
+        w1, w2 = c2.columns(2)
+        window_days = w1.number_input("Window (Days)", min_value=1, value=90, step=1, key="temp_roll_window")
+        step_days = w2.number_input("Step (Days)", min_value=1, value=7, step=1, key="temp_roll_step")
+        chart_style = c3.radio("Chart Style", ["2D Grid", "3D Topography"], horizontal=True, key="temp_view_mode")
+        st.divider()
+        _render_rolling_chart(df_pm, pm_ranges, window_days, step_days, chart_style)
+        return
     
     # 2. Specific Period Selector
     options = get_temporal_options(period_type)
@@ -91,15 +250,18 @@ def render_temporal_analysis_ui(df_pm, pm_ranges):
     else:
         periods_to_render = [selected_period]
         
-    # Render Loop
-    for p_name in periods_to_render:
-        df_filtered = filter_dataframe_by_period(df_pm, period_type, p_name)
-        
-        if df_filtered.empty:
+    # Render Loop: one worker job per period, charts fill in as their jobs finish
+    specs = {p_name: (_period_matrix, (df_pm, period_type, p_name, pm_ranges), {}) for p_name in periods_to_render}
+    futures = submit_jobs("temporal_heatmaps", specs, input_key=input_key)
+    placeholders = {p_name: st.empty() for p_name in periods_to_render}
+
+    def render(p_name, matrices):
+        if matrices is None:
             if not selected_period.startswith("All"):
                 st.warning(f"No data found for **{p_name}**.")
-            continue
-            
-        _render_period_chart(df_filtered, pm_ranges, p_name, chart_style, period_type.split('-')[0])
+            return
+        _render_period_chart(matrices, p_name, chart_style, period_type.split('-')[0])
         if selected_period.startswith("All"):
             st.divider()
+
+    render_as_completed(futures, placeholders, render)
@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
-from config import APP_TITLE, APP_SUBTITLE
-from data.validation import load_and_validate_stats, load_and_validate_impulse
+import numpy as np
+from config import APP_TITLE, APP_SUBTITLE, STATS_ANALYSIS_COLS, IMPULSE_ANALYSIS_COLS, SESSION_SCHEMES, SESSION_SCHEME_EA, ANALYTICS_SERVICE_URL, HEATMAP_CELL_STATS
+from data.validation import with_derived_columns, read_uploads, load_exports, export_summary
+from data.filters import filter_trends, filter_impulses, apply_session_coherence, filter_price_moves, filter_fusion_inputs
+from engines.pipeline import run_stage, begin_run, stage_key, drop_stages
+from service.client import DatasetGone
 
 # --- Page Config ---
 st.set_page_config(page_title=APP_TITLE, layout="wide")
@@ -13,8 +17,11 @@ st.divider()
 
 # --- Sidebar: Interface Layer ---
 st.sidebar.header("📂 Data Ingest")
-uploaded_stats = st.sidebar.file_uploader("Upload Crossover_Stats.csv", type=['csv'])
-uploaded_impulse = st.sidebar.file_uploader("Upload Impulse_Reversal.csv", type=['csv'])
+# Several (overlapping) exports of the same EA setup can be uploaded; they are merged without duplicates
+uploaded_stats = st.sidebar.file_uploader("Upload Crossover_Stats.csv", type=['csv'], accept_multiple_files=True)
+uploaded_impulse = st.sidebar.file_uploader("Upload Impulse_Reversal.csv", type=['csv'], accept_multiple_files=True)
+# Optional baseline (earlier scan, other symbol or period) the Impulse tab's heatmaps are tested against for drift
+uploaded_baseline = st.sidebar.file_uploader("Upload Baseline Impulse_Reversal.csv (Drift Detection)", type=['csv'], accept_multiple_files=True)
 
 st.sidebar.divider()
 st.sidebar.header("🔍 Analysis Selection")
@@ -41,7 +48,6 @@ else:
         from engines.fusion_engine import run_fusion_analysis
         from plots.trend_plots import plot_distance_distribution, plot_duration_vs_distance
         from plots.pullback_plots import plot_reversal_distribution, plot_impulse_vs_pullback
-        from engines.heatmap_engine import calculate_heatmap_matrix
         from plots.heatmap_plots import plot_heatmap_matrix
 
         def parse_multi_range(range_str):
@@ -74,15 +80,6 @@ else:
                 curr = nxt
             return ", ".join(ranges_list)
 
-        def apply_multi_range_filter(df, column, ranges):
-            """Filters dataframe where column value matches ANY of the provided ranges"""
-            if not ranges:
-                return df
-            mask = pd.Series(False, index=df.index)
-            for start, end in ranges:
-                mask |= (df[column] >= start) & (df[column] <= end)
-            return df[mask]
-
         # --- Sidebar UI ---
         st.sidebar.title("📊 Market Engine Filters")
         st.sidebar.info("Upload your CSV files here to begin analysis.")
@@ -94,6 +91,115 @@ else:
 
         days_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
+        # Session Scheme (re-tags sessions from timestamps instead of re-running the EA)
+        from engines.session_engine import session_names
+        st.sidebar.divider()
+        st.sidebar.header("🕒 Session Definitions")
+        session_scheme = st.sidebar.selectbox("Session Scheme", ["As Exported (EA)"] + list(SESSION_SCHEMES), key="session_scheme")
+        broker_offset_min = None
+        if session_scheme != "As Exported (EA)":
+            if not st.sidebar.checkbox("Auto-detect Broker GMT Offset", value=True, key="session_auto_offset"):
+                broker_offset_min = int(round(st.sidebar.number_input("Broker GMT Offset (Hours)", value=2.0, step=0.25, key="session_offset_h") * 60))
+            st.sidebar.caption("Re-tags Session_Start, Session_End and Session_Trigger. Session_Peak and Session_Base keep the EA tags (peak/base bar times are not exported).")
+        # Labels of the re-taggable session columns; Session_Peak views keep the EA's sessions
+        scheme_sessions = session_names(SESSION_SCHEME_EA if session_scheme == "As Exported (EA)" else session_scheme)
+        # Session heatmaps slice on the peak's session; a re-tagging scheme only reaches Session_Trigger
+        heatmap_session_col = 'Session_Peak' if session_scheme == "As Exported (EA)" else 'Session_Trigger'
+
+        def load_stage(prefix, files, kind, columns):
+            """Ingest + validate stages of a tab; reruns reuse the parsed data until files or scheme change."""
+            run_stage(f"{prefix}.ingest", read_uploads, params={'files': files})
+            df = run_stage(f"{prefix}.validate", load_exports, deps={'buffers': f"{prefix}.ingest"},
+                           params={'kind': kind, 'columns': columns, 'scheme': session_scheme, 'broker_offset_min': broker_offset_min})
+
+            export_captions(df.attrs, len(df))
+            return df
+
+        def export_captions(attrs, rows):
+            """Merge and session re-tag notes of a loaded export (its attrs, local or from the analytics service)."""
+            if 'merged_exports' in attrs:
+                st.caption(f"🧩 Merged {attrs['merged_exports']} exports into {rows} events ({attrs['duplicates_dropped']} overlapping duplicates dropped).")
+            if 'broker_offset_min' in attrs:
+                offset_h = attrs['broker_offset_min'] / 60
+                agreement = attrs['session_agreement']
+                detail = f" (auto-detected, matches {agreement:.1f}% of EA tags)" if broker_offset_min is None and pd.notna(agreement) else ""
+                st.caption(f"🕒 Sessions re-tagged with **{attrs['session_scheme']}** at broker offset GMT{offset_h:+g}h{detail}.")
+
+        def export_stage(prefix, files, kind, columns, timed=False):
+            """
+            A tab's export as data.validation.export_summary(). In service mode it is only uploaded to
+            the analytics service, which parses and filters it (the summary also holds its 'dataset' id).
+            """
+            if service_url:
+                registration = service_dataset(prefix, files, kind, columns, timed)
+                export_captions(registration['attrs'], registration['rows'])
+                return registration
+            return export_summary(load_stage(prefix, files, kind, columns))
+
+        def trigger_time_stage(prefix):
+            """
+            Stage of a tab's impulses with TimeToTrigger_Min when Crossover_Stats is uploaded
+            (the impulse export alone does not tell which trend, and so which base bar, an impulse belongs to).
+            """
+            if not uploaded_stats:
+                return f"{prefix}.validate"
+            from engines.survival_engine import add_time_to_trigger
+            run_stage(f"{prefix}.trends.ingest", read_uploads, params={'files': uploaded_stats})
+            run_stage(f"{prefix}.trends.validate", load_exports, deps={'buffers': f"{prefix}.trends.ingest"},
+                      params={'kind': 'stats', 'columns': STATS_ANALYSIS_COLS['timing']})
+            run_stage(f"{prefix}.timing", add_time_to_trigger, deps={'impulse_df': f"{prefix}.validate", 'stats_df': f"{prefix}.trends.validate"})
+            return f"{prefix}.timing"
+
+        def draw_heatmap(matrices, chart_style, title_suffix, cell_metric=None, cell_values=None):
+            """Draws heatmap matrices in the selected chart style (None if the slice is empty)."""
+            from plots.heatmap_plots import plot_heatmap_3d
+            if not matrices[0]:
+                return None
+            m_pcts, m_counts, m_atrs, m_tpcts, y_labels, x_labels = matrices
+            if chart_style == "2D Grid":
+                return plot_heatmap_matrix(m_pcts, m_counts, m_atrs, m_tpcts, x_labels, y_labels, title_suffix=title_suffix,
+                                           cell_metric=cell_metric if cell_values else None, cell_values=cell_values)
+            return plot_heatmap_3d(m_pcts, x_labels, y_labels, title_suffix=title_suffix)
+
+        def heatmap_figure(index, ranges, session, direction, chart_style, title_suffix, cell_metric=None):
+            """Queries one heatmap (and its cell metric, if any) from a summed-area index and draws it."""
+            from engines.heatmap_engine import query_heatmap_index, query_cell_stats
+            cell_values = None
+            if cell_metric and chart_style == "2D Grid":
+                cell_values = query_cell_stats(index, ranges, [cell_metric], session=session, direction=direction).get(cell_metric)
+            return draw_heatmap(query_heatmap_index(index, ranges, session=session, direction=direction), chart_style, title_suffix,
+                                cell_metric, cell_values)
+
+        def remote_heatmap_figure(url, query, chart_style, title_suffix, cell_metric=None):
+            """Fetches one heatmap's matrices (and its cell metric, if any) from the analytics service and draws it."""
+            from service.client import service_request
+            cell_values = None
+            if cell_metric and chart_style == "2D Grid":
+                cell_values = service_request(url, "heatmap_cells", {**query, 'stats': [cell_metric]}).get(cell_metric)
+            return draw_heatmap(service_request(url, "heatmap", query), chart_style, title_suffix, cell_metric, cell_values)
+
+        def service_dataset(prefix, files, kind, columns, timed=False):
+            """
+            Registers a tab's uploads with the analytics service (again only when files or scheme change)
+            and releases the dataset they replace. timed impulse datasets are registered with the trend
+            log for TimeToTrigger_Min (see trigger_time_stage()).
+            """
+            from service.client import register_dataset, release_dataset
+            run_stage(f"{prefix}.ingest", read_uploads, params={'files': files})
+            deps = {'buffers': f"{prefix}.ingest"}
+            if timed and uploaded_stats:
+                service_dataset(f"{prefix}.trends", uploaded_stats, 'stats', STATS_ANALYSIS_COLS['timing'])
+                deps['trends'] = (f"{prefix}.trends.service", 'dataset')
+            registration = run_stage(f"{prefix}.service", register_dataset, deps=deps,
+                                     params={'url': service_url, 'kind': kind, 'columns': columns, 'scheme': session_scheme, 'broker_offset_min': broker_offset_min})
+
+            # The service holds datasets until released: drop this session's previous one for the prefix
+            held = st.session_state.setdefault('_service_datasets', {})
+            previous, held[prefix] = held.get(prefix), registration['dataset']
+            if previous not in (None, registration['dataset']) and previous not in held.values():
+                release_dataset(service_url, previous)
+            return registration
+
         # 5. Universal Range Generator (SIDEBAR)
         st.sidebar.divider()
         st.sidebar.header("🛠️ Universal Range Setup")
@@ -123,6 +229,41 @@ else:
             # Additional Reversal Filtering (Optional)
             st.sidebar.text_input("Reversal % Filtering Bands (Global)", value="0-100", key="global_rev_input")
 
+        # Optional thin-client mode: engine results and heatmap matrices come from a shared
+        # analytics service (python -m service.server) instead of this process
+        st.sidebar.divider()
+        st.sidebar.header("🛰️ Analytics Service")
+        service_url = st.sidebar.text_input("Service URL", value=ANALYTICS_SERVICE_URL, key="service_url",
+                                            placeholder="http://127.0.0.1:8765", help="Leave empty to compute everything locally.").strip()
+
+        # Pipeline diagnostics: which stages this rerun reused vs recomputed
+        with st.sidebar.expander("⚙️ Pipeline Diagnostics"):
+            begin_run(st.empty())
+
+        # Static HTML report of every configured chart for the uploaded exports
+        # (several symbols at once: python -m engines.report_export)
+        with st.sidebar.expander("📦 Report Export"):
+            from config import REPORT_CHARTS
+            report_charts = st.multiselect("Charts", REPORT_CHARTS, default=REPORT_CHARTS, key="report_charts")
+            st.caption("Heatmaps use the Impulse (Point) Ranges above: Global Master + every session, per month and direction.")
+            if st.button("Build HTML Report", key="report_build"):
+                if not uploaded_stats and not uploaded_impulse:
+                    st.warning("Upload at least one export first.")
+                else:
+                    from engines.report_export import build_report
+                    dataset = {
+                        'stats': load_stage("report.stats", uploaded_stats, 'stats', STATS_ANALYSIS_COLS['trend']) if uploaded_stats else None,
+                        'impulse': load_stage("report.impulse", uploaded_impulse, 'impulse', IMPULSE_ANALYSIS_COLS['behavior']) if uploaded_impulse else None,
+                    }
+                    report_bar = st.progress(0.0, text="Rendering figures...")
+                    st.session_state['report_html'] = build_report(
+                        [dataset], parse_multi_range(st.session_state.get('sess_hm_input', "")), charts=report_charts,
+                        progress=lambda done, total: report_bar.progress(done / total, text=f"{done}/{total} figures"))
+            if 'report_html' in st.session_state:
+                report_doc, report_n = st.session_state['report_html']
+                st.download_button(f"⬇️ Download Report ({report_n} figures, {len(report_doc) / 1e6:.1f} MB)", report_doc,
+                                   file_name="market_research_report.html", mime="text/html", key="report_download")
+
         # Selection Logic
 
         # Selection Logic
@@ -131,7 +272,7 @@ else:
                 st.warning("⚠️ Please upload `Crossover_Stats.csv` in the sidebar to run Trend Intelligence.")
             else:
                 st.subheader("🔵 Crossover Trend Intelligence")
-                df_raw = load_and_validate_stats(uploaded_stats)
+                export = export_stage("trend", uploaded_stats, 'stats', STATS_ANALYSIS_COLS['trend'])
                 
                 # --- Contextual Filters ---
                 with st.expander("🛠️ Advanced Filters & Controls", expanded=True):
@@ -146,65 +287,74 @@ else:
                     # Keeping it simple for trend: Impulse(Distance) bands only.
                 
                 # --- Filtering Logic ---
-                df_filtered = df_raw[df_raw['DayOfWeek'].isin(selected_days_local)].copy()
-                
-                # Date Range Filter
-                if len(date_range) == 2:
-                    start_date, end_date = date_range
-                    df_filtered['StartTime'] = pd.to_datetime(df_filtered['StartTime']) # Ensure datetime type
-                    df_filtered = df_filtered[
-                        (df_filtered['StartTime'].dt.date >= start_date) & 
-                        (df_filtered['StartTime'].dt.date <= end_date)
-                    ]
-                
-                # Impulse Range (Distance) Filter (using imp_ranges from sidebar)
-                df_filtered = apply_multi_range_filter(df_filtered, 'Distance', imp_ranges)
-                
-                # Apply min_dist filter
-                df_filtered = df_filtered[df_filtered['Distance'] >= min_dist].copy()
+                trend_filters = {'selected_days_local': selected_days_local, 'date_range': date_range, 'imp_ranges': imp_ranges, 'min_dist': min_dist}
+                if service_url:
+                    from service.client import service_request, service_rows
+                    trend_query = {'dataset': export['dataset'], 'filters': trend_filters}
+                    df_filtered = run_stage("trend.filter", service_rows, params={'url': service_url, 'payload': {**trend_query, 'view': "trend"}})
+                else:
+                    df_filtered = run_stage("trend.filter", filter_trends, deps={'df_raw': "trend.validate"}, params=trend_filters)
 
                 if df_filtered.empty:
                     st.warning("No data matches the selected filters.")
                     st.stop()
                 
-                st.info(f"Filtering: Keeping {len(df_filtered)} of {len(df_raw)} records")
+                st.info(f"Filtering: Keeping {len(df_filtered)} of {export['rows']} records")
                 
                 # --- Metadata Info ---
-                meta = df_raw.iloc[0]
-                scan_end = df_raw.iloc[-1]['ScanEnd']
+                meta = export['meta']
                 st.success(f"📊 **Context:** {meta['Symbol']} | {meta['TF']} | {meta['MAType']} Period: {meta['MAPeriod']}")
-                st.caption(f"📅 **Session Span:** {pd.to_datetime(meta['ScanStart']).strftime('%Y.%m.%d %H:%M')} — {pd.to_datetime(scan_end).strftime('%Y.%m.%d %H:%M')}")
+                st.caption(f"📅 **Session Span:** {pd.to_datetime(meta['ScanStart']).strftime('%Y.%m.%d %H:%M')} — {pd.to_datetime(meta['ScanEnd']).strftime('%Y.%m.%d %H:%M')}")
                 
-                results, df = run_trend_analysis(df_filtered)
+                if service_url:
+                    results = run_stage("trend.engine", service_request, params={'url': service_url, 'endpoint': "trend", 'payload': trend_query})
+                else:
+                    results = run_stage("trend.engine", run_trend_analysis, deps={'df': "trend.filter"})
+
+                # The engine only reads the filtered frame; charts and tables read a copy with the derived columns
+                df = run_stage("trend.derived", with_derived_columns, deps={'df': "trend.filter"}, params={'columns': ['Duration_Min', 'DayOfWeek']})
                 
                 # --- Metrics ---
                 col1, col2, col3, col4 = st.columns(4)
-                col1.metric("Avg Distance", f"{results['global_stats']['Mean']:.2f}")
-                col2.metric("Median Distance", f"{results['global_stats']['Median']:.2f}")
-                col3.metric("Avg Duration (Min)", f"{results['avg_duration']:.1f}")
+                col1.metric("Avg Distance", f"{results.global_stats.mean:.2f}")
+                col2.metric("Median Distance", f"{results.global_stats.median:.2f}")
+                col3.metric("Avg Duration (Min)", f"{results.avg_duration:.1f}")
                 col4.metric("Bullish/Bearish Ratio", f"{len(df[df['Direction']=='BULLISH'])/max(1, len(df[df['Direction']=='BEARISH'])):.2f}")
                 
                 # --- Plotly Charts ---
-                st.plotly_chart(plot_distance_distribution(df))
+                st.plotly_chart(run_stage("trend.figure.distance", plot_distance_distribution, deps={'df': "trend.filter"}))
                 
                 # Session Box Plot (New)
                 if 'Session_Start' in df.columns:
                      from plots.trend_plots import plot_distance_by_session
-                     st.plotly_chart(plot_distance_by_session(df))
+                     st.plotly_chart(run_stage("trend.figure.session", plot_distance_by_session, deps={'df': "trend.filter"}, params={'session_order': scheme_sessions}))
                 
                 # Scatter Plot with Options
                 scatter_color = st.selectbox("Scatter Plot Color", ["Direction", "Session_Start", "DayOfWeek"], key="scatter_col")
-                st.plotly_chart(plot_duration_vs_distance(df, color_by=scatter_color))
+                st.plotly_chart(run_stage("trend.figure.scatter", plot_duration_vs_distance, deps={'df': "trend.derived"}, params={'color_by': scatter_color}))
                 
                 with st.expander("View Raw Intelligence Table"):
-                    st.dataframe(df)
+                    from engines.table_view import render_paginated_table
+                    render_paginated_table(df, key_prefix="trend")
+
+                st.divider()
+                from engines.regime_engine import render_regime_ui
+                render_regime_ui("trend.derived", ['Distance', 'Duration_Min', 'PriceMove%'], 'StartTime', key_prefix="trend")
+
+                st.divider()
+                from engines.profile_engine import render_profile_ui
+                render_profile_ui("trend.derived", ['StartTime', 'EndTime'], ['Distance', 'Duration_Min', 'StartATR_Live'], key_prefix="trend")
+
+                st.divider()
+                from engines.event_study import render_event_study_ui
+                render_event_study_ui("trend.filter", df, ['StartTime', 'EndTime'], key_prefix="trend")
 
         elif analysis_type.startswith("2."):
             if not uploaded_impulse:
                 st.warning("⚠️ Please upload `Impulse_Reversal.csv` in the sidebar to run Behavioral Analysis.")
             else:
                 st.subheader("🔴 Impulse & Reversal Behavior")
-                df_raw = load_and_validate_impulse(uploaded_impulse)
+                export = export_stage("imp", uploaded_impulse, 'impulse', IMPULSE_ANALYSIS_COLS['behavior'], timed=True)
                 
                 # --- Contextual Filters ---
                 with st.expander("🛠️ Advanced Filters & Controls", expanded=True):
@@ -218,80 +368,84 @@ else:
                     rev_ranges = parse_multi_range(st.session_state.get('global_rev_input', ""))
                 
                 # --- Filtering Logic ---
-                df_filtered = df_raw[df_raw['DayOfWeek'].isin(selected_days)].copy()
-                
-                # Date Range Filter
-                if len(date_range) == 2:
-                    start_date, end_date = date_range
-                    df_filtered['Time'] = pd.to_datetime(df_filtered['Time'])
-                    df_filtered = df_filtered[
-                        (df_filtered['Time'].dt.date >= start_date) & 
-                        (df_filtered['Time'].dt.date <= end_date)
-                    ]
-                
-                # Impulse Range (Impulse column) Filter
-                df_filtered = apply_multi_range_filter(df_filtered, 'Impulse', imp_ranges)
-                
-                # Reversal % Range Filter
-                df_filtered = apply_multi_range_filter(df_filtered, 'Reversal%', rev_ranges)
-                
-                # Apply min_impulse_local filter (if not already covered by imp_ranges)
-                # This ensures the slider filter is still respected.
-                if min_impulse_local > 0:
-                    df_filtered = df_filtered[df_filtered['Impulse'] >= min_impulse_local].copy()
+                imp_filters = {'selected_days': selected_days, 'date_range': date_range, 'imp_ranges': imp_ranges,
+                               'rev_ranges': rev_ranges, 'min_impulse_local': min_impulse_local}
+                if service_url:
+                    from service.client import service_request, service_rows
+                    imp_rows = {'dataset': export['dataset'], 'view': "impulse", 'filters': imp_filters}
+                    df_filtered = run_stage("imp.filter", service_rows, params={'url': service_url, 'payload': {**imp_rows, 'same_session': False}})[0]
+                else:
+                    df_filtered = run_stage("imp.filter", filter_impulses, deps={'df_raw': trigger_time_stage("imp")}, params=imp_filters)
 
                 if df_filtered.empty:
                     st.warning("No data matches the selected filters.")
                     st.stop()
                 
-                st.info(f"Filtering: Keeping {len(df_filtered)} of {len(df_raw)} logs")
+                st.info(f"Filtering: Keeping {len(df_filtered)} of {export['rows']} logs")
                 
                 # --- Metadata Info ---
-                meta = df_raw.iloc[0]
-                scan_end = df_raw.iloc[-1]['ScanEnd']
+                meta = export['meta']
                 st.success(f"📊 **Context:** {meta['Symbol']} | {meta['TF']} | {meta['MAType']} Period: {meta['MAPeriod']}")
-                st.caption(f"📅 **Session Span:** {pd.to_datetime(meta['ScanStart']).strftime('%Y.%m.%d %H:%M')} — {pd.to_datetime(scan_end).strftime('%Y.%m.%d %H:%M')}")
+                st.caption(f"📅 **Session Span:** {pd.to_datetime(meta['ScanStart']).strftime('%Y.%m.%d %H:%M')} — {pd.to_datetime(meta['ScanEnd']).strftime('%Y.%m.%d %H:%M')}")
                 
                 # --- Advanced Filters ---
                 st.markdown("### 🎯 Session Coherence")
                 show_samesess = st.checkbox("Show Only Same-Session Events (Base = Peak = Trigger)", value=False)
                 
-                # Calculate Same-Session Metric before filtering
-                if 'Session_Base' in df_filtered.columns and 'Session_Trigger' in df_filtered.columns:
-                    # Strict Definition: Base, Peak, and Trigger must match
-                    # Or at least Start (Base) and End (Trigger) match?
-                    # User said: "crossover impulse and reversal was there in the same session"
-                    # Let's enforce Base == Peak == Trigger for "Perfect" coherence
-                    same_sess_mask = (df_filtered['Session_Base'] == df_filtered['Session_Peak']) & (df_filtered['Session_Peak'] == df_filtered['Session_Trigger'])
-                    same_sess_count = same_sess_mask.sum()
-                    same_sess_ratio = (same_sess_count / len(df_filtered) * 100) if len(df_filtered) > 0 else 0
+                # Stage holding the tab's events (the service's unconditioned rows are reused as they are)
+                imp_source = ("imp.filter.coherence", 0)
+                if not service_url:
+                    df_filtered, same_sess_ratio = run_stage("imp.filter.coherence", apply_session_coherence, deps={'df_filtered': "imp.filter"},
+                                                             params={'show_samesess': show_samesess})
+                elif show_samesess:
+                    df_filtered, same_sess_ratio = run_stage("imp.filter.coherence", service_rows,
+                                                             params={'url': service_url, 'payload': {**imp_rows, 'same_session': True}})
                 else:
-                    same_sess_ratio = 0
-                    same_sess_mask = pd.Series([True]*len(df_filtered), index=df_filtered.index)
-
-                if show_samesess:
-                    df_filtered = df_filtered[same_sess_mask].copy()
-                    if df_filtered.empty:
-                        st.warning("No events found where Base, Peak, and Trigger occurred in the same session.")
-                        st.stop()
+                    df_filtered, same_sess_ratio = run_stage("imp.filter", service_rows, params={'url': service_url, 'payload': {**imp_rows, 'same_session': False}})
+                    imp_source = ("imp.filter", 0)
+                if show_samesess and df_filtered.empty:
+                    st.warning("No events found where Base, Peak, and Trigger occurred in the same session.")
+                    st.stop()
 
-                results, df = run_impulse_analysis(df_filtered)
+                if service_url:
+                    imp_query = {'dataset': export['dataset'], 'filters': imp_filters, 'same_session': show_samesess}
+                    results = run_stage("imp.engine", service_request, params={'url': service_url, 'endpoint': "impulse", 'payload': imp_query})
+                else:
+                    results = run_stage("imp.engine", run_impulse_analysis, deps={'df': imp_source})
+                df = df_filtered
                 
                 # --- Metrics ---
                 col1, col2, col3, col4 = st.columns(4)
-                col1.metric("Median Reversal %", f"{results['pullback_stats']['Median']:.2f}%")
-                col2.metric("90th Percentile Pullback", f"{results['pullback_quantiles'][0.9]:.2f}%")
-                col3.metric("Impulse/Pullback Corr", f"{results['impulse_pullback_corr']:.2f}")
+                col1.metric("Median Reversal %", f"{results.pullback_stats.median:.2f}%")
+                col2.metric("90th Percentile Pullback", f"{results.pullback_quantiles.q90:.2f}%")
+                col3.metric("Impulse/Pullback Corr", f"{results.impulse_pullback_corr:.2f}")
                 col4.metric("Same-Session Coherence", f"{same_sess_ratio:.1f}%", help="% of events starting and ending in the same session")
                 
                 # --- Plotly Charts ---
-                st.plotly_chart(plot_reversal_distribution(df))
-                st.plotly_chart(plot_impulse_vs_pullback(df))
+                st.plotly_chart(run_stage("imp.figure.reversal", plot_reversal_distribution, deps={'df': imp_source}))
+                st.plotly_chart(run_stage("imp.figure.scatter", plot_impulse_vs_pullback, deps={'df': imp_source}))
                 
                 with st.expander("View Raw Behavioral Table"):
-                    st.dataframe(df)
+                    from engines.table_view import render_paginated_table
+                    render_paginated_table(df, key_prefix="imp")
                     
-                st.info(f"💡 **Actionable Logic:** 90% of healthy trends retrace less than **{results['pullback_quantiles'][0.9]:.2f}%**. Exits before this are statistically premature.")
+                st.info(f"💡 **Actionable Logic:** 90% of healthy trends retrace less than **{results.pullback_quantiles.q90:.2f}%**. Exits before this are statistically premature.")
+
+                st.divider()
+                from engines.regime_engine import render_regime_ui
+                render_regime_ui(imp_source, ['Reversal%', 'Impulse%', 'Impulse', 'Pullback'], 'Time', key_prefix="imp")
+
+                st.divider()
+                from engines.profile_engine import render_profile_ui
+                render_profile_ui(imp_source, ['Time'], ['Reversal%', 'Impulse%', 'BaseATR_Live'], key_prefix="imp", sketch_col='Reversal%')
+
+                st.divider()
+                from engines.reversal_cdf import render_reversal_cdf_ui
+                render_reversal_cdf_ui(imp_source, key_prefix="imp")
+
+                st.divider()
+                from engines.event_study import render_event_study_ui
+                render_event_study_ui(imp_source, df, ['Time'], key_prefix="imp")
 
                 st.divider()
                 st.subheader("🔥 Zone Heatmap Analysis")
@@ -299,81 +453,93 @@ else:
                 # Heatmap Direction Filter
                 hm_dir = st.radio("Filter Trend Direction", ["ALL", "BULLISH", "BEARISH"], horizontal=True, key="hm_dir")
                 
-                # Filter Data for Heatmap
-                df_hm = df_filtered.copy()
-                if hm_dir != "ALL":
-                    df_hm = df_hm[df_hm['Direction'] == hm_dir]
-
                 # --- SHARED CONTROLS ---
-                c1, c2 = st.columns(2)
-                heatmap_sess = c1.radio("Session", ["ALL", "SYDNEY", "TOKYO", "LONDON", "NEW YORK"], horizontal=True, key="heatmap_sess")
+                c1, c2, c3 = st.columns(3)
+                heatmap_sess = c1.radio("Session", ["ALL"] + scheme_sessions, horizontal=True, key="heatmap_sess")
                 view_mode = c2.radio("Chart Style", ["2D Grid", "3D Topography"], horizontal=True, key="view_mode")
+                hm_metric = c3.selectbox("Cell Metric (3rd Line)", ["Avg ATR"] + [m for m, (col, _) in HEATMAP_CELL_STATS.items() if col in df.columns], key="hm_metric",
+                                         help="Per-cell median/quantiles are robust to the heavy-tailed ATR and Impulse values.")
+                hm_metric = None if hm_metric == "Avg ATR" else hm_metric
 
                 st.divider()
                 st.markdown("### 🌡️ Volatility & Reversal Heatmap")
                 
+                from engines.heatmap_engine import build_heatmap_index
+
+                def render_hm(slot, session):
+                    """Draws one heatmap in the selected chart style (False if its slice is empty)."""
+                    title_suffix = " — Global Master" if slot == "Global Master" else f" — {slot} Session"
+                    if service_url:
+                        query = {**imp_query, 'view': "impulse", 'y_col': 'Impulse', 'session_col': heatmap_session_col,
+                                 'ranges': heatmap_ranges, 'session': session, 'direction': hm_dir}
+                        fig = run_stage(f"imp.figure.heatmap.{slot}", remote_heatmap_figure,
+                                        params={'url': service_url, 'query': query, 'chart_style': view_mode, 'title_suffix': title_suffix,
+                                                'cell_metric': hm_metric})
+                    else:
+                        fig = run_stage(f"imp.figure.heatmap.{slot}", heatmap_figure, deps={'index': "imp.matrix.index"},
+                                        params={'ranges': heatmap_ranges, 'session': session, 'direction': hm_dir, 'chart_style': view_mode, 'title_suffix': title_suffix,
+                                                'cell_metric': hm_metric})
+                    if fig is None:
+                        return False
+                    st.plotly_chart(fig, use_container_width=True)
+                    return True
+
+                # Use sess_hm_input from sidebar
+                heatmap_ranges = parse_multi_range(st.session_state.get('sess_hm_input', ""))
+
+                # Determine which sessions to plot
+                if heatmap_sess == "ALL":
+                    sessions_to_plot = scheme_sessions
+                else:
+                    sessions_to_plot = [heatmap_sess]
+
+                # Summed-area index over Impulse x Reversal%: built once per filtered dataset,
+                # so range edits, direction and session switches are only lookups (the service holds its own)
+                if not service_url:
+                    run_stage("imp.matrix.index", build_heatmap_index, deps={'df': imp_source}, params={'y_col': 'Impulse', 'session_col': heatmap_session_col})
+
                 # --- GLOBAL MASTER HEATMAP (Shown if ALL selected) ---
                 if heatmap_sess == "ALL":
                     st.markdown("#### 🌍 Global Master Heatmap (All Sessions Combined)")
-                    # Use sess_hm_input from sidebar
-                    global_ranges = parse_multi_range(st.session_state.get('sess_hm_input', ""))
-                    
-                    if global_ranges:
-                        g_pcts, g_counts, g_atrs, g_total_pcts, g_y, g_x = calculate_heatmap_matrix(df_hm, global_ranges)
-                        
-                        if view_mode == "2D Grid":
-                            st.plotly_chart(plot_heatmap_matrix(g_pcts, g_counts, g_atrs, g_total_pcts, g_x, g_y, title_suffix=" — Global Master"), use_container_width=True)
-                        else:
-                            from plots.heatmap_plots import plot_heatmap_3d
-                            st.plotly_chart(plot_heatmap_3d(g_pcts, g_x, g_y, title_suffix=" — Global Master"), use_container_width=True)
+                    if heatmap_ranges:
+                        render_hm("Global Master", "ALL")
                     st.divider()
 
                 # --- SESSION-SPECIFIC HEATMAPS ---
                 st.markdown("#### ⚡ Session-Specific Comparative Analysis")
                 
-                heatmap_ranges = parse_multi_range(st.session_state.get('sess_hm_input', ""))
-                
                 if heatmap_ranges:
-                   # Determine which sessions to plot
-                   if heatmap_sess == "ALL":
-                       sessions_to_plot = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
-                   else:
-                       sessions_to_plot = [heatmap_sess]
-                   
                    for sess in sessions_to_plot:
-                       # Filter by Session
-                       if 'Session_Peak' in df_hm.columns:
-                           df_sess = df_hm[df_hm['Session_Peak'] == sess]
-                       else:
-                           df_sess = df_hm if sess == "ALL" else pd.DataFrame()
-                       
-                       if df_sess.empty:
+                       if not render_hm(sess, sess):
                            if heatmap_sess != "ALL": st.warning(f"No data for session: {sess}")
-                           continue
-                       
-                       # Calculate Matrix (using the MASTER df_hm for total density context? 
-                       # Or the session df? Let's use df_hm for the total context)
-                       m_pcts, m_counts, m_atrs, m_tpcts, y_labels, x_labels = calculate_heatmap_matrix(df_sess, heatmap_ranges)
-                       
-                       title_suffix = f" — {sess} Session"
-                       
-                       if view_mode == "2D Grid":
-                           st.plotly_chart(plot_heatmap_matrix(m_pcts, m_counts, m_atrs, m_tpcts, x_labels, y_labels, title_suffix=title_suffix), use_container_width=True)
-                       else:
-                           from plots.heatmap_plots import plot_heatmap_3d
-                           st.plotly_chart(plot_heatmap_3d(m_pcts, x_labels, y_labels, title_suffix=title_suffix), use_container_width=True)
                        
                 else:
                    st.caption("Enter ranges above to generate the heatmap matrix.")
 
+                st.divider()
+                # Baseline export filtered like the tab's events (its own period: no date filter)
+                baseline_source = None
+                if uploaded_baseline and service_url:
+                    baseline = export_stage("imp.baseline", uploaded_baseline, 'impulse', IMPULSE_ANALYSIS_COLS['behavior'])
+                    baseline_rows = {'dataset': baseline['dataset'], 'view': "impulse", 'filters': {**imp_filters, 'date_range': []}, 'same_session': show_samesess}
+                    run_stage("imp.baseline.coherence", service_rows, params={'url': service_url, 'payload': baseline_rows})
+                    baseline_source = ("imp.baseline.coherence", 0)
+                elif uploaded_baseline:
+                    load_stage("imp.baseline", uploaded_baseline, 'impulse', IMPULSE_ANALYSIS_COLS['behavior'])
+                    run_stage("imp.baseline.filter", filter_impulses, deps={'df_raw': "imp.baseline.validate"}, params={**imp_filters, 'date_range': []})
+                    run_stage("imp.baseline.coherence", apply_session_coherence, deps={'df_filtered': "imp.baseline.filter"}, params={'show_samesess': show_samesess})
+                    baseline_source = ("imp.baseline.coherence", 0)
+                from engines.drift_engine import render_drift_ui
+                render_drift_ui(imp_source, df, heatmap_ranges, key_prefix="imp", baseline_source=baseline_source)
+
 
         elif analysis_type.startswith("3."):
             if not uploaded_stats or not uploaded_impulse:
                 st.warning("⚠️ Fusion Analysis requires BOTH CSV files to be uploaded.")
             else:
                 st.subheader("🟣 Combined Market Structure (Fusion)")
-                stats_raw = load_and_validate_stats(uploaded_stats)
-                impulse_raw = load_and_validate_impulse(uploaded_impulse)
+                stats_export = export_stage("fusion.stats", uploaded_stats, 'stats', STATS_ANALYSIS_COLS['fusion'])
+                impulse_export = export_stage("fusion.impulse", uploaded_impulse, 'impulse', IMPULSE_ANALYSIS_COLS['fusion'])
                 
                 # --- Contextual Filters ---
                 with st.expander("🛠️ Advanced Filters & Controls", expanded=True):
@@ -387,32 +553,16 @@ else:
                     rev_ranges = parse_multi_range(st.session_state.get('global_rev_input', ""))
                 
                 # --- Filtering Logic for both Dataframes ---
-                # 1. Stats DF
-                df_stats_filtered = stats_raw[stats_raw['DayOfWeek'].isin(selected_days)].copy()
-                if len(date_range) == 2:
-                    s, e = date_range
-                    df_stats_filtered['StartTime'] = pd.to_datetime(df_stats_filtered['StartTime'])
-                    df_stats_filtered = df_stats_filtered[
-                        (df_stats_filtered['StartTime'].dt.date >= s) & 
-                        (df_stats_filtered['StartTime'].dt.date <= e)
-                    ]
-                df_stats_filtered = apply_multi_range_filter(df_stats_filtered, 'Distance', imp_ranges)
-                
-                # 2. Impulse DF
-                df_imp_filtered = impulse_raw[impulse_raw['DayOfWeek'].isin(selected_days)].copy()
-                if len(date_range) == 2:
-                    s, e = date_range
-                    df_imp_filtered['Time'] = pd.to_datetime(df_imp_filtered['Time'])
-                    df_imp_filtered = df_imp_filtered[
-                        (df_imp_filtered['Time'].dt.date >= s) & 
-                        (df_imp_filtered['Time'].dt.date <= e)
-                    ]
-                df_imp_filtered = apply_multi_range_filter(df_imp_filtered, 'Impulse', imp_ranges)
-                df_imp_filtered = apply_multi_range_filter(df_imp_filtered, 'Reversal%', rev_ranges)
-
-                # Apply min_impulse_fusion filter
-                if min_impulse_fusion > 0:
-                    df_imp_filtered = df_imp_filtered[df_imp_filtered['Impulse'] >= min_impulse_fusion].copy()
+                fusion_filters = {'selected_days': selected_days, 'date_range': date_range, 'imp_ranges': imp_ranges,
+                                  'rev_ranges': rev_ranges, 'min_impulse_fusion': min_impulse_fusion}
+                if service_url:
+                    from service.client import service_request, service_rows
+                    fusion_query = {'stats': stats_export['dataset'], 'impulse': impulse_export['dataset'], 'filters': fusion_filters}
+                    df_stats_filtered, df_imp_filtered = run_stage("fusion.filter", service_rows,
+                                                                   params={'url': service_url, 'payload': {**fusion_query, 'view': "fusion"}})
+                else:
+                    df_stats_filtered, df_imp_filtered = run_stage("fusion.filter", filter_fusion_inputs, params=fusion_filters,
+                                                                   deps={'stats_raw': "fusion.stats.validate", 'impulse_raw': "fusion.impulse.validate"})
 
                 if df_stats_filtered.empty or df_imp_filtered.empty:
                     st.warning("Insufficient data across one or both files to perform Fusion.")
@@ -420,28 +570,111 @@ else:
                 
                 st.info(f"Fusion Context: {len(df_stats_filtered)} Trends & {len(df_imp_filtered)} Impulses")
                 
-                results, fused_df = run_fusion_analysis(df_stats_filtered, df_imp_filtered)
+                # Submit the independent engines to the worker pool together; each section waits only for its own result
+                # Jobs are keyed on the filter stage instead of re-hashing both frames every rerun
+                from engines.job_runner import submit_job
+                fusion_key = stage_key("fusion.filter")
+                from engines.survival_engine import run_survival_analysis, query_survival
+                from engines.sequence_engine import build_impulse_sequences
+                if service_url:
+                    fusion_job = submit_job("fusion", "fusion", service_request, service_url, "fusion", fusion_query)
+                else:
+                    fusion_job = submit_job("fusion", "fusion", run_fusion_analysis, df_stats_filtered, df_imp_filtered, input_key=fusion_key)
+                surv_job = submit_job("fusion", "survival", run_survival_analysis, df_stats_filtered, df_imp_filtered, ranges=imp_ranges,
+                                      trend_sessions=scheme_sessions, input_key=fusion_key)
+                seq_job = submit_job("fusion", "sequences", build_impulse_sequences, df_stats_filtered, df_imp_filtered, input_key=fusion_key)
+
+                results = fusion_job.result()
                 
-                st.metric("90% Survival Threshold", f"{results['pullback_90th_percentile']:.2f}%")
+                st.metric("90% Survival Threshold", f"{results.pullback_90th_percentile:.2f}%")
 
                 
                 st.markdown(f"""
                 ### 🛡️ Recommended Management Zones
                 - **Green Zone (<10%)**: Strength. No action needed.
-                - **Yellow Zone (10% - {results['pullback_90th_percentile']:.2f}%)**: Market breathing. Prepare to trail.
-                - **Red Zone (>{results['pullback_90th_percentile']:.2f}%)**: Statistical failure. High risk of full reversal.
+                - **Yellow Zone (10% - {results.pullback_90th_percentile:.2f}%)**: Market breathing. Prepare to trail.
+                - **Red Zone (>{results.pullback_90th_percentile:.2f}%)**: Statistical failure. High risk of full reversal.
                 """)
 
+                # --- Retracement Survival Curves ---
+                st.divider()
+                st.subheader("📉 Retracement Survival Curves")
+                from plots.survival_plots import plot_survival_curves
+
+                surv = surv_job.result()
+
+                c1, c2, c3, c4 = st.columns(4)
+                surv_subject = c1.radio("Subject", ["Trends", "Impulses"], horizontal=True, key="surv_subject")
+                surv_sess = c2.selectbox("Session", ["ALL"] + (scheme_sessions if surv_subject == "Trends" else session_names()), key="surv_sess")
+                surv_range = c3.selectbox("Range", ["ALL"] + [f"{s}-{e}" for s, e in imp_ranges], key="surv_range")
+                surv_level = c4.number_input("Query Depth (%)", value=50.0, step=5.0, key="surv_level")
+
+                surv_table = surv['trend_survival'] if surv_subject == "Trends" else surv['impulse_survival']
+                curve = surv_table[(surv_table['Session'] == surv_sess) & (surv_table['Range'] == surv_range)]
+
+                m1, m2, m3 = st.columns(3)
+                for col, d in zip((m1, m2, m3), ["ALL", "BULLISH", "BEARISH"]):
+                    col.metric(f"{d} Survival @ {surv_level:.0f}%", f"{query_survival(surv_table, surv_level, d, surv_sess, surv_range):.1f}%")
+
+                st.plotly_chart(plot_survival_curves(curve, color_by='Direction', title_suffix=f" — {surv_subject} | {surv_sess} | {surv_range}"), use_container_width=True)
+
+                # --- Trend Anatomy: each trend's impulses in time order ---
+                st.divider()
+                st.subheader("🧬 Trend Anatomy (Impulse Sequences)")
+                from engines.sequence_engine import sequence_lengths, pullbacks_before_peak, impulse_decay_ratio, summarize_pullback_sequence
+                from plots.pullback_plots import plot_pullback_sequence
+
+                seq = seq_job.result()
+                lengths = sequence_lengths(seq)
+                before_peak = pullbacks_before_peak(seq)
+                decay = impulse_decay_ratio(seq)
+
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Trends with Pullbacks", f"{(lengths > 0).mean() * 100:.1f}%", help="Share of trends with at least one logged impulse")
+                m2.metric("Avg Pullbacks per Trend", f"{lengths.mean():.2f}")
+                m3.metric("Median Pullbacks Before Peak", f"{np.median(before_peak[before_peak >= 0]):.0f}" if (before_peak >= 0).any() else "—")
+                m4.metric("Median Impulse Decay Ratio", f"{np.nanmedian(decay):.2f}" if np.isfinite(decay).any() else "—",
+                          help="Geometric-mean ratio of consecutive impulses inside a trend (< 1: impulses shrink)")
+
+                st.plotly_chart(plot_pullback_sequence(summarize_pullback_sequence(seq)), use_container_width=True)
+
+                # --- Exit Rule Simulation ---
+                st.divider()
+                st.subheader("🧪 Exit Rule Simulation")
+                from engines.exit_engine import run_exit_simulation
+                from plots.exit_plots import plot_exit_rule_curves
+
+                c1, c2 = st.columns(2)
+                exit_atr_col = c1.selectbox("ATR Reference", ["PeakATR_Live", "PeakATR_Closed", "BaseATR_Live", "BaseATR_Closed"], key="exit_atr_col")
+                exit_metric = c2.selectbox("Metric", ["Expectancy", "Expectancy_ATR", "HitRate%", "Avg_Giveback", "Profit_Factor"], key="exit_metric")
+
+                exit_results, rules_df = submit_job("fusion", "exit", run_exit_simulation, df_stats_filtered, df_imp_filtered, atr_col=exit_atr_col,
+                                                    input_key=fusion_key).result()
+
+                if 'best_expectancy' in exit_results:
+                    best = exit_results['best_expectancy']
+                    base = exit_results['baseline']
+                    m1, m2, m3 = st.columns(3)
+                    m1.metric("Hold-to-End Expectancy", f"{base['Expectancy']:.2f}")
+                    m2.metric("Best Rule Expectancy", f"{best['Expectancy']:.2f}", delta=f"{best['Expectancy'] - base['Expectancy']:.2f}")
+                    m3.metric("Best Rule", f"{best['Rule']} {best['Threshold']:g}")
+
+                st.plotly_chart(plot_exit_rule_curves(rules_df, metric=exit_metric), use_container_width=True)
+                st.caption("Retracement exits below the EA's reversal threshold (30%) cannot be observed in the impulse log.")
+
+                with st.expander("View Exit Rule Table"):
+                    st.dataframe(rules_df)
+
         elif analysis_type.startswith("4."):
             if not uploaded_impulse:
                 st.warning("⚠️ Please upload `Impulse_Reversal.csv` to run Price Movement Analysis.")
             else:
                 st.subheader("📈 Price Movement Analysis (Volatility)")
-                df_raw = load_and_validate_impulse(uploaded_impulse)
+                export = export_stage("pm", uploaded_impulse, 'impulse', IMPULSE_ANALYSIS_COLS['price_move'], timed=True)
                 
                 # Check for new columns
-                if 'Impulse%' not in df_raw.columns:
-                    st.error("Missing `%` columns. Please regenerate data with the latest EA.")
+                if 'Impulse%' not in export['columns']:
+                    st.error(f"Missing `%` columns (detected EA schema v{export['attrs'].get('schema_version')}). Please regenerate data with the latest EA.")
                 else:
                     # --- Filtering & Logic ---
                     # (Re-use Option 2 filtering logic or simplify)
@@ -450,8 +683,13 @@ else:
                          selected_days = c1.multiselect("Days", options=days_order, default=days_order, key="pm_days")
                          min_imp = c2.slider("Min Impulse (%)", 0.0, 5.0, 0.0, 0.01)
                     
-                    df_pm = df_raw[df_raw['DayOfWeek'].isin(selected_days)].copy()
-                    df_pm = df_pm[df_pm['Impulse%'] >= min_imp]
+                    pm_filters = {'selected_days': selected_days, 'min_imp': min_imp}
+                    if service_url:
+                        from service.client import service_rows
+                        pm_query = {'dataset': export['dataset'], 'view': "price_move", 'filters': pm_filters, 'y_col': 'Impulse%'}
+                        df_pm = run_stage("pm.filter", service_rows, params={'url': service_url, 'payload': pm_query})
+                    else:
+                        df_pm = run_stage("pm.filter", filter_price_moves, deps={'df_raw': trigger_time_stage("pm")}, params=pm_filters)
 
                     # Metrics
                     c1, c2, c3, c4 = st.columns(4)
@@ -470,55 +708,77 @@ else:
                     if pm_ranges:
                         # Shared controls
                         c1, c2 = st.columns(2)
-                        pm_sess = c1.radio("Session", ["ALL", "SYDNEY", "TOKYO", "LONDON", "NEW YORK"], horizontal=True, key="pm_sess")
+                        pm_sess = c1.radio("Session", ["ALL"] + scheme_sessions, horizontal=True, key="pm_sess")
                         view_type = c2.radio("Analysis Mode", ["Aggregate (Master)", "Time-Based (Month/Quarter)"], horizontal=True, key="pm_view_type")
 
                         # --- MODE A: AGGREGATE (Standard) ---
                         if view_type == "Aggregate (Master)":
                             # Chart Style Selector (Shared for all aggregate charts)
-                            pm_view = st.radio("Chart Style", ["2D Grid", "3D Topography"], horizontal=True, key="pm_view_agg")
+                            c1, c2 = st.columns(2)
+                            pm_view = c1.radio("Chart Style", ["2D Grid", "3D Topography"], horizontal=True, key="pm_view_agg")
+                            pm_metric = c2.selectbox("Cell Metric (3rd Line)", ["Avg ATR"] + [m for m, (col, _) in HEATMAP_CELL_STATS.items() if col in df_pm.columns],
+                                                     key="pm_metric")
+                            pm_metric = None if pm_metric == "Avg ATR" else pm_metric
                             
+                            from engines.heatmap_engine import build_heatmap_index
+
+                            def render_pm(slot, session):
+                                """Draws one % heatmap in the selected chart style (skipped if its slice is empty)."""
+                                if service_url:
+                                    query = {**pm_query, 'session_col': heatmap_session_col, 'ranges': pm_ranges, 'session': session, 'direction': "ALL"}
+                                    fig = run_stage(f"pm.figure.heatmap.{slot}", remote_heatmap_figure,
+                                                    params={'url': service_url, 'query': query, 'chart_style': pm_view, 'title_suffix': f" — {slot}",
+                                                            'cell_metric': pm_metric})
+                                else:
+                                    fig = run_stage(f"pm.figure.heatmap.{slot}", heatmap_figure, deps={'index': "pm.matrix.index"},
+                                                    params={'ranges': pm_ranges, 'session': session, 'direction': "ALL", 'chart_style': pm_view, 'title_suffix': f" — {slot}",
+                                                            'cell_metric': pm_metric})
+                                if fig is None:
+                                    return
+                                if slot != "Global Master":
+                                    st.markdown(f"#### {slot} Session")
+                                st.plotly_chart(fig, use_container_width=True)
+
+                            if pm_sess == "ALL": sessions = scheme_sessions
+                            else: sessions = [pm_sess]
+
+                            # Summed-area index over Impulse% x Reversal%, rebuilt only when the filtered data changes
+                            if not service_url:
+                                run_stage("pm.matrix.index", build_heatmap_index, deps={'df': "pm.filter"}, params={'y_col': 'Impulse%', 'session_col': heatmap_session_col})
+
                             # 1. Global Master (If ALL)
                             if pm_sess == "ALL":
                                 st.markdown("#### 🌍 Global Master % Heatmap")
-                                g_p, g_c, g_a, g_tp, y_l, x_l = calculate_heatmap_matrix(df_pm, pm_ranges, y_col='Impulse%')
-                                if pm_view == "2D Grid":
-                                    st.plotly_chart(plot_heatmap_matrix(g_p, g_c, g_a, g_tp, x_l, y_l, title_suffix=" — Global Master"), use_container_width=True)
-                                else:
-                                    from plots.heatmap_plots import plot_heatmap_3d
-                                    st.plotly_chart(plot_heatmap_3d(g_p, x_l, y_l, title_suffix=" — Global Master"), use_container_width=True)
+                                render_pm("Global Master", "ALL")
                                 st.divider()
 
                             # 2. Session Specific
-                            if pm_sess == "ALL": sessions = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
-                            else: sessions = [pm_sess]
-
                             for s in sessions:
-                                sub = df_pm[df_pm['Session_Peak'] == s]
-                                if sub.empty: continue
-                                
-                                m_p, m_c, m_a, m_tp, y_l, x_l = calculate_heatmap_matrix(sub, pm_ranges, y_col='Impulse%')
-                                st.markdown(f"#### {s} Session")
-                                if pm_view == "2D Grid":
-                                    st.plotly_chart(plot_heatmap_matrix(m_p, m_c, m_a, m_tp, x_l, y_l, title_suffix=f" — {s}"), use_container_width=True)
-                                else:
-                                    from plots.heatmap_plots import plot_heatmap_3d
-                                    st.plotly_chart(plot_heatmap_3d(m_p, x_l, y_l, title_suffix=f" — {s}"), use_container_width=True)
+                                render_pm(s, s)
                         
                         # --- MODE B: TIME-BASED ---
                         else:
                             # Apply Session Filter if not ALL
                             df_time = df_pm.copy()
                             if pm_sess != "ALL":
-                                df_time = df_time[df_time['Session_Peak'] == pm_sess]
+                                df_time = df_time[df_time[heatmap_session_col] == pm_sess]
                                 st.markdown(f"**Filtering by Session:** {pm_sess}")
                             
                             from engines.temporal_analysis import render_temporal_analysis_ui
-                            render_temporal_analysis_ui(df_time, pm_ranges)
+                            render_temporal_analysis_ui(df_time, pm_ranges, input_key=(stage_key("pm.filter"), pm_sess))
 
+    except DatasetGone as e:
+        # The service dropped a dataset (evicted, released by another session or restarted): register the uploads again, once
+        if st.session_state.pop('_service_reregistered', False):
+            st.error(f"❌ Analysis Error: {str(e)}")
+        else:
+            drop_stages(".service")
+            st.session_state['_service_reregistered'] = True
+            st.rerun()
     except Exception as e:
         st.error(f"❌ Analysis Error: {str(e)}")
 
 # --- Footer ---
+st.session_state.pop('_service_reregistered', None)
 st.sidebar.divider()
 st.sidebar.caption("Interactive Reversal Analysis Suite v1.1")
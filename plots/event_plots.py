@@ -0,0 +1,35 @@
+import plotly.graph_objects as go
+
+def plot_event_bands(band, unit, subtitle=""):
+    """Plots the mean path around events with the P25-P75 and P10-P90 bands (bar offset 0 = event bar)."""
+    if band.empty:
+        return go.Figure()
+
+    x = band['Offset']
+    fig = go.Figure()
+    for lo, hi, fill in [('P10', 'P90', 'rgba(0,191,255,0.12)'), ('P25', 'P75', 'rgba(0,191,255,0.25)')]:
+        if lo not in band.columns or hi not in band.columns:
+            continue
+        fig.add_trace(go.Scatter(x=x, y=band[hi], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(
+            x=x, y=band[lo], mode='lines', line=dict(width=0), fill='tonexty', fillcolor=fill, name=f"{lo}-{hi}",
+            hoverinfo='skip'
+        ))
+
+    if 'P50' in band.columns:
+        fig.add_trace(go.Scatter(x=x, y=band['P50'], mode='lines', name='Median', line=dict(color='deepskyblue', dash='dot'),
+                                 hovertemplate='Bar %{x}<br>Median: %{y:.3f}<extra></extra>'))
+    fig.add_trace(go.Scatter(x=x, y=band['Mean'], mode='lines', name='Mean', line=dict(color='orange', width=3),
+                             hovertemplate='Bar %{x}<br>Mean: %{y:.3f}<extra></extra>'))
+
+    fig.add_vline(x=0, line_dash="dash", line_color="white", annotation_text="Event")
+    fig.add_hline(y=0, line_color="gray", line_width=1)
+    fig.update_layout(
+        title=f"Average Price Path Around Events<br><span style='font-size:12px'>{subtitle}</span>",
+        xaxis_title="Bars from Event",
+        yaxis_title=f"Move ({unit})",
+        template="plotly_dark",
+        height=550,
+        hovermode='x unified'
+    )
+    return fig
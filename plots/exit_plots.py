@@ -0,0 +1,32 @@
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+def plot_exit_rule_curves(rules_df, metric='Expectancy'):
+    """Plots a metric of the exit-rule simulation against each rule family's threshold."""
+    candidates = rules_df[rules_df['Rule'] != 'Hold']
+    if candidates.empty:
+        return go.Figure()
+
+    families = list(candidates['Rule'].unique())
+    fig = make_subplots(rows=1, cols=len(families), subplot_titles=families)
+
+    for col, family in enumerate(families, start=1):
+        sub = candidates[candidates['Rule'] == family]
+        fig.add_trace(go.Scatter(
+            x=sub['Threshold'], y=sub[metric],
+            mode='lines', name=family,
+            customdata=sub[['HitRate%', 'Exits_Triggered']],
+            hovertemplate='Threshold: %{x}<br>' + metric + ': %{y:.2f}<br>Hit Rate: %{customdata[0]:.1f}%<br>Exits: %{customdata[1]}<extra></extra>'
+        ), row=1, col=col)
+
+    # Hold-to-crossover-end baseline
+    baseline = rules_df[rules_df['Rule'] == 'Hold']
+    if not baseline.empty:
+        fig.add_hline(y=baseline[metric].iloc[0], line_dash="dot", line_color="gray", annotation_text="Hold to End")
+
+    fig.update_layout(
+        title=f"Exit Rule Simulation: {metric} by Threshold",
+        template="plotly_dark",
+        showlegend=False
+    )
+    return fig
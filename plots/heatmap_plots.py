@@ -1,14 +1,19 @@
 import plotly.graph_objects as go
 
+# White (empty) -> green -> yellow -> red, shared by every 2D heatmap
+HEATMAP_COLORSCALE = [
+    [0.0, 'white'],
+    [0.01, '#90EE90'],
+    [0.5, 'yellow'],
+    [1.0, 'red']
+]
 
-def plot_heatmap_matrix(matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, x_labels, y_labels, title_suffix=""):
+def _build_cell_text(matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, metric_label="ATR"):
     """
-    Plots a Heatmap Matrix with 3rd-line display and Grand Total in title.
+    Builds the 3-line cell text (Count, Row %, third metric) and hover customdata for a heatmap.
+    matrix_atrs holds the third line's values (mean ATR unless another cell metric is shown,
+    whose name goes in the legend instead: metric_label None prints the value alone).
     """
-    if not matrix_pcts:
-        return go.Figure()
-
-    grand_total_n = sum([sum(row) for row in matrix_counts])
     text_matrix = []
     custom_data = [] 
     
@@ -24,23 +29,38 @@ def plot_heatmap_matrix(matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pc
             row_custom.append([count, atr, total_pct])
             
             if count > 0:
-                # 3-Line format: Count, Row %, ATR
-                row_text.append(f"<b>N: {count}</b><br>{row_pct:.1f}%<br>ATR: {atr:.1f}")
+                # 3-Line format: Count, Row %, metric (n/a where the cell has no values)
+                metric_text = "n/a" if atr != atr else f"{atr:.1f}"
+                metric_line = f"{metric_label}: {metric_text}" if metric_label else metric_text
+                row_text.append(f"<b>N: {count}</b><br>{row_pct:.1f}%<br>{metric_line}")
             else:
                 row_text.append("")
         text_matrix.append(row_text)
         custom_data.append(row_custom)
 
+    return text_matrix, custom_data
+
+def plot_heatmap_matrix(matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pcts, x_labels, y_labels, title_suffix="",
+                        cell_metric=None, cell_values=None):
+    """
+    Plots a Heatmap Matrix with 3rd-line display and Grand Total in title.
+    cell_metric / cell_values (a query_cell_stats() matrix) replace the mean ATR on the 3rd line.
+    """
+    if not matrix_pcts:
+        return go.Figure()
+
+    if cell_metric is None:
+        cell_metric, cell_values, short_label = "Avg ATR", matrix_atrs, "ATR"
+    else:
+        short_label = None
+    grand_total_n = sum([sum(row) for row in matrix_counts])
+    text_matrix, custom_data = _build_cell_text(matrix_pcts, matrix_counts, cell_values, matrix_total_pcts, short_label)
+
     fig = go.Figure(data=go.Heatmap(
         z=matrix_pcts,
         x=x_labels,
         y=y_labels,
-        colorscale=[
-            [0.0, 'white'],       
-            [0.01, '#90EE90'],    
-            [0.5, 'yellow'],      
-            [1.0, 'red']          
-        ],
+        colorscale=HEATMAP_COLORSCALE,
         reversescale=False,
         zmin=0, zmax=50,       
         text=text_matrix,
@@ -48,11 +68,12 @@ def plot_heatmap_matrix(matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pc
         textfont={"size": 11, "family": "Arial", "color": "black"}, 
         customdata=custom_data,
         hoverongaps=False,
-        hovertemplate='<b>%{y}</b><br>Reversal: %{x}<br>Count: %{customdata[0]}<br>Row Prob: %{z:.1f}%<br>Avg ATR: %{customdata[1]:.2f}<extra></extra>'
+        hovertemplate='<b>%{y}</b><br>Reversal: %{x}<br>Count: %{customdata[0]}<br>Row Prob: %{z:.1f}%<br>' + cell_metric + ': %{customdata[1]:.2f}<extra></extra>'
     ))
 
+    legend = "ATR:Volatility" if short_label else f"3rd line: {cell_metric}"
     fig.update_layout(
-        title=f"Impulse vs. Reversal Matrix{title_suffix}<br><span style='font-size:12px'><b>Grand Total: N={grand_total_n}</b> | Legenda: N:Count | %:Row Probability | ATR:Volatility</span>",
+        title=f"Impulse vs. Reversal Matrix{title_suffix}<br><span style='font-size:12px'><b>Grand Total: N={grand_total_n}</b> | Legenda: N:Count | %:Row Probability | {legend}</span>",
         xaxis_title="Reversal % Zone",
         yaxis_title="Impulse Range",
         template="plotly_dark",
@@ -62,6 +83,58 @@ def plot_heatmap_matrix(matrix_pcts, matrix_counts, matrix_atrs, matrix_total_pc
 
     return fig
 
+def plot_drift_heatmap(delta_pcts, cell_z, counts_a, counts_b, x_labels, y_labels, title_suffix="", z_threshold=3.0):
+    """
+    Plots a Difference Heatmap: row % of the current dataset minus the baseline's, per cell.
+    Cells whose two-proportion |z| reaches z_threshold are printed in bold.
+    """
+    if not delta_pcts:
+        return go.Figure()
+
+    text_matrix = []
+    custom_data = []
+    for i in range(len(delta_pcts)):
+        row_text = []
+        row_custom = []
+        for j in range(len(delta_pcts[i])):
+            delta, z = delta_pcts[i][j], cell_z[i][j]
+            row_custom.append([counts_a[i][j], counts_b[i][j], z])
+            if counts_a[i][j] or counts_b[i][j]:
+                cell = f"{delta:+.1f}%<br>z {z:.1f}" if z == z else f"{delta:+.1f}%"
+                row_text.append(f"<b>{cell}</b>" if z == z and abs(z) >= z_threshold else cell)
+            else:
+                row_text.append("")
+        text_matrix.append(row_text)
+        custom_data.append(row_custom)
+
+    limit = max(5.0, max(abs(v) for row in delta_pcts for v in row))
+    fig = go.Figure(data=go.Heatmap(
+        z=delta_pcts,
+        x=x_labels,
+        y=y_labels,
+        colorscale="RdBu",
+        reversescale=True,
+        zmid=0, zmin=-limit, zmax=limit,
+        text=text_matrix,
+        texttemplate="%{text}",
+        textfont={"size": 11, "family": "Arial", "color": "black"},
+        customdata=custom_data,
+        hoverongaps=False,
+        hovertemplate='<b>%{y}</b><br>Reversal: %{x}<br>Baseline Count: %{customdata[0]}<br>Current Count: %{customdata[1]}<br>'
+                      'Row Prob Change: %{z:+.1f}%<br>z: %{customdata[2]:.2f}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title=f"Drift: Current vs. Baseline Matrix{title_suffix}<br><span style='font-size:12px'>Legenda: Row Probability change (current - baseline) | z: two-proportion z-score | <b>bold</b>: |z| ≥ {z_threshold:g}</span>",
+        xaxis_title="Reversal % Zone",
+        yaxis_title="Impulse Range",
+        template="plotly_dark",
+        height=len(y_labels) * 75 + 230,
+        xaxis=dict(side="bottom")
+    )
+
+    return fig
+
 def plot_heatmap_3d(matrix_pcts, x_labels, y_labels, title_suffix=""):
     """
     Plots a 3D Surface Chart of the Heatmap.
@@ -95,3 +168,67 @@ def plot_heatmap_3d(matrix_pcts, x_labels, y_labels, title_suffix=""):
     )
     
     return fig
+
+def plot_heatmap_animation(frames, range_labels, x_labels, title_suffix=""):
+    """
+    Animated Heatmap over a sequence of rolling windows, with Play/Pause and a slider to scrub through them.
+    """
+    if not frames:
+        return go.Figure()
+
+    def heatmap_trace(frame):
+        text_matrix, custom_data = _build_cell_text(frame['pcts'], frame['counts'], frame['atrs'], frame['total_pcts'])
+        return go.Heatmap(
+            z=frame['pcts'],
+            x=x_labels,
+            y=range_labels,
+            colorscale=HEATMAP_COLORSCALE,
+            zmin=0, zmax=50,
+            text=text_matrix,
+            texttemplate="%{text}",
+            textfont={"size": 11, "family": "Arial", "color": "black"},
+            customdata=custom_data,
+            hoverongaps=False,
+            hovertemplate='<b>%{y}</b><br>Reversal: %{x}<br>Count: %{customdata[0]}<br>Row Prob: %{z:.1f}%<br>Avg ATR: %{customdata[1]:.2f}<extra></extra>'
+        )
+
+    def window_name(frame):
+        return f"{frame['start']:%Y.%m.%d} — {frame['end']:%Y.%m.%d}"
+
+    fig = go.Figure(
+        data=[heatmap_trace(frames[0])],
+        frames=[
+            go.Frame(
+                data=[heatmap_trace(f)],
+                name=window_name(f),
+                layout=go.Layout(title_text=f"Rolling Impulse vs. Reversal Matrix{title_suffix}<br><span style='font-size:12px'><b>Window: {window_name(f)} | N={f['n']}</b></span>")
+            )
+            for f in frames
+        ]
+    )
+
+    slider_steps = [
+        dict(method="animate", label=window_name(f),
+             args=[[window_name(f)], dict(mode="immediate", frame=dict(duration=0, redraw=True), transition=dict(duration=0))])
+        for f in frames
+    ]
+
+    fig.update_layout(
+        title=f"Rolling Impulse vs. Reversal Matrix{title_suffix}<br><span style='font-size:12px'><b>Window: {window_name(frames[0])} | N={frames[0]['n']}</b></span>",
+        xaxis_title="Reversal % Zone",
+        yaxis_title="Impulse Range",
+        template="plotly_dark",
+        height=len(range_labels) * 75 + 330,
+        updatemenus=[dict(
+            type="buttons", showactive=False, x=0, y=-0.12, xanchor="left", yanchor="top", direction="left",
+            buttons=[
+                dict(label="▶ Play", method="animate",
+                     args=[None, dict(frame=dict(duration=400, redraw=True), transition=dict(duration=0), fromcurrent=True)]),
+                dict(label="⏸ Pause", method="animate",
+                     args=[[None], dict(mode="immediate", frame=dict(duration=0, redraw=False), transition=dict(duration=0))])
+            ]
+        )],
+        sliders=[dict(active=0, x=0.12, y=-0.12, len=0.88, yanchor="top", currentvalue=dict(prefix="Window: "), steps=slider_steps)]
+    )
+
+    return fig
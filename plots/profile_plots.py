@@ -0,0 +1,33 @@
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+def plot_intraday_profile(table, metric, min_count=1, subtitle=""):
+    """Plots a metric per time bucket (thin buckets greyed out) above the event count per bucket."""
+    if table.empty:
+        return go.Figure()
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
+
+    reliable = table['Count'] >= min_count
+    fig.add_trace(go.Bar(
+        x=table.index, y=table[metric], name=metric,
+        marker_color=['deepskyblue' if ok else 'dimgray' for ok in reliable],
+        customdata=table['Count'],
+        hovertemplate='%{x}<br>' + metric + ': %{y:.2f}<br>N: %{customdata}<extra></extra>'
+    ), row=1, col=1)
+
+    fig.add_trace(go.Bar(
+        x=table.index, y=table['Count'], name='Events', marker_color='orange',
+        hovertemplate='%{x}<br>N: %{y}<extra></extra>'
+    ), row=2, col=1)
+
+    fig.update_layout(
+        title=f"Intraday Profile: {metric}<br><span style='font-size:12px'>{subtitle}</span>",
+        template="plotly_dark",
+        height=600,
+        bargap=0.05,
+        showlegend=False
+    )
+    fig.update_yaxes(title_text=metric, row=1, col=1)
+    fig.update_yaxes(title_text="Events", row=2, col=1)
+    return fig
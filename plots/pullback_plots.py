@@ -71,3 +71,27 @@ def plot_impulse_vs_pullback(df):
         template="plotly_dark"
     )
     return fig
+
+def plot_pullback_sequence(summary):
+    """Median and P90 depth of the 1st, 2nd, ... pullback of a trend, per direction."""
+    fig = go.Figure()
+    for direction, color in [('BULLISH', 'green'), ('BEARISH', 'red')]:
+        rows = summary[summary['Direction'] == direction]
+        if rows.empty:
+            continue
+        for stat, dash in [('Median', 'solid'), ('P90', 'dot')]:
+            fig.add_trace(go.Scatter(
+                x=rows['Pullback'], y=rows[stat], mode='lines+markers', name=f"{direction} {stat}",
+                line=dict(color=color, dash=dash),
+                customdata=rows['Trends'],
+                hovertemplate='Pullback #%{x}<br>' + stat + ': %{y:.1f}%<br>Trends: %{customdata}<extra></extra>'
+            ))
+
+    fig.update_layout(
+        title="Pullback Depth by Position in the Trend",
+        xaxis_title="Pullback # (time order)",
+        yaxis_title="Reversal %",
+        xaxis=dict(dtick=1),
+        template="plotly_dark"
+    )
+    return fig
@@ -0,0 +1,42 @@
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+def plot_rolling_distribution(roll, value_col, window_days):
+    """Plots rolling Median/P90/Mean (with regime shift markers) and rolling Skewness."""
+    if roll.empty:
+        return go.Figure()
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
+
+    for col, color in [('P50', 'deepskyblue'), ('P90', 'orange'), ('Mean', 'white')]:
+        if col in roll.columns:
+            fig.add_trace(go.Scatter(
+                x=roll.index, y=roll[col], mode='lines', name=col,
+                line=dict(color=color, dash='dot' if col == 'Mean' else 'solid'),
+                customdata=roll['Count'],
+                hovertemplate='%{x|%Y.%m.%d}<br>' + col + ': %{y:.2f}<br>N: %{customdata}<extra></extra>'
+            ), row=1, col=1)
+
+    # Regime shift markers on the mean line
+    shifts = roll[roll['Regime_Shift']]
+    if not shifts.empty:
+        fig.add_trace(go.Scatter(
+            x=shifts.index, y=shifts['Mean'], mode='markers', name='Regime Shift (|Z| > threshold)',
+            marker=dict(color='red', size=6, symbol='x'),
+            customdata=shifts['Drift_Z'],
+            hovertemplate='%{x|%Y.%m.%d}<br>Drift Z: %{customdata:.2f}<extra></extra>'
+        ), row=1, col=1)
+
+    fig.add_trace(go.Scatter(
+        x=roll.index, y=roll['Skewness'], mode='lines', name='Skewness', line=dict(color='violet')
+    ), row=2, col=1)
+
+    fig.update_layout(
+        title=f"Rolling {value_col} Distribution ({window_days}-Day Trailing Window)",
+        template="plotly_dark",
+        height=600,
+        hovermode="x unified"
+    )
+    fig.update_yaxes(title_text=value_col, row=1, col=1)
+    fig.update_yaxes(title_text="Skew", row=2, col=1)
+    return fig
@@ -0,0 +1,22 @@
+import plotly.graph_objects as go
+
+def plot_reversal_odds(grid, curves, subtitle=""):
+    """Plots P(Reversal % > depth) against depth, one line per Impulse bucket."""
+    fig = go.Figure()
+    for label, probs in curves.items():
+        fig.add_trace(go.Scatter(
+            x=grid, y=probs, mode='lines', name=label,
+            hovertemplate='Deeper than %{x:.0f}%: %{y:.1f}%<extra>' + label + '</extra>'
+        ))
+
+    fig.update_layout(
+        title=f"Reversal Odds by Impulse Size<br><span style='font-size:12px'>{subtitle}</span>",
+        xaxis_title="Reversal Depth (%)",
+        yaxis_title="P(Reversal > Depth) %",
+        template="plotly_dark",
+        height=500,
+        hovermode='x unified',
+        legend_title_text="Impulse"
+    )
+    fig.update_yaxes(range=[0, 100])
+    return fig
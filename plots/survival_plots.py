@@ -0,0 +1,25 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+def plot_survival_curves(table, color_by='Direction', title_suffix=""):
+    """Plots Survival% vs Retracement Level, one line per group of the survival table."""
+    if table.empty:
+        return go.Figure()
+
+    color_map = {'BULLISH': 'green', 'BEARISH': 'red', 'ALL': 'white'} if color_by == 'Direction' else None
+
+    fig = px.line(
+        table, x='Level', y='Survival%', color=color_by,
+        color_discrete_map=color_map,
+        hover_data=['N', 'Survived'],
+        title=f"Retracement Survival Curve{title_suffix}",
+        labels={'Level': 'Retracement Depth (%)', 'Survival%': 'Survived (%)'},
+        template="plotly_dark"
+    )
+    fig.update_layout(hovermode="x unified", yaxis=dict(range=[0, 100]))
+
+    # Reference lines for the classic management zones
+    for level in (10, 50, 100):
+        fig.add_vline(x=level, line_dash="dot", line_color="gray")
+
+    return fig
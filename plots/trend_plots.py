@@ -28,10 +28,11 @@ def plot_duration_vs_distance(df, color_by='Direction'):
     )
     return fig
 
-def plot_distance_by_session(df):
+def plot_distance_by_session(df, session_order=None):
     """Box plot of Trend Distances grouped by Start Session."""
     # Ensure correct order
-    session_order = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
+    if session_order is None:
+        session_order = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
     
     fig = px.box(
         df, x='Session_Start', y='Distance', color='Session_Start',
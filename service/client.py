@@ -0,0 +1,89 @@
+import base64
+import urllib.request
+import urllib.error
+import pandas as pd
+from config import SERVICE_PAGE_ROWS
+from service.codec import dumps, loads
+
+# Thin-client side of the analytics service (service/server.py), used by the dashboard when
+# a service URL is set. Calls are plain functions so they run as pipeline stages.
+
+REQUEST_TIMEOUT = 600  # seconds; a cold heatmap index on a large export can take a while
+
+class DatasetGone(LookupError):
+    """The service no longer holds a dataset (released, evicted or restarted): register it again."""
+
+def service_request(url, endpoint, payload=None, method=None):
+    """
+    Calls one service endpoint (POST with a payload, GET without, unless method is given) and returns its result.
+
+    Raises:
+        ConnectionError: If the service cannot be reached.
+        DatasetGone: If a dataset of the request is no longer registered.
+        ValueError: If the service rejected the request.
+    """
+    data = None if payload is None else dumps(payload).encode()
+    method = method or ("GET" if data is None else "POST")
+    request = urllib.request.Request(f"{url.rstrip('/')}/{endpoint}", data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return loads(response.read())['result']
+    except urllib.error.HTTPError as e:
+        error = loads(e.read()).get('error', e.reason)
+        if e.code == 410:
+            raise DatasetGone(f"Analytics service: {error}")
+        raise ValueError(f"Analytics service: {error}")
+    except urllib.error.URLError as e:
+        raise ConnectionError(f"Analytics service at {url} is not reachable ({e.reason})")
+
+def register_dataset(buffers, url, kind, columns=None, scheme=None, broker_offset_min=None, trends=None):
+    """
+    Uploads exports to the service (see data.validation.load_exports for the options).
+    The service keeps one copy per content + options, shared by every client.
+    trends (the id of a registered stats dataset) adds TimeToTrigger_Min to impulse datasets.
+
+    Returns:
+        Dict with the 'dataset' id to pass in analysis requests and the export's
+        data.validation.export_summary() ('rows', 'columns', 'meta', 'attrs').
+    """
+    payload = {
+        'kind': kind,
+        'files': [base64.b64encode(b.getvalue()).decode('ascii') for b in buffers],
+        'columns': columns,
+        'scheme': scheme,
+        'broker_offset_min': broker_offset_min,
+        'trends': trends,
+    }
+    return service_request(url, "datasets", payload)
+
+def release_dataset(url, dataset_id):
+    """Drops a dataset from the service (no error if it is already gone)."""
+    try:
+        service_request(url, f"datasets/{dataset_id}", method="DELETE")
+    except DatasetGone:
+        pass
+
+def service_page(url, payload, page=1, page_size=SERVICE_PAGE_ROWS):
+    """One page of a dataset view's filtered rows (POST /rows): {'rows', 'total', 'ratio'}."""
+    return service_request(url, "rows", {**payload, 'page': page, 'page_size': page_size})
+
+def service_rows(url, payload):
+    """
+    Every filtered row of a dataset view, fetched page by page (SERVICE_PAGE_ROWS per request)
+    for the row-level charts and shaped like the tab's local filter output: a frame;
+    (frame, same-session ratio) for 'impulse'; (stats, impulses) for 'fusion'.
+    """
+    if payload.get('view') == 'fusion':
+        return tuple(_all_rows(url, {**payload, 'side': side})[0] for side in ('stats', 'impulse'))
+    df, ratio = _all_rows(url, payload)
+    return (df, ratio) if payload.get('view') == 'impulse' else df
+
+def _all_rows(url, payload):
+    """(every row of a view, its same-session ratio), concatenated from its pages."""
+    first = service_page(url, payload)
+    pages = [first['rows']]
+    n_pages = -(-first['total'] // SERVICE_PAGE_ROWS)
+    for page in range(2, n_pages + 1):
+        pages.append(service_page(url, payload, page)['rows'])
+    return (pd.concat(pages) if len(pages) > 1 else pages[0]), first['ratio']
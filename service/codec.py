@@ -0,0 +1,76 @@
+import json
+import datetime
+import dataclasses
+import numpy as np
+import pandas as pd
+from engines import results as engine_results
+
+# JSON encoding of engine inputs and results. Result objects (engines/results.py) and pandas
+# objects are tagged so they decode back to the same type (e.g. results.pullback_quantiles.q90
+# works on both sides); NaN and Infinity are kept as Python's json module writes them.
+# Frames are sent column by column with their dtypes (datetimes as integer ticks of their unit).
+
+def _encode_column(values):
+    if values.dtype.kind == 'M' and getattr(values.dtype, 'tz', None) is None:
+        return values.to_numpy().view('int64').tolist()
+    if values.dtype.kind in 'biuf' or isinstance(values.dtype, pd.StringDtype):
+        return values.tolist()
+    return to_jsonable(values.tolist())
+
+def _decode_column(values, dtype):
+    if dtype.startswith('datetime64[') and ',' not in dtype:
+        return np.array(values, dtype='int64').view(dtype)
+    try:
+        return pd.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        return values
+
+def to_jsonable(obj):
+    """Converts engine results and request parameters into plain JSON types."""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {'__result__': type(obj).__name__,
+                'fields': {f.name: to_jsonable(getattr(obj, f.name)) for f in dataclasses.fields(obj)}}
+    if isinstance(obj, pd.DataFrame):
+        return {'__frame__': {'columns': [str(c) for c in obj.columns], 'dtypes': [str(t) for t in obj.dtypes],
+                              'index': _encode_column(obj.index), 'index_dtype': str(obj.index.dtype),
+                              'data': [_encode_column(obj.iloc[:, i]) for i in range(obj.shape[1])]}}
+    if isinstance(obj, pd.Series):
+        return {'__series__': {'name': to_jsonable(obj.name), 'index': to_jsonable(list(obj.index)),
+                               'values': to_jsonable(obj.tolist())}}
+    if isinstance(obj, dict):
+        return {str(k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, (pd.Timestamp, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+def from_jsonable(obj):
+    """Inverse of to_jsonable() for the tagged pandas objects."""
+    if isinstance(obj, dict):
+        if '__result__' in obj:
+            cls = getattr(engine_results, obj['__result__'], None)
+            if not (isinstance(cls, type) and dataclasses.is_dataclass(cls)):
+                raise ValueError(f"Unknown result type {obj['__result__']}")
+            return cls(**from_jsonable(obj['fields']))
+        if '__series__' in obj:
+            s = obj['__series__']
+            return pd.Series(s['values'], index=s['index'], name=s['name'])
+        if '__frame__' in obj:
+            f = obj['__frame__']
+            df = pd.DataFrame({i: _decode_column(v, t) for i, (v, t) in enumerate(zip(f['data'], f['dtypes']))},
+                              index=pd.Index(_decode_column(f['index'], f['index_dtype'])))
+            df.columns = f['columns']
+            return df
+        return {k: from_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [from_jsonable(v) for v in obj]
+    return obj
+
+def dumps(obj):
+    return json.dumps(to_jsonable(obj))
+
+def loads(text):
+    return from_jsonable(json.loads(text))
@@ -0,0 +1,403 @@
+"""
+Local analytics service: loads each EA export once and serves engine results over JSON.
+
+Every dashboard (and the scheduled report job) that points at the service shares its
+datasets and results. Results are cached by dataset fingerprint + parameters, and
+identical requests arriving while a result is computed wait for that one computation.
+
+Run with:  python -m service.server [--host 127.0.0.1] [--port 8765]
+
+Endpoints (POST bodies and responses are JSON, see service/codec.py):
+    POST /datasets        {kind, files (base64), columns, scheme, broker_offset_min, trends} -> id + export_summary()
+    GET  /datasets        registered datasets
+    DELETE /datasets/<id> releases a dataset
+    POST /rows            {dataset, view, filters, same_session, page, page_size, sort, ascending, columns}
+                          -> one page of the view's filtered rows ({stats, impulse, filters, side} for view 'fusion')
+    POST /trend           {dataset, filters}                     -> run_trend_analysis results
+    POST /impulse         {dataset, filters, same_session}       -> run_impulse_analysis results
+    POST /fusion          {stats, impulse, filters}              -> run_fusion_analysis results
+    POST /heatmap         {dataset, view, filters, same_session, y_col, session_col, ranges, session, direction}
+    POST /heatmap_cells   {same as /heatmap, stats}              -> query_cell_stats (per-cell medians, quantiles, means)
+    POST /session_matrix  {dataset, view, filters, same_session} -> calculate_session_comparison_matrix
+    GET  /stats           cache counters
+filters are the keyword arguments of the tab's filter in data/filters.py. At most
+config.SERVICE_MAX_DATASETS datasets are held (least recently used dropped); requests for a
+dataset the service no longer holds get HTTP 410, and the client registers it again. Results
+take at most config.SERVICE_CACHE_BYTES and are dropped with the datasets they came from.
+"""
+import io
+import sys
+import base64
+import argparse
+import threading
+import dataclasses
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import config
+from data.validation import load_exports, export_summary
+from data.filters import filter_trends, filter_impulses, filter_price_moves, apply_session_coherence, filter_fusion_inputs
+from engines.job_runner import fingerprint
+from engines.trend_engine import run_trend_analysis
+from engines.impulse_engine import run_impulse_analysis
+from engines.fusion_engine import run_fusion_analysis
+from engines.survival_engine import add_time_to_trigger
+from engines.heatmap_engine import build_heatmap_index, query_heatmap_index, query_cell_stats, calculate_session_comparison_matrix
+from engines.table_view import sort_permutation, get_page
+from service.codec import dumps, loads
+
+# Filtered views of a dataset: view -> (export kind, filter of data/filters.py)
+VIEWS = {
+    'trend': ('stats', filter_trends),
+    'impulse': ('impulse', filter_impulses),
+    'price_move': ('impulse', filter_price_moves),
+}
+
+_lock = threading.Lock()
+_inflight = {}          # key -> Future of the computation in progress
+_datasets = OrderedDict()  # dataset id -> {'frame', 'kind', ...}, least recently used first
+_results = OrderedDict()   # key -> (result, size in bytes, dataset ids it was computed from), least recently used first
+_results_bytes = 0
+_counters = {'computed': 0, 'cached': 0, 'coalesced': 0}
+
+class UnknownDataset(LookupError):
+    """A dataset id the service does not hold (never registered, released or evicted)."""
+
+def result_nbytes(value):
+    """Approximate memory of a cached value: frames, arrays, result objects and containers of them."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(result_nbytes(k) + result_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(result_nbytes(v) for v in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sum(result_nbytes(getattr(value, f.name)) for f in dataclasses.fields(value))
+    return sys.getsizeof(value)
+
+def cached_call(key, compute, datasets=(), store=None):
+    """
+    Returns (value, 'cached' | 'computed' | 'coalesced') for a key.
+
+    The first request for a missing key computes it; identical requests arriving meanwhile
+    wait on the same Future instead of computing it again. Values go to the result cache,
+    bounded by config.SERVICE_CACHE_BYTES (least recently used dropped first) and purged when
+    one of the datasets they were computed from is released or evicted. register_dataset()
+    passes store=_datasets instead.
+    """
+    target = _results if store is None else store
+    with _lock:
+        if key in target:
+            target.move_to_end(key)
+            _counters['cached'] += 1
+            return (target[key][0] if store is None else target[key]), 'cached'
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+        else:
+            _counters['coalesced'] += 1
+
+    if not owner:
+        return future.result(), 'coalesced'
+
+    try:
+        value = compute()
+    except BaseException as e:
+        with _lock:
+            _inflight.pop(key)
+        future.set_exception(e)
+        raise
+
+    with _lock:
+        if store is None:
+            _keep_result(key, value, datasets)
+        else:
+            _keep_dataset(key, value)
+        _inflight.pop(key)
+        _counters['computed'] += 1
+    future.set_result(value)
+    return value, 'computed'
+
+def _keep_result(key, value, datasets):
+    """Caches a result (lock held). Results of a dataset released meanwhile, or larger than the whole budget, are not kept."""
+    global _results_bytes
+    size = result_nbytes(value)
+    if size > config.SERVICE_CACHE_BYTES or any(d not in _datasets for d in datasets):
+        return
+    _results[key] = (value, size, tuple(datasets))
+    _results_bytes += size
+    while _results_bytes > config.SERVICE_CACHE_BYTES:
+        _, (_, dropped, _) = _results.popitem(last=False)
+        _results_bytes -= dropped
+
+def _keep_dataset(dataset_id, entry):
+    """Holds a parsed dataset (lock held), evicting the least recently used ones past config.SERVICE_MAX_DATASETS."""
+    _datasets[dataset_id] = entry
+    while len(_datasets) > config.SERVICE_MAX_DATASETS:
+        evicted, _ = _datasets.popitem(last=False)
+        _purge_results(evicted)
+
+def _purge_results(dataset_id):
+    """Drops every cached result computed from a dataset (lock held)."""
+    global _results_bytes
+    for key in [key for key, (_, _, datasets) in _results.items() if dataset_id in datasets]:
+        _results_bytes -= _results.pop(key)[1]
+
+# --- Datasets ---
+
+def register_dataset(request):
+    """
+    Parses an export (or several, merged) once; the id is a fingerprint of content and load options.
+    An impulse dataset given 'trends' (a stats dataset id) also gets TimeToTrigger_Min from that trend log.
+    Files are only accepted as uploaded content: the service never opens paths named by a client.
+    """
+    kind = request.get('kind')
+    if kind not in ('stats', 'impulse'):
+        raise ValueError("kind must be 'stats' or 'impulse'")
+    if not request.get('files'):
+        raise ValueError("A dataset needs 'files' (base64 file contents)")
+    buffers = [io.BytesIO(base64.b64decode(f)) for f in request['files']]
+
+    options = {k: request.get(k) for k in ('columns', 'scheme', 'broker_offset_min')}
+    trends = request.get('trends')
+    if trends is not None and kind != 'impulse':
+        raise ValueError("'trends' only applies to impulse datasets")
+    dataset_id = fingerprint('dataset', kind, options, trends, buffers)
+
+    def load():
+        df = load_exports(buffers, kind, **options)
+        if trends is not None:
+            df = add_time_to_trigger(df, _dataset(trends, 'stats'))
+        return {'frame': df, 'kind': kind, 'summary': export_summary(df)}
+
+    entry, status = cached_call(dataset_id, load, store=_datasets)
+    return {'dataset': dataset_id, 'kind': kind, **entry['summary']}, status
+
+def _dataset(dataset_id, kind=None):
+    with _lock:
+        entry = _datasets.get(dataset_id)
+        if entry is not None:
+            _datasets.move_to_end(dataset_id)
+    if entry is None:
+        raise UnknownDataset(f"Unknown dataset {dataset_id} (register it with POST /datasets)")
+    if kind is not None and entry['kind'] != kind:
+        raise ValueError(f"Dataset {dataset_id} is of kind '{entry['kind']}', not '{kind}'")
+    return entry['frame']
+
+def list_datasets():
+    with _lock:
+        return [{'dataset': k, 'kind': v['kind'], 'rows': v['summary']['rows']} for k, v in _datasets.items()]
+
+def release_dataset(dataset_id):
+    with _lock:
+        if _datasets.pop(dataset_id, None) is None:
+            raise UnknownDataset(f"Unknown dataset {dataset_id}")
+        _purge_results(dataset_id)
+    return {'released': dataset_id}
+
+# --- Analyses ---
+
+def _filtered(request, view):
+    """(filtered frame, same-session ratio) of a dataset view; shared by every analysis of that view."""
+    return _filtered_call(request, view)[0]
+
+def _filtered_call(request, view):
+    kind, filter_fn = VIEWS[view]
+    dataset_id = request.get('dataset')
+    filters = request.get('filters') or {}
+    same_session = bool(request.get('same_session', False))
+
+    def compute():
+        df = filter_fn(_dataset(dataset_id, kind), **filters)
+        if view == 'impulse':
+            return apply_session_coherence(df, same_session)
+        return df, None
+
+    return cached_call(fingerprint('filter', dataset_id, view, filters, same_session), compute, (dataset_id,))
+
+def trend_analysis(request):
+    df, _ = _filtered(request, 'trend')
+    return cached_call(fingerprint('trend', request), lambda: run_trend_analysis(df), (request.get('dataset'),))
+
+def impulse_analysis(request):
+    df, _ = _filtered(request, 'impulse')
+    return cached_call(fingerprint('impulse', request), lambda: run_impulse_analysis(df), (request.get('dataset'),))
+
+def _fusion_filtered_call(request):
+    """cached_call() of the fusion filters: (stats, impulses)."""
+    base = {k: request.get(k) for k in ('stats', 'impulse', 'filters')}
+    return cached_call(fingerprint('filter', 'fusion', base),
+                       lambda: filter_fusion_inputs(_dataset(base['stats'], 'stats'), _dataset(base['impulse'], 'impulse'),
+                                                    **(base['filters'] or {})),
+                       (base['stats'], base['impulse']))
+
+def fusion_analysis(request):
+    stats, impulses = _fusion_filtered_call(request)[0]
+    return cached_call(fingerprint('fusion', request), lambda: run_fusion_analysis(stats, impulses),
+                       (request.get('stats'), request.get('impulse')))
+
+def rows(request):
+    """
+    One page of a view's filtered rows, cut like the dashboard's raw tables (engines/table_view.py):
+    {'rows': the page, 'total': filtered rows, 'ratio': same-session ratio ('impulse' view, else None)}.
+    page is 1-based, page_size at most config.SERVICE_PAGE_ROWS; sort (a column) pages through a
+    permutation cached per filtered view. View 'fusion' pages one 'side': 'stats' or 'impulse'.
+    """
+    view = request.get('view')
+    if view == 'fusion':
+        side = request.get('side')
+        if side not in ('stats', 'impulse'):
+            raise ValueError("Fusion rows need 'side': 'stats' or 'impulse'")
+        (stats, impulses), status = _fusion_filtered_call(request)
+        df, ratio = (stats if side == 'stats' else impulses), None
+        datasets = (request.get('stats'), request.get('impulse'))
+        view_key = ('fusion', side, {k: request.get(k) for k in ('stats', 'impulse', 'filters')})
+    elif view in VIEWS:
+        (df, ratio), status = _filtered_call(request, view)
+        datasets = (request.get('dataset'),)
+        view_key = (view, {k: request.get(k) for k in ('dataset', 'filters', 'same_session')})
+    else:
+        raise ValueError(f"view must be one of {['fusion', *VIEWS]}")
+
+    page = int(request.get('page', 1))
+    page_size = min(int(request.get('page_size', config.SERVICE_PAGE_ROWS)), config.SERVICE_PAGE_ROWS)
+    if page < 1 or page_size < 1:
+        raise ValueError("page and page_size must be at least 1")
+    columns = request.get('columns')
+    unknown = [c for c in (columns or []) + [request.get('sort')] if c is not None and c not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {unknown}")
+
+    perm = None
+    if request.get('sort') is not None:
+        sort, ascending = request['sort'], bool(request.get('ascending', True))
+        perm, _ = cached_call(fingerprint('sort', *view_key, sort, ascending), lambda: sort_permutation(df, sort, ascending), datasets)
+    return {'rows': get_page(df, page, page_size, columns=columns, perm=perm), 'total': len(df), 'ratio': ratio}, status
+
+def _heatmap_index(request):
+    """Summed-area index of a heatmap request's view (one per filtered view, y and session column) and its cache key."""
+    view = request.get('view', 'impulse')
+    if view not in ('impulse', 'price_move'):
+        raise ValueError("Heatmaps are available for the 'impulse' and 'price_move' views")
+    df, _ = _filtered(request, view)
+    y_col, session_col = request.get('y_col', 'Impulse'), request.get('session_col', 'Session_Peak')
+    if session_col not in df.columns:
+        raise ValueError(f"Unknown session column {session_col}")
+    base = {k: request.get(k) for k in ('dataset', 'filters', 'same_session')}
+    index, _ = cached_call(fingerprint('heatmap.index', view, base, y_col, session_col),
+                           lambda: build_heatmap_index(df, y_col=y_col, session_col=session_col), (base['dataset'],))
+    return index, (view, base, y_col, session_col)
+
+def heatmap(request):
+    """Heatmap matrices of a view from its summed-area index."""
+    index, key = _heatmap_index(request)
+    ranges = [tuple(r) for r in request.get('ranges') or []]
+    session, direction = request.get('session', 'ALL'), request.get('direction', 'ALL')
+    return cached_call(fingerprint('heatmap', *key, ranges, session, direction),
+                       lambda: query_heatmap_index(index, ranges, session=session, direction=direction), (key[1]['dataset'],))
+
+def heatmap_cells(request):
+    """Per-cell statistics (config.HEATMAP_CELL_STATS labels) of the same heatmap."""
+    index, key = _heatmap_index(request)
+    ranges = [tuple(r) for r in request.get('ranges') or []]
+    session, direction, stats = request.get('session', 'ALL'), request.get('direction', 'ALL'), request.get('stats')
+    return cached_call(fingerprint('heatmap_cells', *key, ranges, session, direction, stats),
+                       lambda: query_cell_stats(index, ranges, stats, session=session, direction=direction), (key[1]['dataset'],))
+
+def session_matrix(request):
+    view = request.get('view', 'impulse')
+    if view not in ('impulse', 'price_move'):
+        raise ValueError("Session matrices are available for the 'impulse' and 'price_move' views")
+    df, _ = _filtered(request, view)
+    return cached_call(fingerprint('session_matrix', view, request), lambda: calculate_session_comparison_matrix(df),
+                       (request.get('dataset'),))
+
+def service_stats():
+    with _lock:
+        return {**_counters, 'datasets': len(_datasets), 'cached_results': len(_results), 'cached_bytes': _results_bytes,
+                'in_flight': len(_inflight)}, 'live'
+
+ROUTES = {
+    'datasets': register_dataset,
+    'rows': rows,
+    'trend': trend_analysis,
+    'impulse': impulse_analysis,
+    'fusion': fusion_analysis,
+    'heatmap': heatmap,
+    'heatmap_cells': heatmap_cells,
+    'session_matrix': session_matrix,
+}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON request handler; each request runs on its own thread (ThreadingHTTPServer)."""
+
+    def _reply(self, status, body):
+        data = dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, action):
+        try:
+            result, status = action()
+            self._reply(200, {'result': result, 'cache': status})
+        except UnknownDataset as e:
+            self._reply(410, {'error': str(e)})
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {'error': str(e)})
+        except LookupError as e:
+            self._reply(404, {'error': str(e)})
+        except Exception as e:
+            self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        path = self.path.strip('/')
+        if path == 'datasets':
+            self._handle(lambda: (list_datasets(), 'live'))
+        elif path == 'stats':
+            self._handle(service_stats)
+        else:
+            self._reply(404, {'error': f"Unknown endpoint /{path}"})
+
+    def do_POST(self):
+        route = ROUTES.get(self.path.strip('/'))
+        if route is None:
+            self._reply(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b'{}'
+        self._handle(lambda: route(loads(body)))
+
+    def do_DELETE(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'datasets':
+            self._handle(lambda: (release_dataset(parts[1]), 'live'))
+        else:
+            self._reply(404, {'error': f"Unknown endpoint {self.path}"})
+
+def serve(host=config.ANALYTICS_SERVICE_HOST, port=config.ANALYTICS_SERVICE_PORT):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    print(f"Analytics service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local analytics service for the Market Research Engine")
+    parser.add_argument("--host", default=config.ANALYTICS_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.ANALYTICS_SERVICE_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,62 @@
+"""Resampled bars against pandas' OHLC resample of the same bars."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from data.bar_store import bars_frame, import_mt5_history, open_bars, resample_bars
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "tests", "fixtures", "scanner")
+
+
+def pandas_resample(bars, timeframe):
+    """OHLCV per broker-time period, empty periods dropped (the reference for resample_bars)."""
+    frame = bars_frame(bars).set_index('time')
+    out = frame.resample(f"{config.TIMEFRAMES[timeframe]}s").agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return out[frame['open'].resample(f"{config.TIMEFRAMES[timeframe]}s").count() > 0].reset_index()
+
+
+@pytest.fixture(scope="module")
+def m1_bars():
+    """Three days of M1 bars with gaps: a weekend-like hole, missing minutes and a lone bar."""
+    rng = np.random.default_rng(37)
+    times = pd.date_range("2024-03-01 21:17", "2024-03-04 09:00", freq="1min")
+    keep = rng.uniform(size=len(times)) > 0.1
+    keep &= (times < "2024-03-02 00:00") | (times >= "2024-03-03 23:00")
+    keep |= times == "2024-03-03 12:34"
+    times = times[keep]
+    close = 2050 + np.cumsum(rng.normal(0, 0.5, len(times)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return {
+        'symbol': "XAUUSD", 'timeframe': "M1",
+        'time': times.to_numpy().astype('datetime64[s]'),
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.uniform(0, 1, len(times)),
+        'low': np.minimum(open_, close) - rng.uniform(0, 1, len(times)),
+        'close': close,
+        'volume': rng.integers(1, 500, len(times)).astype(np.int64),
+    }
+
+
+@pytest.mark.parametrize("timeframe", ["M5", "M15", "M30", "H1", "H4", "D1"])
+def test_resample_matches_pandas(m1_bars, timeframe):
+    actual = bars_frame(resample_bars(m1_bars, timeframe))
+    pd.testing.assert_frame_equal(actual, pandas_resample(m1_bars, timeframe), check_dtype=False, check_freq=False)
+
+
+def test_resample_of_stored_bars(tmp_path):
+    import_mt5_history(os.path.join(FIXTURES, "bars_M5.csv"), "XAUUSD", root=str(tmp_path))
+    bars = open_bars("XAUUSD", "M5", root=str(tmp_path))
+
+    actual = bars_frame(resample_bars(bars, "H1"))
+    pd.testing.assert_frame_equal(actual, pandas_resample(bars, "H1"), check_dtype=False, check_freq=False)
+
+
+def test_resample_of_no_bars(m1_bars):
+    empty = {col: (values[:0] if isinstance(values, np.ndarray) else values) for col, values in m1_bars.items()}
+    resampled = resample_bars(empty, "H1")
+    assert all(len(resampled[col]) == 0 for col in config.BAR_COLUMNS)
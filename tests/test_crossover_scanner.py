@@ -0,0 +1,44 @@
+"""Replay of stored bars through the EA state machine against the EA's exports of the same bars."""
+import os
+
+import pandas as pd
+import pytest
+
+from data.bar_store import import_mt5_history, open_bars
+from engines.crossover_scanner import replay_exports
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "tests", "fixtures", "scanner")
+
+# EA inputs the fixture exports were written with (XAUUSD, M5, _Digits = 2)
+EA_INPUTS = {'ma_period': 10, 'ma_method': "MODE_SMA", 'rev_threshold_pct': 30.0, 'min_peak_dist': 2.0, 'atr_period': 14, 'digits': 2}
+
+ATR_STATS = ["StartATR_Closed", "StartATR_Live", "PeakATR_Closed", "PeakATR_Live", "EndATR_Closed", "EndATR_Live"]
+ATR_IMPULSE = ["BaseATR_Closed", "BaseATR_Live", "PeakATR_Closed", "PeakATR_Live", "RevATR_Closed", "RevATR_Live"]
+
+
+@pytest.fixture(scope="module")
+def replayed(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("bars"))
+    import_mt5_history(os.path.join(FIXTURES, "bars_M5.csv"), "XAUUSD", root=root)
+    stats, impulses = replay_exports(open_bars("XAUUSD", "M5", root=root), **EA_INPUTS)
+    return {'stats': pd.read_csv(stats), 'impulse': pd.read_csv(impulses)}
+
+
+@pytest.mark.parametrize("kind, export, exact, from_ma", [
+    ('stats', "Crossover_Stats.csv",
+     ["StartTime", "EndTime", "Direction", "StartPrice", "EndPrice", "MaxMinPrice", *ATR_STATS], ["Distance", "MAValue"]),
+    ('impulse', "Impulse_Reversal.csv",
+     ["Time", "Direction", "Peak", "TriggerPrice", "Pullback", "Reversal%", *ATR_IMPULSE], ["BasePrice", "Impulse"]),
+])
+def test_replay_matches_ea_export(replayed, kind, export, exact, from_ma):
+    expected = pd.read_csv(os.path.join(FIXTURES, export))
+    actual = replayed[kind]
+
+    assert len(actual) == len(expected)
+    # Row by row: same events in the same order, prices as the EA's DoubleToString(_Digits)
+    pd.testing.assert_frame_equal(actual[exact], expected[exact], check_exact=True, check_dtype=False)
+    # An SMA of 2-digit prices often ends in exactly half a point, which rounds either way
+    # depending on summation order (MT5's iMA keeps a running sum too): allow one point
+    point = 10 ** -EA_INPUTS['digits']
+    pd.testing.assert_frame_equal(actual[from_ma], expected[from_ma], check_exact=False, rtol=0, atol=point * 1.001)
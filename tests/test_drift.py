@@ -0,0 +1,70 @@
+"""Vectorized drift statistics (analytics/statistics.py) against their scipy counterparts."""
+import numpy as np
+import pytest
+from scipy import stats
+
+from analytics.statistics import benjamini_hochberg, chi2_homogeneity, ks_2samp_segments
+
+
+def test_chi2_homogeneity_matches_chi2_contingency():
+    rng = np.random.default_rng(47)
+    counts_a = rng.integers(0, 30, size=(4, 3, 21))
+    counts_b = rng.integers(0, 30, size=(4, 3, 21))
+    counts_a[..., :2] = 0  # bins empty on both sides are not degrees of freedom
+    counts_b[..., :2] = 0
+    counts_a[0, 0, 5] = 0
+    counts_b[0, 0, 5] = 7  # and a bin empty on one side only is
+
+    stat, dof, p = chi2_homogeneity(counts_a, counts_b)
+
+    for idx in np.ndindex(counts_a.shape[:-1]):
+        table = np.stack([counts_a[idx], counts_b[idx]])
+        expected = stats.chi2_contingency(table[:, table.sum(axis=0) > 0], correction=False)
+        assert stat[idx] == pytest.approx(expected.statistic, rel=1e-10)
+        assert dof[idx] == expected.dof
+        assert p[idx] == pytest.approx(expected.pvalue, rel=1e-8)
+
+
+def test_chi2_homogeneity_untested_when_a_side_is_empty():
+    stat, dof, p = chi2_homogeneity([[0, 0, 0], [1, 2, 3]], [[4, 5, 6], [0, 0, 0]])
+    assert np.isnan(stat).all() and np.isnan(p).all()
+
+
+def test_benjamini_hochberg_matches_false_discovery_control():
+    rng = np.random.default_rng(47)
+    p = np.concatenate([rng.uniform(0, 1, 200), rng.uniform(0, 0.01, 20), [0.5, 0.5]])  # ties too
+
+    np.testing.assert_allclose(benjamini_hochberg(p), stats.false_discovery_control(p, method='bh'), rtol=1e-12)
+
+    # NaN entries are not tests: the others are adjusted as if they were absent
+    with_nan = np.insert(p, [3, 50, 50], np.nan)
+    q = benjamini_hochberg(with_nan)
+    assert np.isnan(q).sum() == 3
+    np.testing.assert_allclose(q[~np.isnan(with_nan)], stats.false_discovery_control(p, method='bh'), rtol=1e-12)
+
+
+def test_ks_2samp_segments_matches_ks_2samp():
+    rng = np.random.default_rng(47)
+    n_segments = 6
+    sizes_a = [40, 1, 200, 15, 0, 60]
+    sizes_b = [35, 10, 180, 15, 5, 60]
+    seg_a = np.repeat(np.arange(n_segments), sizes_a)
+    seg_b = np.repeat(np.arange(n_segments), sizes_b)
+    # Rounded values: ties across and within the two samples
+    values_a = np.round(rng.normal(0, 1, len(seg_a)), 1)
+    values_b = np.round(rng.normal(0.3, 1.2, len(seg_b)), 1)
+    values_a[::17] = np.nan  # NaN values are dropped
+
+    stat, p, n_a, n_b = ks_2samp_segments(seg_a, values_a, seg_b, values_b, n_segments)
+
+    for s in range(n_segments):
+        a = values_a[seg_a == s]
+        a = a[~np.isnan(a)]
+        b = values_b[seg_b == s]
+        assert (n_a[s], n_b[s]) == (len(a), len(b))
+        if len(a) == 0 or len(b) == 0:
+            assert np.isnan(stat[s]) and np.isnan(p[s])
+            continue
+        assert stat[s] == pytest.approx(stats.ks_2samp(a, b).statistic, abs=1e-12)
+        # p-values use Stephens' approximation, not scipy's exact small-sample distribution
+        assert 0 <= p[s] <= 1
@@ -0,0 +1,83 @@
+"""Summed-area heatmap index queries against direct computations on the same rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import HEATMAP_CELL_STATS
+from engines.heatmap_engine import (REVERSAL_LABELS, build_heatmap_index, calculate_heatmap_matrix, query_cell_stats,
+                                    query_heatmap_index, reversal_bin_index)
+
+SESSIONS = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
+# Overlapping ranges, ranges ending on data values and one holding no rows
+RANGES = [(0, 10), (10, 25), (5, 40), (25.5, 25.5), (200, 300)]
+
+
+@pytest.fixture(scope="module")
+def impulses():
+    rng = np.random.default_rng(33)
+    n = 2000
+    df = pd.DataFrame({
+        'Impulse': rng.integers(0, 60, n) / 2,  # many rows on range boundaries
+        'Reversal%': rng.uniform(-10, 130, n),  # some outside the Reversal bins
+        'BaseATR_Live': rng.lognormal(0.5, 0.6, n),
+        'Pullback': rng.uniform(0, 20, n),
+        'Impulse%': np.round(rng.uniform(0, 2, n), 2),  # ties inside cells
+        'Session_Peak': rng.choice(SESSIONS, n),
+        'Direction': rng.choice(["BULLISH", "BEARISH"], n),
+    })
+    df.loc[rng.choice(n, 50, replace=False), 'Impulse'] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), 'BaseATR_Live'] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), 'Pullback'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("session", ["ALL", *SESSIONS])
+@pytest.mark.parametrize("direction", ["ALL", "BULLISH", "BEARISH"])
+def test_index_query_matches_heatmap_matrix(impulses, session, direction):
+    index = build_heatmap_index(impulses, y_col='Impulse')
+    mask = pd.Series(True, index=impulses.index)
+    if session != "ALL":
+        mask &= impulses['Session_Peak'] == session
+    if direction != "ALL":
+        mask &= impulses['Direction'] == direction
+
+    pcts, counts, atrs, total_pcts, y_labels, x_labels = query_heatmap_index(index, RANGES, session=session, direction=direction)
+    e_pcts, e_counts, e_atrs, e_total_pcts, e_y_labels, e_x_labels = calculate_heatmap_matrix(impulses[mask], RANGES, y_col='Impulse')
+
+    assert counts == e_counts
+    assert y_labels == e_y_labels
+    assert x_labels == e_x_labels
+    np.testing.assert_allclose(pcts, e_pcts)
+    np.testing.assert_allclose(total_pcts, e_total_pcts)
+    np.testing.assert_allclose(atrs, e_atrs, rtol=1e-9)
+
+
+@pytest.mark.parametrize("session, direction", [("ALL", "ALL"), ("LONDON", "ALL"), ("TOKYO", "BEARISH")])
+def test_cell_stats_match_numpy(impulses, session, direction):
+    index = build_heatmap_index(impulses, y_col='Impulse')
+    mask = pd.Series(True, index=impulses.index)
+    if session != "ALL":
+        mask &= impulses['Session_Peak'] == session
+    if direction != "ALL":
+        mask &= impulses['Direction'] == direction
+    rows = impulses[mask]
+    bins = reversal_bin_index(rows['Reversal%'].to_numpy())
+
+    cell_stats = query_cell_stats(index, RANGES, session=session, direction=direction)
+
+    # TimeToTrigger_Min is not in the frame: its statistic is left out
+    assert set(cell_stats) == {label for label, (col, _) in HEATMAP_CELL_STATS.items() if col in impulses.columns}
+    for label, matrix in cell_stats.items():
+        col, stat = HEATMAP_CELL_STATS[label]
+        for r, (start, end) in enumerate(RANGES):
+            in_range = rows['Impulse'].between(start, end).to_numpy()
+            for b in range(len(REVERSAL_LABELS)):
+                values = rows[col].to_numpy()[in_range & (bins == b)]
+                values = values[~np.isnan(values)]
+                if len(values) == 0:
+                    expected = np.nan
+                elif stat == 'mean':
+                    expected = values.mean()
+                else:
+                    expected = np.quantile(values, 0.5 if stat == 'median' else int(stat[1:]) / 100)
+                np.testing.assert_allclose(matrix[r][b], expected, rtol=1e-12, err_msg=f"{label} [{r}, {b}]")
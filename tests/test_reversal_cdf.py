@@ -0,0 +1,71 @@
+"""Reversal% CDF tables: binary export round-trip and incremental updates."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines.reversal_cdf import build_reversal_cdf, read_reversal_cdf, reversal_cdf_to_bytes, update_reversal_cdf
+
+SESSIONS = ["SYDNEY", "TOKYO", "LONDON", "NEW YORK"]
+
+
+@pytest.fixture(scope="module")
+def impulses():
+    """One impulse per M5 bar, in time order, with events outside the table's grid and labels."""
+    rng = np.random.default_rng(44)
+    n = 3000
+    df = pd.DataFrame({
+        'Time': pd.date_range("2024-01-02", periods=n, freq="5min"),
+        'Direction': rng.choice(["BULLISH", "BEARISH"], n),
+        'Impulse': np.round(rng.lognormal(2.5, 0.7, n), 2),
+        'Reversal%': np.round(rng.uniform(0, 260, n), 2),  # deeper than the grid's last point too
+        'Session_Peak': rng.choice(SESSIONS + ["NONE"], n),
+    })
+    df.loc[::97, 'Reversal%'] = np.nan
+    return df
+
+
+def assert_tables_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, np.ndarray):
+            np.testing.assert_array_equal(actual[key], value, err_msg=key)
+        else:
+            assert actual[key] == value, key
+
+
+def test_binary_round_trip_is_lossless(impulses):
+    table = build_reversal_cdf(impulses)
+    data = reversal_cdf_to_bytes(table)
+
+    restored = read_reversal_cdf(data)
+    assert_tables_equal(restored, table)
+    assert reversal_cdf_to_bytes(restored) == data
+
+
+def test_empty_table_round_trip(impulses):
+    table = build_reversal_cdf(impulses.iloc[:0], edges=[10.0, 20.0])
+    assert_tables_equal(read_reversal_cdf(reversal_cdf_to_bytes(table)), table)
+
+
+def test_read_rejects_other_data():
+    with pytest.raises(ValueError):
+        read_reversal_cdf(b"NOTACDF1" + bytes(64))
+
+
+@pytest.mark.parametrize("split", [1, 1234, 2999])
+def test_incremental_update_equals_full_build(impulses, split):
+    full = build_reversal_cdf(impulses)
+
+    # Older events, exported and reloaded, then a later export that overlaps them
+    table = build_reversal_cdf(impulses.iloc[:split], edges=full['edges'])
+    table = read_reversal_cdf(reversal_cdf_to_bytes(table))
+    update_reversal_cdf(table, impulses.iloc[split // 2:])
+
+    assert_tables_equal(table, full)
+
+
+def test_update_with_seen_events_changes_nothing(impulses):
+    table = build_reversal_cdf(impulses)
+    before = reversal_cdf_to_bytes(table)
+    update_reversal_cdf(table, impulses)
+    assert reversal_cdf_to_bytes(table) == before
@@ -0,0 +1,46 @@
+"""Walk-forward heatmaps against calculate_heatmap_matrix() of each window's rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines.heatmap_engine import calculate_heatmap_matrix
+from engines.temporal_analysis import calculate_rolling_heatmaps
+
+RANGES = [(0, 50), (40, 100)]
+
+
+def make_moves(times):
+    rng = np.random.default_rng(28)
+    n = len(times)
+    return pd.DataFrame({
+        'Time': pd.to_datetime(times),
+        'Impulse%': rng.uniform(0, 100, n),
+        'Reversal%': rng.uniform(20, 100, n),
+        'BaseATR_Live': rng.uniform(1, 5, n),
+    })
+
+
+@pytest.mark.parametrize("window_days, step_days, span_days", [
+    (10, 5, 20),   # (span - window) / step is a whole number
+    (10, 5, 10),   # span == window: a single window
+    (10, 3, 20),   # not a multiple: the last window reaches past the latest row
+    (3, 5, 20),    # step > window: windows do not overlap
+])
+def test_windows_hold_every_row(window_days, step_days, span_days):
+    first = pd.Timestamp("2024-01-01")
+    latest = first + pd.Timedelta(days=span_days)
+    times = list(pd.date_range(first, latest - pd.Timedelta(hours=1), periods=60)) + [latest, latest]
+    df = make_moves(times)
+
+    frames, _, _ = calculate_rolling_heatmaps(df, RANGES, window_days=window_days, step_days=step_days)
+
+    assert frames[-1]['n'] > 0
+    assert frames[-1]['start'] <= latest
+    for i, frame in enumerate(frames):
+        last = i == len(frames) - 1
+        in_window = (df['Time'] >= frame['start']) & ((df['Time'] <= frame['end']) if last else (df['Time'] < frame['end']))
+        expected = df[in_window]
+        assert frame['n'] == len(expected)
+        _, counts, _, total_pcts, _, _ = calculate_heatmap_matrix(expected, RANGES, y_col='Impulse%')
+        assert frame['counts'] == counts
+        np.testing.assert_allclose(frame['total_pcts'], total_pcts)